@@ -1,23 +1,46 @@
+import time
+STARTUP_T0 = time.perf_counter()   # 시작 벤치마크 기준점 (import 시간 측정)
+
 import os
 import re
+import ssl
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+import contextvars
+import signal
+import socket
+import subprocess
+import threading
+import importlib.util
 import sqlite3
+import zlib
 import asyncio
+import secrets
+import heapq
+import traceback
+import tracemalloc
 import json
+import hashlib
+import unicodedata
+import aiohttp
 import discord
 from discord.ext import commands
-from discord.ui import View, Button
-from anthropic import AsyncAnthropic
-from datetime import datetime, date, timedelta
-from notion_client import AsyncClient as NotionAsyncClient
+from datetime import datetime, date, timedelta, timezone
+from dataclasses import dataclass, replace
+from collections import Counter, deque
+from functools import lru_cache
+from urllib.parse import quote, urlsplit
 from dotenv import load_dotenv
 
-# Google Calendar (선택 의존성)
-try:
-    from google.oauth2 import service_account
-    from googleapiclient.discovery import build as google_build
-    GOOGLE_AVAILABLE = True
-except ImportError:
-    GOOGLE_AVAILABLE = False
+# anthropic / notion_client / google-auth / redis 는 무거워서 첫 사용 시 import (LazyClient 참고)
+# Google Calendar (선택 의존성) — 서비스 계정 JWT 서명에만 google-auth 사용, HTTP는 aiohttp
+GOOGLE_AVAILABLE = importlib.util.find_spec("google.auth") is not None
+
+# `python bot.py` 로 실행해도 코그(cogs/*.py)의 `from bot import ...` 가 이 모듈을 다시 실행하지 않도록
+sys.modules.setdefault("bot", sys.modules[__name__])
 
 load_dotenv()  # 로컬 .env 파일 로드
 
@@ -43,14 +66,179 @@ NOTION_MEMO_DB_ID        = os.environ.get("NOTION_MEMO_DB_ID", "")
 # 구글 캘린더
 GOOGLE_CALENDAR_ID      = os.environ.get("GOOGLE_CALENDAR_ID", "")
 GOOGLE_CREDENTIALS_JSON = os.environ.get("GOOGLE_CREDENTIALS_JSON", "")
+# 로컬 가짜 Calendar/토큰 서버로 테스트할 때만 덮어씀
+GOOGLE_CALENDAR_API_BASE = os.environ.get("GOOGLE_CALENDAR_API_BASE", "https://www.googleapis.com/calendar/v3")
+GOOGLE_TOKEN_URI         = os.environ.get("GOOGLE_TOKEN_URI", "")
+GOOGLE_CALENDAR_POOL     = int(os.environ.get("GOOGLE_CALENDAR_POOL", "10"))
 
 DB_PATH      = "history.db"
 MAX_HISTORY  = 20      # 60→20: 히스토리 누적이 토큰 폭증의 주범
 MAX_MSG_LEN  = 800    # 입력 메시지 최대 길이 (초과 시 잘라냄)
 COOLDOWN_SEC = 5      # 유저당 최소 요청 간격 (초)
 
-# 레이트 리밋: {user_id: last_request_time}
-_last_request: dict[int, float] = {}
+# 도구 사용 모드: Claude가 Notion/캘린더 도구를 직접 호출 (채팅 + 일정 파싱을 한 턴으로)
+TOOL_USE_ENABLED    = os.environ.get("TOOL_USE_ENABLED", "0") == "1"
+TOOL_USE_MAX_ROUNDS = 3   # 도구 호출 → 결과 → 재호출 최대 반복 횟수
+
+# 모닝 브리핑: KST 시각마다 오늘 일정/미완료 할일/최근 헬스 기록을 미리 모아 캐시 (+ 채널 게시)
+BRIEFING_TIMES       = [t.strip() for t in os.environ.get("BRIEFING_TIMES", "07:00").split(",") if t.strip()]
+BRIEFING_CHANNEL_ID  = int(os.environ.get("BRIEFING_CHANNEL_ID", "0") or 0)   # 0 = 게시 안 함
+BRIEFING_REFRESH_SEC = int(os.environ.get("BRIEFING_REFRESH_SEC", "1800"))    # 캐시 주기적 갱신 간격
+BRIEFING_MAX_AGE_SEC = BRIEFING_REFRESH_SEC * 2                               # 이보다 오래된 캐시는 안 씀
+
+# 할일 마감 알림: 마감일 REMINDER_HOUR시(KST) 또는 마감 시각 REMINDER_LEAD_MIN분 전에 채널로 알림
+REMINDER_CHANNEL_ID  = int(os.environ.get("REMINDER_CHANNEL_ID", "0") or 0)   # 0 = 알림 끔
+REMINDER_HOUR        = int(os.environ.get("REMINDER_HOUR", "9"))
+REMINDER_LEAD_MIN    = int(os.environ.get("REMINDER_LEAD_MIN", "60"))
+REMINDER_RESYNC_SEC  = int(os.environ.get("REMINDER_RESYNC_SEC", "600"))       # Notion 증분 동기화 간격
+
+# 중복 쓰기 방지: 같은 일정/할일/메모 지문은 TTL 동안 원격 호출 없이 건너뜀
+IDEMPOTENCY_TTL_SEC = {
+    "calendar": 7 * 86400,
+    "todo":     86400,
+    "memo":     3600,
+}
+
+# 일일 요약: 마지막 턴 이후 이 시간 동안 조용하면 백그라운드에서 증분 요약 갱신
+SUMMARY_DEBOUNCE_SEC      = int(os.environ.get("SUMMARY_DEBOUNCE_SEC", "60"))
+SUMMARY_MAX_PENDING_TURNS = MAX_HISTORY // 4   # 이만큼 쌓이면 디바운스 재설정 없이 바로 갱신 (트림 전에 반영)
+
+# 상태 백엔드: 히스토리·쿨다운 상태 저장소
+# "sqlite" = 단일 호스트 (여러 워커 프로세스가 history.db 공유), "redis" = 여러 호스트
+STATE_BACKEND   = os.environ.get("STATE_BACKEND", "sqlite").lower()
+REDIS_URL       = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+REDIS_PREFIX    = os.environ.get("REDIS_PREFIX", "bot:")
+
+# 확인 버튼 (/저장 미리보기 등): 대기 내용은 history.db 에 두고 재시작해도 버튼이 그대로 동작
+CONFIRM_TTL_SEC   = int(os.environ.get("CONFIRM_TTL_SEC", "600"))
+CONFIRM_SWEEP_SEC = 30   # 만료된 확인의 버튼 제거 주기
+CONFIRM_CLAIM_SEC = 120  # 확인 처리 중 표시 유지 시간 (처리 중 프로세스가 죽으면 이후 다시 누를 수 있음)
+
+# 샤딩: SHARD_PROCESSES > 1 이면 런처가 샤드를 워커 프로세스들에 나눠서 실행
+SHARD_COUNT       = int(os.environ.get("SHARD_COUNT", "0") or 0)         # 0 = 샤딩 안 함 (런처는 Discord 권장값 사용)
+SHARD_PROCESSES   = int(os.environ.get("SHARD_PROCESSES", "1") or 1)
+SHARD_IDS         = [int(i) for i in os.environ.get("SHARD_IDS", "").split(",") if i.strip()]   # 런처가 워커에 지정
+IS_PRIMARY_WORKER = not SHARD_IDS or 0 in SHARD_IDS   # 스케줄러·브리핑·마감 알림은 샤드 0 워커만
+IDENTIFY_INTERVAL_SEC = 5.5   # 샤드 IDENTIFY 간격 (워커 시작을 이만큼씩 엇갈림)
+WORKER_RESTART_SEC    = 5     # 워커가 죽으면 이 시간 뒤 재시작
+
+# 종료: SIGTERM 이면 새 턴을 받지 않고 처리 중인 턴을 이 시간까지 기다림. 못 끝낸 턴은 다음 시작 때 재생.
+SHUTDOWN_DRAIN_SEC  = float(os.environ.get("SHUTDOWN_DRAIN_SEC", "20"))
+REPLAY_HEARTBEAT_SEC = 15   # 살아 있다는 신호 + 재생할 작업 확인 주기
+REPLAY_STALE_SEC     = 60    # 이만큼 신호가 없는 인스턴스의 "처리 중" 작업만 가져와 재생
+REPLAY_MAX_ATTEMPTS  = 3
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}"   # 저널 행 소유자
+
+# ─── 로깅 ─────────────────────────────────────────────
+# print 대신 구조화 로그: 호출 쪽은 레코드를 큐에 넣기만 하고(가득 차면 버림) stdout 쓰기는
+# QueueListener 스레드가 담당 → 이벤트 루프가 로그 I/O 를 기다리지 않음
+LOG_FORMAT       = os.environ.get("LOG_FORMAT", "json").lower()   # "json" | "text"
+LOG_LEVEL        = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE   = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_DEBUG_SAMPLE = int(os.environ.get("LOG_DEBUG_SAMPLE", "10"))  # DEBUG 는 stage 별 N개 중 1개만 (첫 줄은 항상)
+
+# 현재 태스크의 공통 필드 (on_message 에서 channel/mode 설정 → 그 태스크의 모든 로그에 붙음)
+log_context: contextvars.ContextVar[dict] = contextvars.ContextVar("log_context", default={})
+logger = logging.getLogger("bot")
+
+class _DropQueueHandler(logging.handlers.QueueHandler):
+    """큐가 가득 차면 블로킹 대신 버리고 셈"""
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.fields = {**log_context.get(), **getattr(record, "fields", {})}
+        return super().prepare(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class _DebugSampler(logging.Filter):
+    """DEBUG 레코드는 stage 별로 every 개 중 1개만 통과"""
+    def __init__(self, every: int):
+        super().__init__()
+        self.every   = max(every, 1)
+        self.counts: dict[str, int] = {}
+        self.skipped = 0
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        stage = getattr(record, "stage", record.name)
+        n = self.counts.get(stage, 0)
+        self.counts[stage] = n + 1
+        if n % self.every == 0:
+            return True
+        self.skipped += 1
+        return False
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps({
+            "ts":    datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "stage": getattr(record, "stage", record.name),
+            "msg":   record.getMessage(),
+            **getattr(record, "fields", {}),
+        }, ensure_ascii=False, default=str)
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{k}={v}" for k, v in getattr(record, "fields", {}).items())
+        return f"[{getattr(record, 'stage', record.name)}] {record.getMessage()}" + (f" ({fields})" if fields else "")
+
+_log_queue    = queue.Queue(LOG_QUEUE_SIZE)
+_log_handler  = _DropQueueHandler(_log_queue)
+_log_sampler  = _DebugSampler(LOG_DEBUG_SAMPLE)
+_log_listener: logging.handlers.QueueListener | None = None
+
+def setup_logging():
+    """루트 로거에 큐 핸들러 연결 (discord.py 로그도 같은 파이프라인으로) + 출력 스레드 시작"""
+    global _log_listener
+    if _log_listener:
+        return
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(_JsonFormatter() if LOG_FORMAT == "json" else _TextFormatter())
+    _log_handler.addFilter(_log_sampler)
+    root = logging.getLogger()
+    root.addHandler(_log_handler)
+    logger.setLevel(LOG_LEVEL)
+    # 라이브러리(discord.py 는 게이트웨이 페이로드까지 찍음)는 DEBUG 제외
+    root.setLevel(max(logging.INFO, logger.level))
+    _log_listener = logging.handlers.QueueListener(_log_queue, out)
+    _log_listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging(timeout: float = 2.0):
+    """남은 레코드를 flush 하고 출력 스레드 종료 (큐가 가득 차 있으면 빌 때까지 잠깐 재시도)"""
+    if not _log_listener or not _log_listener._thread:
+        return
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _log_listener.stop()
+            return
+        except queue.Full:
+            if time.monotonic() > deadline:
+                return
+            time.sleep(0.01)
+
+def log(stage: str, msg: str = "", *, level: int = logging.INFO, **fields):
+    """구조화 로그 한 줄. stage = 기존 [태그], fields = latency_ms 등 (channel/mode 는 log_context 에서)"""
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, extra={"stage": stage, "fields": fields})
+
+def ms_since(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+def log_stats() -> dict:
+    return {"queued": _log_queue.qsize(), "dropped": _log_handler.dropped, "sampled_out": _log_sampler.skipped}
+
+setup_logging()
 
 # ─── 모델 설정 ────────────────────────────────────────
 MODEL_MAP = {
@@ -59,141 +247,44 @@ MODEL_MAP = {
     # 헬스: 일반 대화는 Haiku, /저장 시만 Sonnet 사용 (비용 절감)
 }
 
-# ─── 채널별 시스템 프롬프트 ──────────────────────────
-SYSTEM_PROMPTS = {
-    "헬스": """너는 정훈의 전담 헬스 트레이너 겸 식단 어드바이저야. Notion과 연동되어 있어서 오늘 대화를 일지로 저장할 수 있어.
-
-[운동 코칭]
-- 오늘 운동 내용 파악, 다음 운동 추천, 무게/세트/횟수 피드백
-- 운동 루틴 설계, 부위별 운동 추천, 부상 예방 조언
-
-[식단 관리]
-- 먹은 것 기록, 다음 끼니 추천, 칼로리/영양 조언
-- 다이어트 목표에 맞는 식단 설계, 외식 메뉴 추천
-- 콜레스테롤 관리, 단백질 섭취 최적화 등 건강한 식습관 조언
-
-[헬스 데이터 정리 포맷 — 반드시 이 형식만 사용]
-대화 중에 운동/식단을 정리하거나 요약할 때 반드시 아래 포맷을 그대로 써:
-
-🗓️ [날짜] ([요일])
-
-🏋️ 운동 기록
-운동 부위/종목: 
-무게/세트/횟수: 
-운동 시간대: 
-컨디션: 
-
-🍽️ 식단 기록
-아침: 
-점심: 
-저녁: 
-간식/야식: 
-
-⭐ 특기사항
-- 
-- 
-
-이 포맷 외의 다른 방식으로 헬스 기록을 정리하지 마. 불릿포인트(•), 다른 이모지, 다른 순서 사용 금지.
-
-[사용 가능한 커맨드]
-- `/저장` — 오늘 대화를 AI가 요약해서 Notion 헬스 일지 DB에 자동 저장
-- `/초기화` — 이 채널 대화 히스토리 삭제
-- `/히스토리` — 현재 저장된 대화 수 확인
-
-[과거 기록 자동 불러오기]
-"최근 기록 보여줘", "지난주 뭐했어", "기록 불러와" 같은 말을 하면 → Notion에서 자동으로 최근 7일 기록을 가져와서 너에게 전달해줘. 그러면 그걸 바탕으로 대화하면 돼.
-이 기능은 자동이라서 커맨드 없이도 돼. 사용자한테 "못한다"고 하지 마.
-
-🚫 절대 금지 사항 (이것만큼은 반드시 지켜):
-- "저장 중...", "기록 중...", "삭제 중...", "처리 중..." 같은 말 절대 금지 — 너는 실시간으로 아무것도 못 해
-- "저장했어요", "기록했어요", "삭제했어요" 같은 말 절대 금지 — 실제로 한 게 아니니까
-- 사용자가 "저장해줘" 라고 하면 → `/저장` 커맨드를 안내해줘
-- 사용자가 "삭제해줘", "초기화해줘" 라고 하면 → `/초기화` 커맨드를 안내해줘
-- 너는 Notion, 파일, 메모리에 직접 접근하는 능력이 없어. 커맨드를 통해서만 가능해
-- 기록 수정은 `/헬스수정 날짜 | 내용` 커맨드로만 가능해
-항상 한국어로 대화하고, 친근하고 동기부여되는 톤으로 말해줘.""",
-
-    "번역": """너는 정훈의 전담 번역 어시스턴트야. Notion과 연동되어 있어서 번역할 때마다 자동으로 번역 기록 DB에 저장돼.
-
-[번역 기능]
-- 한국어 ↔ 중국어 ↔ 영어 번역
-- 자연스러운 표현으로 번역하고, 필요하면 뉘앙스 설명
-- 중국어는 간체자 기준으로 번역하고 병음도 함께 제공
-
-[Notion 자동 저장]
-- 번역할 때마다 원문과 번역 결과가 Notion 번역 기록 DB에 자동으로 저장돼
-- 별도 커맨드 없이 대화만 해도 자동 저장됨
-
-사용자가 "번역 기록 저장돼?" 같이 물으면 "네! 번역할 때마다 Notion에 자동으로 저장되고 있어요 🌏" 라고 안내해줘.
-항상 한국어로 설명해줘.""",
-
-    "일정": """너는 정훈의 전담 일정 관리 비서야. 구글 캘린더와 실제로 연동되어 있어.
-
-[캘린더 연동 기능]
-- 사용자가 일정을 말하면 시스템이 자동으로 캘린더에 추가를 시도해. 별도 커맨드 안내 불필요.
-- `/일정추가 [내용]` — 자연어로 일정을 파싱해서 구글 캘린더에 자동 추가 (예: /일정추가 내일 오후 3시 치과)
-- `/오늘일정` — 오늘 구글 캘린더에 등록된 일정 조회
-- `/이번주일정` — 이번 주 일정 전체 조회
-- 사용자가 일정을 말하면 "자동으로 추가해드릴게요!" 식으로 자연스럽게 응대해줘. 커맨드를 복사하라는 안내는 하지 마.
-
-[할일 관리 (Notion 연동)]
-- `/할일추가 [내용]` — Notion 할일 DB에 추가
-- `/할일목록` — 미완료 할일 목록 조회
-- `/할일완료 [이름]` — 완료 처리
-
-[일반 조언]
-- 일정 우선순위 조언, 시간 관리 도움, 데드라인 관리
-- 업무와 개인 일정 균형 조언
-
-사용자가 "캘린더 연결됐어?" 같이 물어보면 "네, 구글 캘린더와 연동되어 있어요! `/오늘일정` 이나 `/일정추가`를 써보세요 📅" 라고 안내해줘.
-🚫 절대 금지 사항 (반드시 지켜):
-- "저장 중...", "추가 중...", "삭제 중...", "처리 중..." 같은 말 절대 금지
-- "저장했어요", "추가했어요", "삭제했어요" 같은 말 절대 금지 — 실제로 한 게 아니야
-- 사용자가 "저장해줘", "추가해줘", "삭제해줘" 라고 하면 → 해당 커맨드를 안내만 해줘
-- 할일 수정은 `/할일수정 기존이름 | 새이름` 커맨드로만 가능해. 사용자가 "수정해줘"라고 하면 안내해줘
-항상 한국어로 대화하고, 효율적이고 명확하게 답해줘.""",
-
-    "default": """너는 정훈의 만능 AI 비서야. 구글 캘린더 및 Notion과 연동되어 있어.
-
-[대화 가능 주제]
-- 운동, 식단, 번역, 일정, 일반 질문 등 무엇이든 도와줘
-- 게임(원신 등), 개발(Unity, 게임 개발), 일상적인 질문 모두 OK
-- 친근하고 실용적인 조언을 해줘
-
-[사용 가능한 커맨드 — 채널 어디서나 동작]
-- `/저장` — 오늘 대화 AI 요약 후 파일 & Notion 저장
-- `/초기화` — 이 채널 대화 히스토리 삭제
-- `/히스토리` — 현재 저장된 대화 수 확인
-- `/모드` — 현재 채널 모드 및 사용 AI 모델 확인
-- `/도움말` — 전체 커맨드 목록 출력
-
-[일정 관련 커맨드 (구글 캘린더 연동)]
-- `/일정추가 [내용]` — 자연어로 일정 파싱 후 캘린더에 추가
-- `/오늘일정` — 오늘 구글 캘린더 일정 조회
-- `/이번주일정` — 이번 주 일정 조회
-
-[할일 & 메모 커맨드 (Notion 연동)]
-- `/할일추가 [내용]` — Notion 할일 DB에 추가
-- `/할일목록` — 미완료 할일 목록 조회
-- `/할일완료 [이름]` — 완료 처리
-- `/할일수정 [이름] | [새이름 또는 마감:날짜 또는 우선순위:높음]` — 할일 수정
-- `/메모 [제목] | [내용]` — Notion 메모 DB에 저장
-- `/메모수정 [제목] | [새 내용]` — 메모 내용 수정
-
-[채널별 특화 기능]
-- `#헬스` — 운동/식단 특화 + `/저장` 시 Notion 헬스 일지 저장
-- `#번역` — 번역 특화(Sonnet 모델) + 번역마다 Notion 자동 저장
-- `#일정` — 일정 특화 + 자연어 일정 캘린더 자동 감지
-
-🚫 절대 금지 사항 (반드시 지켜):
-- "저장 중...", "처리 중...", "삭제 중...", "추가 중..." 같은 진행형 표현 절대 금지
-- "저장했어요", "추가했어요", "삭제했어요", "수정했어요" 같은 완료형 표현 절대 금지
-- 너는 Notion, 캘린더, 파일에 직접 접근 불가능해. 커맨드를 통해서만 실제 저장/수정이 이루어져
-- 사용자가 저장/수정/삭제를 요청하면 → 해당 커맨드(/저장, /메모, /할일추가 등)를 안내해줘
-- "메모리에서 삭제할게", "기억에서 지울게" 같은 말도 금지 — 대화 히스토리는 /초기화 커맨드로만 삭제 가능해
-사용자가 뭘 할 수 있는지 물어보면 위의 커맨드 목록을 친절하게 안내해줘.
-항상 한국어로 대화해줘.""",
+# /채널설정 에서 쓰는 모델 별칭
+MODEL_ALIASES = {
+    "haiku":  "claude-haiku-4-5-20251001",
+    "sonnet": "claude-sonnet-4-6",
+}
+
+DEFAULT_MAX_TOKENS = 1024   # 일반 대화: 1024로 충분 (2048 불필요)
+
+# ─── 적응형 모델 라우팅 ───────────────────────────────
+# 메시지 복잡도 점수(0~1)가 모드별 threshold 이상이면 upgrade 모델 사용.
+# 채널설정으로 모델을 고정한 채널은 라우팅하지 않음.
+ADAPTIVE_MODEL_ROUTING = os.environ.get("ADAPTIVE_MODEL_ROUTING", "1") == "1"
+MODEL_LATENCY_SLO_MS   = int(os.environ.get("MODEL_LATENCY_SLO_MS", "0"))   # 0 = SLO 미사용
+
+MODEL_POLICIES = {
+    "번역":    {"base": "haiku", "upgrade": "sonnet", "threshold": 0.12},  # 짧은 문장은 Haiku로 충분
+    "default": {"base": "haiku", "upgrade": "sonnet", "threshold": 0.55},  # 코딩/설계 질문만 Sonnet
+    "헬스":    {"base": "haiku", "upgrade": "sonnet", "threshold": 0.75},  # 루틴 설계 등 긴 질문만
+    "일정":    {"base": "haiku", "upgrade": None},
+}
+
+# 복잡도 특징: (가중치, 키워드)
+COMPLEXITY_FEATURES = {
+    "code":      (0.35, ("```", "def ", "class ", "import ", "Traceback", "Exception", "에러", "오류",
+                         "코드", "함수", "버그", "디버그", "컴파일", "unity", "Unity", "C#", "스크립트")),
+    "reasoning": (0.30, ("설계", "계획", "전략", "비교", "분석", "왜 ", "원리", "장단점", "최적화",
+                         "아키텍처", "구조", "알고리즘", "단계별", "자세히")),
+    "nuance":    (0.30, ("뉘앙스", "자연스럽", "차이", "설명", "문법", "어감", "존댓말", "격식")),
 }
+COMPLEXITY_LENGTH_WEIGHT = 0.4   # 300자에서 최대
+COMPLEXITY_MULTI_Q       = 0.15  # 물음표 2개 이상
+
+# ─── 채널별 시스템 프롬프트 ──────────────────────────
+# 모드별 프롬프트는 각 코그(cogs/*.py)가 로드될 때 채움 → /리로드 로 재시작 없이 교체
+SYSTEM_PROMPTS: dict[str, str] = {}
+
+def system_prompt(mode: str) -> str:
+    return SYSTEM_PROMPTS.get(mode) or SYSTEM_PROMPTS.get("default", "")
 
 CHANNEL_MODES = {
     "헬스": "헬스",
@@ -208,9 +299,54 @@ MODE_EMOJI = {
     "default": "🤖",
 }
 
+# ─── 인텐트 트리거 키워드 ─────────────────────────────
+# 메모 저장 트리거 (채널 무관, Claude 재호출 없음)
+MEMO_TRIGGER_KEYWORDS = ("메모로 저장", "메모 저장", "메모해줘", "메모로 남겨",
+                         "메모 남겨", "메모로 기록", "메모에 저장")
+# 헬스 채널: "기록" 관련 키워드 있을 때만 최근 3일 raw 데이터 주입
+RECORD_KEYWORDS = ("기록", "불러", "최근", "지난", "뭐했", "보여줘", "얼마나", "어떻게 했",
+                   "먹을까", "뭐먹", "추천", "식단", "운동할까", "어떻게 할까", "뭐할까")
+# 일정 채널: 시간 관련 키워드 있을 때만 일정 파싱 (이중 API 호출 방지)
+TIME_KEYWORDS = ("오전", "오후", "시", "분", "내일", "모레", "다음주",
+                 "월요일", "화요일", "수요일", "목요일", "금요일",
+                 "토요일", "일요일", "월", "일", "날")
+# 대화 중 요약 요청 감지 (/저장 시 직전 요약 재사용)
+SUMMARY_TRIGGER_KEYWORDS = (
+    "요약", "정리", "포맷", "일지", "저장해줘", "기록해줘", "오늘 어땠", "오늘 뭐했"
+)
+
+# 인텐트별 선언형 설정: modes=None 이면 모든 채널에서 활성
+INTENT_RULES = {
+    "memo":    {"keywords": MEMO_TRIGGER_KEYWORDS,    "modes": None},
+    "record":  {"keywords": RECORD_KEYWORDS,          "modes": ("헬스",)},
+    "time":    {"keywords": TIME_KEYWORDS,            "modes": ("일정",)},
+    "summary": {"keywords": SUMMARY_TRIGGER_KEYWORDS, "modes": None},
+}
+
 # ─── SQLite 히스토리 ──────────────────────────────────
+# 긴 메시지 본문(헬스 일지·주간 일정 등)은 zlib 으로 압축해 BLOB 으로 저장. 텍스트/BLOB 타입으로 구분하므로
+# 기존 행과 섞여 있어도 되고, 읽을 때 _unpack (SQL 에서는 unpack()) 으로 투명하게 복원.
+HISTORY_COMPRESS_MIN = int(os.environ.get("HISTORY_COMPRESS_MIN", "1024"))   # 바이트, 0 = 압축 안 함
+
+def _pack(text: str) -> str | bytes:
+    raw = text.encode()
+    if not HISTORY_COMPRESS_MIN or len(raw) < HISTORY_COMPRESS_MIN:
+        return text
+    packed = zlib.compress(raw, 6)
+    return packed if len(packed) < len(raw) else text
+
+def _unpack(value) -> str:
+    return zlib.decompress(value).decode() if isinstance(value, bytes) else value
+
+def _register_codec(conn: sqlite3.Connection):
+    """보관소 FTS 뷰·트리거가 쓰는 unpack() — 보관소를 읽고 쓰는 연결마다 등록"""
+    conn.create_function("unpack", 1, _unpack, deterministic=True)
+
 def init_db():
     with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")   # 새 DB 에만 적용 (기존 DB 는 v5 마이그레이션)
+        conn.execute("PRAGMA journal_mode=WAL")   # 여러 워커 프로세스가 동시에 읽고 씀
+        _register_codec(conn)
         conn.execute("""
             CREATE TABLE IF NOT EXISTS conversation_history (
                 id         INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -220,53 +356,566 @@ def init_db():
                 timestamp  DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        # 채널별 설정 오버라이드 (NULL 컬럼 = 기본값 사용)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS channel_config (
+                channel_id     INTEGER PRIMARY KEY,
+                mode           TEXT,
+                model          TEXT,
+                max_tokens     INTEGER,
+                history_budget INTEGER,
+                cooldown_sec   REAL,
+                updated_at     DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # 메시지별 모델 선택 기록 (정적 MODEL_MAP 대비 지연/비용 비교용)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS model_decisions (
+                id           INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts           DATETIME DEFAULT CURRENT_TIMESTAMP,
+                channel_id   INTEGER NOT NULL,
+                mode         TEXT    NOT NULL,
+                model        TEXT    NOT NULL,
+                static_model TEXT    NOT NULL,
+                reason       TEXT    NOT NULL,
+                score        REAL    NOT NULL,
+                latency_ms   REAL    NOT NULL,
+                input_len    INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_model_decisions_ts ON model_decisions (ts)")
+        # 원격 쓰기 지문 (TTL 동안 같은 일정/할일/메모 재전송 방지)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                fingerprint TEXT PRIMARY KEY,
+                kind        TEXT    NOT NULL,
+                label       TEXT    NOT NULL,
+                expires_at  REAL    NOT NULL,
+                hits        INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at)")
+        # 스케줄러 작업 (재시작해도 유지)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                job_id   TEXT PRIMARY KEY,
+                kind     TEXT NOT NULL,
+                spec     TEXT NOT NULL,
+                next_run REAL NOT NULL,
+                last_run REAL
+            )
+        """)
+        # 이미 보낸 마감 알림 (마감일이 바뀌면 다시 알림)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS todo_reminders_sent (
+                todo_id TEXT NOT NULL,
+                due     TEXT NOT NULL,
+                sent_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (todo_id, due)
+            )
+        """)
+        # 채널별·날짜별 누적 요약 (v1 부터 last_seq 까지 반영됨)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS daily_summary (
+                channel_id      INTEGER NOT NULL,
+                day             TEXT    NOT NULL,
+                summary         TEXT    NOT NULL,
+                last_message_id INTEGER NOT NULL,
+                updated_at      DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (channel_id, day)
+            )
+        """)
+        # 영구 대화 보관소 (conversation_history 는 최근 MAX_HISTORY 개만 유지)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversation_archive (
+                id         INTEGER PRIMARY KEY,
+                channel_id INTEGER NOT NULL,
+                day        TEXT    NOT NULL,   -- KST 날짜 "2026-02-18"
+                role       TEXT    NOT NULL,
+                content    TEXT    NOT NULL,
+                ts         REAL    NOT NULL
+            )
+        """)
         conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_channel "
-            "ON conversation_history (channel_id, timestamp)"
+            "CREATE INDEX IF NOT EXISTS idx_archive_channel_day "
+            "ON conversation_archive (channel_id, day, id)"
+        )
+        _init_archive_fts(conn)
+        conn.commit()
+        run_migrations(conn)
+
+def _init_archive_fts(conn: sqlite3.Connection):
+    """보관소 FTS5 인덱스 + 동기화 트리거 (trigram 미지원 빌드는 unicode61)"""
+    global ARCHIVE_TOKENIZER
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'conversation_archive_fts'"
+    ).fetchone()
+    if row:
+        ARCHIVE_TOKENIZER = "trigram" if "trigram" in row[0] else "unicode61"
+        return
+    # FTS 는 압축을 푼 본문 뷰를 외부 콘텐츠로 씀 (snippet 이 원문을 읽도록)
+    conn.execute("""
+        CREATE VIEW IF NOT EXISTS conversation_archive_text AS
+        SELECT id, unpack(content) AS content FROM conversation_archive
+    """)
+    for tokenizer in ("trigram", "unicode61"):
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE conversation_archive_fts USING fts5("
+                "content, content='conversation_archive_text', content_rowid='id', "
+                f"tokenize='{tokenizer}')"
+            )
+            ARCHIVE_TOKENIZER = tokenizer
+            break
+        except sqlite3.OperationalError:
+            continue
+    else:
+        log("보관소", "FTS5 미지원 SQLite — /검색 은 LIKE 스캔으로 동작", level=logging.WARNING)
+        ARCHIVE_TOKENIZER = None
+        return
+    conn.executescript("""
+        CREATE TRIGGER IF NOT EXISTS conversation_archive_ai AFTER INSERT ON conversation_archive BEGIN
+            INSERT INTO conversation_archive_fts (rowid, content) VALUES (new.id, unpack(new.content));
+        END;
+        CREATE TRIGGER IF NOT EXISTS conversation_archive_ad AFTER DELETE ON conversation_archive BEGIN
+            INSERT INTO conversation_archive_fts (conversation_archive_fts, rowid, content)
+            VALUES ('delete', old.id, unpack(old.content));
+        END;
+    """)
+    # 기존 히스토리를 한 번 옮겨 담기 (보관소가 비어 있을 때만)
+    if not conn.execute("SELECT 1 FROM conversation_archive LIMIT 1").fetchone():
+        conn.execute("""
+            INSERT INTO conversation_archive (channel_id, day, role, content, ts)
+            SELECT channel_id, DATE(timestamp, '+9 hours'), role, content,
+                   CAST(strftime('%s', timestamp) AS REAL)
+            FROM conversation_history ORDER BY id
+        """)
+    conn.execute(
+        "INSERT INTO conversation_archive_fts (conversation_archive_fts) VALUES ('rebuild')"
+    )
+    log("보관소", "FTS5 인덱스 생성", tokenizer=ARCHIVE_TOKENIZER)
+
+# ─── 스키마 마이그레이션 ──────────────────────────────
+# init_db 의 CREATE 문은 v0 스키마. 이후 변경은 여기에 함수로 추가하고
+# PRAGMA user_version 으로 어디까지 적용됐는지 기록. 각 함수는 중간에 끊겨도 다시 돌릴 수 있게.
+MIGRATION_BATCH = 5000
+
+def _columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+def _migrate_history_day_seq(conn: sqlite3.Connection):
+    """conversation_history 에 KST day + 채널별 seq 추가"""
+    cols = _columns(conn, "conversation_history")
+    if "day" not in cols:
+        conn.execute("ALTER TABLE conversation_history ADD COLUMN day TEXT")
+    if "seq" not in cols:
+        conn.execute("ALTER TABLE conversation_history ADD COLUMN seq INTEGER")
+    # 채널별 마지막 seq (히스토리를 지워도 계속 증가)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS history_seq (
+            channel_id INTEGER PRIMARY KEY,
+            seq        INTEGER NOT NULL
+        )
+    """)
+    conn.commit()
+
+    # 배치 단위 backfill — id 순서대로 seq 부여, 배치마다 커밋
+    cursor = conn.execute(
+        "SELECT COALESCE(MAX(id), 0) FROM conversation_history WHERE seq IS NOT NULL"
+    ).fetchone()[0]
+    counters = dict(conn.execute("SELECT channel_id, seq FROM history_seq").fetchall())
+    while True:
+        rows = conn.execute(
+            "SELECT id, channel_id FROM conversation_history "
+            "WHERE id > ? ORDER BY id LIMIT ?",
+            (cursor, MIGRATION_BATCH)
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row_id, channel_id in rows:
+            counters[channel_id] = counters.get(channel_id, 0) + 1
+            updates.append((counters[channel_id], row_id))
+        conn.executemany(
+            "UPDATE conversation_history SET seq = ?, day = DATE(timestamp, '+9 hours') WHERE id = ?",
+            updates
+        )
+        conn.executemany(
+            "INSERT INTO history_seq (channel_id, seq) VALUES (?, ?) "
+            "ON CONFLICT (channel_id) DO UPDATE SET seq = excluded.seq",
+            counters.items()
+        )
+        conn.commit()
+        cursor = rows[-1][0]
+
+    conn.execute("DROP INDEX IF EXISTS idx_channel")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_history_channel_seq "
+        "ON conversation_history (channel_id, seq)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_history_channel_day "
+        "ON conversation_history (channel_id, day, seq)"
+    )
+    # 일일 요약 커서도 id → seq
+    if "last_message_id" in _columns(conn, "daily_summary"):
+        conn.execute("""
+            UPDATE daily_summary SET last_message_id = COALESCE((
+                SELECT MAX(h.seq) FROM conversation_history h
+                WHERE h.channel_id = daily_summary.channel_id
+                  AND h.id <= daily_summary.last_message_id
+            ), 0)
+        """)
+        conn.execute("ALTER TABLE daily_summary RENAME COLUMN last_message_id TO last_seq")
+
+def _migrate_usage_ledger(conn: sqlite3.Connection):
+    """Anthropic 호출 사용량 장부 + 일별 롤업"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS usage_ledger (
+            id            INTEGER PRIMARY KEY,
+            ts            REAL    NOT NULL,
+            day           TEXT    NOT NULL,   -- KST
+            channel_id    INTEGER,            -- NULL = 채널 없는 백그라운드 호출
+            purpose       TEXT    NOT NULL,
+            model         TEXT    NOT NULL,
+            input_tokens  INTEGER NOT NULL,
+            output_tokens INTEGER NOT NULL,
+            cache_read    INTEGER NOT NULL,
+            cache_write   INTEGER NOT NULL,
+            latency_ms    REAL    NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_ledger_day ON usage_ledger (day)")
+    # 호출마다 같은 트랜잭션에서 누적 → 조회는 전체 스캔 없이 날짜 범위만
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS usage_daily (
+            day           TEXT    NOT NULL,
+            channel_id    INTEGER NOT NULL,   -- 0 = 채널 없음
+            purpose       TEXT    NOT NULL,
+            model         TEXT    NOT NULL,
+            calls         INTEGER NOT NULL,
+            input_tokens  INTEGER NOT NULL,
+            output_tokens INTEGER NOT NULL,
+            cache_read    INTEGER NOT NULL,
+            cache_write   INTEGER NOT NULL,
+            latency_ms    REAL    NOT NULL,   -- 합계
+            PRIMARY KEY (day, channel_id, purpose, model)
+        )
+    """)
+
+def _migrate_shared_state(conn: sqlite3.Connection):
+    """프로세스 간 공유 상태: 쿨다운 + 확인 대기"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key  TEXT PRIMARY KEY,
+            last REAL NOT NULL
         )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pending_interactions (
+            key        TEXT PRIMARY KEY,
+            data       TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+
+def _migrate_pending_work(conn: sqlite3.Connection):
+    """재시작 후 재생할 작업 저널 (처리 중 턴, 코그가 보관한 작업)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pending_work (
+            key        TEXT PRIMARY KEY,   -- "turn:{message_id}" | 확인 대기 키
+            kind       TEXT    NOT NULL,   -- turn | view (코그 resume_work)
+            channel_id INTEGER NOT NULL,
+            payload    TEXT    NOT NULL,
+            state      TEXT    NOT NULL,   -- running | deferred | replied (v7)
+            attempts   INTEGER NOT NULL DEFAULT 0,
+            created_at REAL    NOT NULL,
+            updated_at REAL    NOT NULL
+        )
+    """)
+
+def _migrate_storage_maintenance(conn: sqlite3.Connection):
+    """증분 vacuum 전환 + 보관소 FTS 를 압축 해제 뷰 기준으로 재구성"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # 기존 DB 는 VACUUM 한 번으로만 바뀜 (DB 크기만큼 시간이 걸리는 1회성 작업)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.commit()
+        conn.execute("VACUUM")
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'conversation_archive_fts'"
+    ).fetchone()
+    if row and "conversation_archive_text" not in row[0]:
+        conn.executescript("""
+            DROP TRIGGER IF EXISTS conversation_archive_ai;
+            DROP TRIGGER IF EXISTS conversation_archive_ad;
+            DROP TABLE conversation_archive_fts;
+        """)
+        _init_archive_fts(conn)
+
+def _migrate_confirmations(conn: sqlite3.Connection):
+    """확인 버튼 대기 내용 (custom_id 토큰 키) — pending_interactions 대체"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS confirmations (
+            token      TEXT PRIMARY KEY,   -- 버튼 custom_id 에 들어가는 키
+            kind       TEXT    NOT NULL,   -- register_confirm 으로 등록한 흐름
+            channel_id INTEGER NOT NULL,
+            message_id INTEGER,            -- 전송 후 채움 (만료 시 버튼 제거용)
+            data       TEXT    NOT NULL,
+            expires_at REAL    NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_confirmations_expires ON confirmations (expires_at)")
+    conn.execute("DROP TABLE IF EXISTS pending_interactions")
+
+def _migrate_journal_owner(conn: sqlite3.Connection):
+    """저널 행 소유 인스턴스 + 인스턴스 생존 신호"""
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(pending_work)")}
+    if "owner" not in cols:
+        conn.execute("ALTER TABLE pending_work ADD COLUMN owner TEXT")   # NULL = 이전 버전이 남긴 행
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS worker_heartbeats (
+            instance TEXT PRIMARY KEY,   -- INSTANCE_ID
+            beat     REAL NOT NULL
+        )
+    """)
+
+def _migrate_confirm_claims(conn: sqlite3.Connection):
+    """확인 처리 중 표시 (성공해야 행 삭제, 실패하면 다시 누를 수 있게)"""
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(confirmations)")}
+    if "claimed_until" not in cols:
+        conn.execute("ALTER TABLE confirmations ADD COLUMN claimed_until REAL")
+
+def _migrate_archive_seq(conn: sqlite3.Connection):
+    """보관소에 히스토리 seq 기록 (증분 요약이 잘린 히스토리 대신 보관소를 읽도록)"""
+    if "seq" not in _columns(conn, "conversation_archive"):
+        conn.execute("ALTER TABLE conversation_archive ADD COLUMN seq INTEGER")
+    # 기존 행은 seq 가 NULL — 요약 커서(last_seq)와 비교할 수 없으니 delta 에선 빠짐
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_archive_channel_day_seq "
+        "ON conversation_archive (channel_id, day, seq)"
+    )
+
+SCHEMA_MIGRATIONS = [
+    _migrate_history_day_seq,      # v1
+    _migrate_usage_ledger,         # v2
+    _migrate_shared_state,         # v3
+    _migrate_pending_work,         # v4
+    _migrate_storage_maintenance,  # v5
+    _migrate_confirmations,        # v6
+    _migrate_journal_owner,        # v7
+    _migrate_confirm_claims,       # v8
+    _migrate_archive_seq,          # v9
+]
+
+def run_migrations(conn: sqlite3.Connection):
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    for version, migrate in enumerate(SCHEMA_MIGRATIONS[current:], start=current + 1):
+        t0 = time.perf_counter()
+        migrate(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
         conn.commit()
+        log("마이그레이션", f"v{version}: {migrate.__doc__}", version=version, latency_ms=ms_since(t0))
 
 def _get_history(channel_id: int) -> list[dict]:
     with sqlite3.connect(DB_PATH) as conn:
         rows = conn.execute(
             "SELECT role, content FROM conversation_history "
-            "WHERE channel_id = ? ORDER BY timestamp",
+            "WHERE channel_id = ? ORDER BY seq",
             (channel_id,)
         ).fetchall()
-    return [{"role": r[0], "content": r[1]} for r in rows]
+    return [{"role": r[0], "content": _unpack(r[1])} for r in rows]
 
 def _get_today_history(channel_id: int) -> list[dict]:
     """오늘 날짜의 대화만 가져오기 (요약/저장 시 사용)"""
-    today = date.today().isoformat()  # "2026-02-18"
+    today = kst_today().isoformat()  # "2026-02-18"
     with sqlite3.connect(DB_PATH) as conn:
         rows = conn.execute(
             "SELECT role, content FROM conversation_history "
-            "WHERE channel_id = ? AND DATE(timestamp) = ? ORDER BY timestamp",
+            "WHERE channel_id = ? AND day = ? ORDER BY seq",
             (channel_id, today)
         ).fetchall()
-    return [{"role": r[0], "content": r[1]} for r in rows]
+    return [{"role": r[0], "content": _unpack(r[1])} for r in rows]
+
+def _get_today_messages_after(channel_id: int, after_seq: int) -> list[dict]:
+    """오늘 대화 중 after_seq 이후 메시지만 (증분 요약용)
+    conversation_history 는 MAX_HISTORY 개로 잘리므로, 요약이 밀려도 빠지지 않게 보관소에서 읽음"""
+    today = kst_today().isoformat()
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute(
+            "SELECT seq, role, content FROM conversation_archive "
+            "WHERE channel_id = ? AND day = ? AND seq > ? ORDER BY seq",
+            (channel_id, today, after_seq)
+        ).fetchall()
+    return [{"seq": r[0], "role": r[1], "content": _unpack(r[2])} for r in rows]
+
+def _get_daily_summary(channel_id: int, day: str) -> tuple[str, int] | None:
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute(
+            "SELECT summary, last_seq FROM daily_summary "
+            "WHERE channel_id = ? AND day = ?",
+            (channel_id, day)
+        ).fetchone()
+    return (row[0], row[1]) if row else None
+
+def _save_daily_summary(channel_id: int, day: str, summary: str, last_seq: int):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("""
+            INSERT INTO daily_summary (channel_id, day, summary, last_seq)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (channel_id, day) DO UPDATE SET
+                summary    = excluded.summary,
+                last_seq   = excluded.last_seq,
+                updated_at = CURRENT_TIMESTAMP
+        """, (channel_id, day, summary, last_seq))
+        conn.commit()
 
 def _add_message(channel_id: int, role: str, content: str):
+    day = kst_today().isoformat()
     with sqlite3.connect(DB_PATH) as conn:
+        seq = conn.execute(
+            "INSERT INTO history_seq (channel_id, seq) VALUES (?, 1) "
+            "ON CONFLICT (channel_id) DO UPDATE SET seq = seq + 1 RETURNING seq",
+            (channel_id,)
+        ).fetchone()[0]
         conn.execute(
-            "INSERT INTO conversation_history (channel_id, role, content) VALUES (?, ?, ?)",
-            (channel_id, role, content)
+            "INSERT INTO conversation_history (channel_id, role, content, day, seq) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (channel_id, role, _pack(content), day, seq)
         )
+        _insert_archive(conn, channel_id, day, role, content, seq)
+        # seq 가 연속이므로 최근 MAX_HISTORY 개 밖은 인덱스 범위 삭제
+        conn.execute(
+            "DELETE FROM conversation_history WHERE channel_id = ? AND seq <= ?",
+            (channel_id, seq - MAX_HISTORY)
+        )
+        conn.commit()
+
+def _insert_archive(conn: sqlite3.Connection, channel_id: int, day: str, role: str, content: str,
+                    seq: int):
+    _register_codec(conn)   # FTS 트리거가 unpack() 을 부름
+    conn.execute(
+        "INSERT INTO conversation_archive (channel_id, day, role, content, ts, seq) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (channel_id, day, role, _pack(content), time.time(), seq)
+    )
+
+def _archive_message(channel_id: int, day: str, role: str, content: str, seq: int):
+    """히스토리를 Redis 에 둘 때도 보관소(검색·증분 요약)는 로컬 SQLite 에"""
+    with sqlite3.connect(DB_PATH) as conn:
+        _insert_archive(conn, channel_id, day, role, content, seq)
+        conn.commit()
+
+def _reset_daily_summary(conn: sqlite3.Connection, channel_id: int, floor_seq: int):
+    """요약을 지우고 오늘 커서를 floor_seq 로 — 보관소에 남은 초기화 전 대화가 다시 요약되지 않게"""
+    conn.execute("DELETE FROM daily_summary WHERE channel_id = ?", (channel_id,))
+    conn.execute(
+        "INSERT INTO daily_summary (channel_id, day, summary, last_seq) VALUES (?, ?, '', ?)",
+        (channel_id, kst_today().isoformat(), floor_seq)
+    )
+
+def _clear_daily_summary(channel_id: int, floor_seq: int):
+    with sqlite3.connect(DB_PATH) as conn:
+        _reset_daily_summary(conn, channel_id, floor_seq)
+        conn.commit()
+
+def _hit_cooldown(key: str, cooldown_sec: float) -> float:
+    """쿨다운이 지났으면 지금 시각을 기록하고 0, 아니면 남은 초"""
+    now = time.time()
+    with sqlite3.connect(DB_PATH) as conn:
+        cur = conn.execute("""
+            INSERT INTO rate_limits (key, last) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET last = excluded.last
+            WHERE excluded.last - rate_limits.last >= ?
+        """, (key, now, cooldown_sec))
+        if cur.rowcount:
+            conn.commit()
+            return 0.0
+        last = conn.execute("SELECT last FROM rate_limits WHERE key = ?", (key,)).fetchone()[0]
+    return max(cooldown_sec - (now - last), 0.001)
+
+def _drop_dangling_user(channel_id: int, content: str) -> bool:
+    """같은 내용의 가장 최근 user 메시지가 답(바로 다음 assistant)을 못 받았으면 삭제 (재생 시 중복 방지)"""
+    with sqlite3.connect(DB_PATH) as conn:
+        cur = conn.execute("""
+            DELETE FROM conversation_history WHERE id = (
+                SELECT h.id FROM conversation_history h
+                WHERE h.channel_id = ? AND h.role = 'user' AND h.content IN (?, ?)
+                ORDER BY h.seq DESC LIMIT 1
+            ) AND NOT EXISTS (
+                SELECT 1 FROM conversation_history n
+                WHERE n.channel_id = conversation_history.channel_id
+                  AND n.seq = conversation_history.seq + 1 AND n.role = 'assistant'
+            )
+        """, (channel_id, content, _pack(content)))
+        conn.commit()
+        return cur.rowcount > 0
+
+def _journal_put(key: str, kind: str, channel_id: int, payload: dict, state: str):
+    """작업 기록·상태 변경. 이미 답을 보낸(replied) 턴은 되돌리지 않음."""
+    now = time.time()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("""
+            INSERT INTO pending_work (key, kind, channel_id, payload, state, owner, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET state = excluded.state, owner = excluded.owner,
+                                            updated_at = excluded.updated_at
+            WHERE pending_work.state != 'replied'
+        """, (key, kind, channel_id, json.dumps(payload, ensure_ascii=False), state, INSTANCE_ID, now, now))
+        conn.commit()
+
+def _journal_done(key: str):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("DELETE FROM pending_work WHERE key = ?", (key,))
+        conn.commit()
+
+# 소유 인스턴스가 REPLAY_STALE_SEC 동안 생존 신호가 없는 행 (NULL = 이전 버전이 남긴 행)
+_JOURNAL_ORPHAN = "(owner IS NULL OR owner NOT IN (SELECT instance FROM worker_heartbeats WHERE beat >= ?))"
+
+def _journal_beat():
+    now = time.time()
+    with sqlite3.connect(DB_PATH) as conn:
         conn.execute("""
-            DELETE FROM conversation_history
-            WHERE channel_id = ?
-              AND id NOT IN (
-                  SELECT id FROM conversation_history
-                  WHERE channel_id = ?
-                  ORDER BY timestamp DESC
-                  LIMIT ?
-              )
-        """, (channel_id, channel_id, MAX_HISTORY))
+            INSERT INTO worker_heartbeats (instance, beat) VALUES (?, ?)
+            ON CONFLICT (instance) DO UPDATE SET beat = excluded.beat
+        """, (INSTANCE_ID, now))
+        conn.execute("DELETE FROM worker_heartbeats WHERE beat < ?", (now - 86400,))
         conn.commit()
 
+def _journal_retire():
+    """정상 종료: 생존 신호를 지워 남긴 작업을 다른 인스턴스가 바로 가져가게"""
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("DELETE FROM worker_heartbeats WHERE instance = ?", (INSTANCE_ID,))
+        conn.commit()
+
+def _journal_replayable() -> list[tuple]:
+    """보류됐거나 죽은 인스턴스가 "처리 중" 으로 남긴 작업 (생성 순)"""
+    alive_since = time.time() - REPLAY_STALE_SEC
+    with sqlite3.connect(DB_PATH) as conn:
+        # 답을 이미 보낸 턴은 후처리만 못 끝낸 것 — 다시 답하지 않고 버림
+        conn.execute(f"DELETE FROM pending_work WHERE state = 'replied' AND {_JOURNAL_ORPHAN}", (alive_since,))
+        conn.commit()
+        return conn.execute(f"""
+            SELECT key, kind, channel_id, payload, attempts FROM pending_work
+            WHERE state = 'deferred' OR (state = 'running' AND {_JOURNAL_ORPHAN})
+            ORDER BY created_at
+        """, (alive_since,)).fetchall()
+
+def _journal_claim(key: str) -> bool:
+    """재생할 작업을 이 인스턴스가 가져감 (다른 워커와 중복 재생 방지)"""
+    now = time.time()
+    with sqlite3.connect(DB_PATH) as conn:
+        cur = conn.execute(f"""
+            UPDATE pending_work SET state = 'running', owner = ?, attempts = attempts + 1, updated_at = ?
+            WHERE key = ? AND (state = 'deferred' OR (state = 'running' AND {_JOURNAL_ORPHAN}))
+        """, (INSTANCE_ID, now, key, now - REPLAY_STALE_SEC))
+        conn.commit()
+        return cur.rowcount == 1
+
 def _clear_history(channel_id: int):
     with sqlite3.connect(DB_PATH) as conn:
         conn.execute("DELETE FROM conversation_history WHERE channel_id = ?", (channel_id,))
+        row = conn.execute("SELECT seq FROM history_seq WHERE channel_id = ?", (channel_id,)).fetchone()
+        _reset_daily_summary(conn, channel_id, row[0] if row else 0)
         conn.commit()
 
 def _count_history(channel_id: int) -> int:
@@ -276,143 +925,1608 @@ def _count_history(channel_id: int) -> int:
             (channel_id,)
         ).fetchone()[0]
 
+# ─── 대화 보관소 검색 ─────────────────────────────────
+# trigram 은 3글자 이상 검색어만 인덱스를 탄다. 더 짧은 검색어(예: "치과")는
+# 인덱스 결과를 LIKE 로 한 번 더 거르고, 전부 짧으면 채널 범위 LIKE 스캔으로 대체.
+ARCHIVE_TOKENIZER: str | None = None
+ARCHIVE_SEARCH_LIMIT = 10
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+def _like_snippet(content: str, terms: list[str], width: int = 40) -> str:
+    lowered = content.lower()
+    pos = min((lowered.find(t.lower()) for t in terms if t.lower() in lowered), default=0)
+    start = max(0, pos - width // 2)
+    text = content[start:start + width * 2].replace("\n", " ")
+    return ("…" if start else "") + text + ("…" if start + width * 2 < len(content) else "")
+
+def _search_archive(channel_id: int, query: str, limit: int = ARCHIVE_SEARCH_LIMIT) -> list[dict]:
+    """채널 보관소에서 query 검색 (bm25 순위 + 하이라이트 스니펫)"""
+    terms = query.split()
+    if not terms:
+        return []
+    if ARCHIVE_TOKENIZER == "trigram":
+        indexed = [t for t in terms if len(t) >= 3]
+    elif ARCHIVE_TOKENIZER == "unicode61":
+        indexed = terms
+    else:
+        indexed = []
+    short     = [t for t in terms if t not in indexed]
+    likes     = "".join(" AND unpack(a.content) LIKE ?" for _ in short)
+    like_args = [f"%{t}%" for t in short]
+    with sqlite3.connect(DB_PATH) as conn:
+        _register_codec(conn)
+        if indexed:
+            if ARCHIVE_TOKENIZER == "trigram":
+                match = " AND ".join(_fts_phrase(t) for t in indexed)
+            else:   # unicode61: 조사가 붙은 단어도 잡도록 접두어 검색
+                match = " AND ".join(_fts_phrase(t) + "*" for t in indexed)
+            rows = conn.execute(f"""
+                SELECT a.day, a.role,
+                       snippet(conversation_archive_fts, 0, '**', '**', '…', 16)
+                FROM conversation_archive_fts f
+                JOIN conversation_archive a ON a.id = f.rowid
+                WHERE conversation_archive_fts MATCH ? AND a.channel_id = ?{likes}
+                ORDER BY bm25(conversation_archive_fts)
+                LIMIT ?
+            """, (match, channel_id, *like_args, limit)).fetchall()
+            return [{"day": r[0], "role": r[1], "snippet": r[2]} for r in rows]
+        rows = conn.execute(f"""
+            SELECT a.day, a.role, a.content FROM conversation_archive a
+            WHERE a.channel_id = ?{likes}
+            ORDER BY a.id DESC
+            LIMIT ?
+        """, (channel_id, *like_args, limit)).fetchall()
+    return [{"day": r[0], "role": r[1], "snippet": _like_snippet(_unpack(r[2]), short)} for r in rows]
+
+def _archive_stats(channel_id: int) -> tuple[int, str | None]:
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute(
+            "SELECT COUNT(*), MIN(day) FROM conversation_archive WHERE channel_id = ?",
+            (channel_id,)
+        ).fetchone()
+
+async def search_archive(channel_id: int, query: str) -> list[dict]:
+    return await asyncio.to_thread(_search_archive, channel_id, query)
+
+async def archive_stats(channel_id: int) -> tuple[int, str | None]:
+    return await asyncio.to_thread(_archive_stats, channel_id)
+
+# ─── 저장소 유지보수 ──────────────────────────────────
+# _add_message 가 매번 지우는 히스토리 행, 만료된 상태 행 때문에 history.db 는 빈 페이지가 쌓임.
+# 증분 vacuum 으로 빈 페이지를 조금씩 돌려주되 일부는 남겨 다음 쓰기가 재사용하게 하고,
+# 용량 상한을 넘으면 오래된 것부터 (원본이 롤업에 남는 장부 → 모델 선택 기록 → 보관소) 지움.
+STORAGE_MAINTENANCE_SEC = int(os.environ.get("STORAGE_MAINTENANCE_SEC", "3600"))
+STORAGE_MAX_MB          = float(os.environ.get("STORAGE_MAX_MB", "0"))   # 0 = 상한 없음
+STORAGE_ARCHIVE_KEEP_DAYS = int(os.environ.get("STORAGE_ARCHIVE_KEEP_DAYS", "30"))   # 상한을 넘어도 이 기간 보관소는 유지
+STORAGE_FREE_RESERVE    = 256    # 남겨둘 빈 페이지 (바로 다시 쓰일 몫)
+STORAGE_BATCH           = 500    # 삭제·압축 배치 크기 (배치마다 커밋해 다른 워커를 오래 막지 않음)
+STORAGE_MAX_BATCHES     = 200    # 한 번 실행에서 최대 배치 수
+
+# (테이블, 나이 기준 SQL, 최소 보관 일수) — 앞에서부터 지움
+STORAGE_EVICTION = (
+    ("usage_ledger",         "ts < ?",                        30),   # 합계는 usage_daily 에 남음
+    ("model_decisions",      "ts < datetime(?, 'unixepoch')", 30),
+    ("conversation_archive", "ts < ?",                        STORAGE_ARCHIVE_KEEP_DAYS),
+)
+
+_storage_last: dict = {}   # 직전 실행 결과 (페이지 재사용 계산 + /진단)
+
+def _page_stats(conn: sqlite3.Connection) -> dict:
+    page_size, pages, free = (conn.execute(f"PRAGMA {p}").fetchone()[0]
+                              for p in ("page_size", "page_count", "freelist_count"))
+    return {"page_size": page_size, "pages": pages, "free": free,
+            "live_bytes": (pages - free) * page_size}
+
+def _evict_for_budget(conn: sqlite3.Connection) -> dict[str, int]:
+    """live 용량이 STORAGE_MAX_MB 아래로 갈 때까지 오래된 행 삭제"""
+    budget  = STORAGE_MAX_MB * 1024 * 1024
+    evicted: dict[str, int] = {}
+    batches = 0
+    for table, older, keep_days in STORAGE_EVICTION:
+        cutoff = time.time() - keep_days * 86400
+        while _page_stats(conn)["live_bytes"] > budget and batches < STORAGE_MAX_BATCHES:
+            cur = conn.execute(
+                f"DELETE FROM {table} WHERE id IN "
+                f"(SELECT id FROM {table} WHERE {older} ORDER BY id LIMIT ?)",
+                (cutoff, STORAGE_BATCH)
+            )
+            conn.commit()
+            batches += 1
+            if not cur.rowcount:
+                break
+            evicted[table] = evicted.get(table, 0) + cur.rowcount
+    return evicted
+
+def _compress_backlog(conn: sqlite3.Connection) -> tuple[int, int, int]:
+    """압축 도입 전에 들어간 긴 본문을 배치로 압축 → (행 수, 원래 바이트, 압축 후 바이트)
+    FTS 는 원문 기준이라 UPDATE 해도 인덱스는 그대로."""
+    rows = before = after = 0
+    if not HISTORY_COMPRESS_MIN:
+        return rows, before, after
+    for table in ("conversation_archive", "conversation_history"):
+        cursor = 0
+        for _ in range(STORAGE_MAX_BATCHES):
+            batch = conn.execute(
+                f"SELECT id, content FROM {table} "
+                "WHERE id > ? AND typeof(content) = 'text' AND length(CAST(content AS BLOB)) >= ? "
+                "ORDER BY id LIMIT ?",
+                (cursor, HISTORY_COMPRESS_MIN, STORAGE_BATCH)
+            ).fetchall()
+            if not batch:
+                break
+            cursor = batch[-1][0]
+            packed = []
+            for row_id, content in batch:
+                p = _pack(content)
+                if isinstance(p, bytes):   # 압축해도 안 줄어드는 행은 텍스트 그대로
+                    packed.append((p, row_id))
+                    before += len(content.encode())
+                    after  += len(p)
+            if packed:
+                conn.executemany(f"UPDATE {table} SET content = ? WHERE id = ?", packed)
+                conn.commit()
+            rows += len(packed)
+            if len(batch) < STORAGE_BATCH:
+                break
+    return rows, before, after
+
+def _run_storage_maintenance(full: bool) -> dict:
+    """만료 정리 → 용량 상한 → 증분 vacuum → WAL 정리. full 이면 압축 backlog·ANALYZE·FTS 병합까지"""
+    t0  = time.perf_counter()
+    now = time.time()
+    with sqlite3.connect(DB_PATH) as conn:
+        _register_codec(conn)   # 보관소 삭제 시 FTS 트리거가 unpack() 을 부름
+        start = _page_stats(conn)
+        conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM rate_limits WHERE last < ?", (now - 86400,))
+        conn.commit()
+        result = {"ts": now, "full": full, "evicted": {}, "compressed": (0, 0, 0)}
+        if full:
+            result["compressed"] = _compress_backlog(conn)
+        if STORAGE_MAX_MB:
+            result["evicted"] = _evict_for_budget(conn)
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        release = max(free - STORAGE_FREE_RESERVE, 0)
+        if release:   # execute() 는 한 단계만 돌아 1페이지만 반환됨 → executescript 로 끝까지
+            conn.executescript(f"PRAGMA incremental_vacuum({release});")
+        if full:
+            conn.execute("PRAGMA analysis_limit=1000")
+            conn.execute("ANALYZE")
+            if ARCHIVE_TOKENIZER:
+                conn.execute("INSERT INTO conversation_archive_fts (conversation_archive_fts, rank) VALUES ('merge', 500)")
+            conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        end = _page_stats(conn)
+    # 직전 실행 이후 쓰기가 빈 페이지를 재사용한 몫 vs 파일을 늘린 몫
+    prev = _storage_last
+    if prev:
+        result["reused_pages"] = max(prev["end"]["free"] - start["free"], 0)
+        result["grown_pages"]  = max(start["pages"] - prev["end"]["pages"], 0)
+    result.update(start=start, end=end, released_pages=release, latency_ms=ms_since(t0))
+    _storage_last.clear()
+    _storage_last.update(result)
+    log("저장소 정리", f"{start['pages']}→{end['pages']} 페이지 (반환 {release})",
+        evicted=result["evicted"] or None, compressed=result["compressed"][0] or None,
+        latency_ms=result["latency_ms"])
+    return result
+
+def _storage_report() -> str:
+    with sqlite3.connect(DB_PATH) as conn:
+        ps = _page_stats(conn)
+        mode = {0: "없음", 1: "전체", 2: "증분"}.get(conn.execute("PRAGMA auto_vacuum").fetchone()[0], "?")
+        try:
+            tables = conn.execute("""
+                SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC LIMIT 10
+            """).fetchall()
+        except sqlite3.OperationalError:   # dbstat 없는 빌드
+            tables = []
+        packed = {t: conn.execute(
+            f"SELECT COUNT(*), SUM(typeof(content) = 'blob') FROM {t}").fetchone()
+            for t in ("conversation_history", "conversation_archive")}
+    wal = os.path.getsize(DB_PATH + "-wal") if os.path.exists(DB_PATH + "-wal") else 0
+    mb  = lambda b: f"{b / 1024 / 1024:.1f}MB"
+    lines = [
+        f"history.db {mb(ps['pages'] * ps['page_size'])} (사용 {mb(ps['live_bytes'])}, WAL {mb(wal)}) — "
+        f"상한 {f'{STORAGE_MAX_MB:g}MB' if STORAGE_MAX_MB else '없음'}, auto_vacuum {mode}",
+        f"페이지 {ps['pages']} × {ps['page_size']}B · 빈 페이지 {ps['free']} (재사용 대기, 예비 {STORAGE_FREE_RESERVE})",
+        f"압축 ({'≥' + str(HISTORY_COMPRESS_MIN) + 'B' if HISTORY_COMPRESS_MIN else '끔'}): " + " · ".join(
+            f"{t} {n_packed or 0}/{n}행" for t, (n, n_packed) in packed.items()),
+    ]
+    last = _storage_last
+    if last:
+        ago = (time.time() - last["ts"]) / 60
+        line = (f"직전 정리 {ago:.0f}분 전{' (전체)' if last['full'] else ''}: "
+                f"{last['start']['pages']}→{last['end']['pages']} 페이지, 반환 {last['released_pages']}, "
+                f"{last['latency_ms']:.0f}ms")
+        if "reused_pages" in last:
+            total = last["reused_pages"] + last["grown_pages"]
+            rate  = f"{last['reused_pages'] / total:.0%}" if total else "-"
+            line += f" · 그 전 구간 쓰기: 재사용 {last['reused_pages']} / 새 페이지 {last['grown_pages']} (재사용률 {rate})"
+        lines.append(line)
+        rows, before, after = last["compressed"]
+        if rows:
+            lines.append(f"  압축 backlog {rows}행 {mb(before)} → {mb(after)}")
+        if last["evicted"]:
+            lines.append("  상한 초과로 삭제: " + ", ".join(f"{t} {n}행" for t, n in last["evicted"].items()))
+    if tables:
+        lines.append("")
+        lines.append("용량 상위 (dbstat):")
+        lines += [f"  {name:<34} {mb(size)}" for name, size in tables]
+    return "\n".join(lines)
+
+async def run_storage_maintenance(full: bool = False) -> dict:
+    return await asyncio.to_thread(_run_storage_maintenance, full)
+
+async def storage_report() -> str:
+    return await asyncio.to_thread(_storage_report)
+
+async def _job_storage_maintenance(job: dict):
+    await run_storage_maintenance(full=job["spec"].get("full", False))
+
+# ─── 상태 백엔드 ──────────────────────────────────────
+# 히스토리·쿨다운·확인 버튼 대기 상태는 프로세스 메모리 대신 백엔드에 둬서
+# 샤드 워커 여러 개가 같은 상태를 봄. 보관소·요약·장부·설정은 항상 로컬 SQLite.
+class SqliteStateBackend:
+    """단일 호스트: history.db (WAL) 를 워커 프로세스들이 공유"""
+    name = "sqlite"
+
+    async def get_history(self, channel_id: int) -> list[dict]:
+        return await asyncio.to_thread(_get_history, channel_id)
+
+    async def get_today_history(self, channel_id: int) -> list[dict]:
+        return await asyncio.to_thread(_get_today_history, channel_id)
+
+    async def get_today_messages_after(self, channel_id: int, after_seq: int) -> list[dict]:
+        return await asyncio.to_thread(_get_today_messages_after, channel_id, after_seq)
+
+    async def add_message(self, channel_id: int, role: str, content: str):
+        await asyncio.to_thread(_add_message, channel_id, role, content)
+
+    async def clear_history(self, channel_id: int):
+        await asyncio.to_thread(_clear_history, channel_id)
+
+    async def count_history(self, channel_id: int) -> int:
+        return await asyncio.to_thread(_count_history, channel_id)
+
+    async def drop_dangling_user(self, channel_id: int, content: str) -> bool:
+        return await asyncio.to_thread(_drop_dangling_user, channel_id, content)
+
+    async def hit_cooldown(self, key: str, cooldown_sec: float) -> float:
+        return await asyncio.to_thread(_hit_cooldown, key, cooldown_sec)
+
+    async def confirm_put(self, token: str, kind: str, channel_id: int, data: dict, ttl_sec: float):
+        await asyncio.to_thread(_confirm_put, token, kind, channel_id, data, ttl_sec)
+
+    async def confirm_attach(self, token: str, message_id: int):
+        await asyncio.to_thread(_confirm_attach, token, message_id)
+
+    async def confirm_claim(self, token: str) -> tuple[str, dict | None]:
+        return await asyncio.to_thread(_confirm_claim, token)
+
+    async def confirm_release(self, token: str):
+        await asyncio.to_thread(_confirm_release, token)
+
+    async def confirm_cancel(self, token: str) -> str:
+        return await asyncio.to_thread(_confirm_cancel, token)
+
+    async def confirm_expired(self) -> list[tuple]:
+        return await asyncio.to_thread(_confirm_expired)
+
+    async def confirm_drop(self, token: str) -> bool:
+        return await asyncio.to_thread(_confirm_drop, token)
+
+    async def close(self):
+        pass
+
+class RedisStateBackend:
+    """여러 호스트: 채널별 리스트(최근 MAX_HISTORY 개) + INCR seq, 쿨다운은 SET NX PX"""
+    name = "redis"
+
+    def __init__(self, client, prefix: str = REDIS_PREFIX):
+        self._r      = client   # redis.asyncio.Redis (테스트에선 fakeredis 로 대체 가능)
+        self._prefix = prefix
+
+    def _key(self, *parts) -> str:
+        return self._prefix + ":".join(str(p) for p in parts)
+
+    async def _entries(self, channel_id: int) -> list[dict]:
+        """저장된 항목 그대로 (seq·day 포함) — 밖으로는 SQLite 백엔드와 같은 {role, content} 만"""
+        raw = await self._r.lrange(self._key("hist", channel_id), 0, -1)
+        return [json.loads(m) for m in raw]
+
+    async def get_history(self, channel_id: int) -> list[dict]:
+        return [{"role": m["role"], "content": m["content"]} for m in await self._entries(channel_id)]
+
+    async def get_today_history(self, channel_id: int) -> list[dict]:
+        today = kst_today().isoformat()
+        return [{"role": m["role"], "content": m["content"]}
+                for m in await self._entries(channel_id) if m["day"] == today]
+
+    async def get_today_messages_after(self, channel_id: int, after_seq: int) -> list[dict]:
+        # 리스트는 MAX_HISTORY 개로 잘리므로 로컬 보관소에서 (add_message 가 같은 seq 로 기록)
+        return await asyncio.to_thread(_get_today_messages_after, channel_id, after_seq)
+
+    async def add_message(self, channel_id: int, role: str, content: str):
+        day = kst_today().isoformat()
+        seq = await self._r.incr(self._key("seq", channel_id))
+        entry = json.dumps({"seq": seq, "day": day, "role": role, "content": content},
+                           ensure_ascii=False)
+        key = self._key("hist", channel_id)
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, entry)
+            pipe.ltrim(key, -MAX_HISTORY, -1)
+            await pipe.execute()
+        await asyncio.to_thread(_archive_message, channel_id, day, role, content, seq)
+
+    async def clear_history(self, channel_id: int):
+        await self._r.delete(self._key("hist", channel_id))   # seq 는 유지 (계속 증가)
+        seq = int(await self._r.get(self._key("seq", channel_id)) or 0)
+        await asyncio.to_thread(_clear_daily_summary, channel_id, seq)
+
+    async def count_history(self, channel_id: int) -> int:
+        return await self._r.llen(self._key("hist", channel_id))
+
+    async def drop_dangling_user(self, channel_id: int, content: str) -> bool:
+        key = self._key("hist", channel_id)
+        raw = await self._r.lrange(key, 0, -1)
+        for i in range(len(raw) - 1, -1, -1):
+            m = json.loads(raw[i])
+            if m["role"] != "user" or m["content"] != content:
+                continue
+            if i + 1 < len(raw) and json.loads(raw[i + 1])["role"] == "assistant":
+                return False
+            return await self._r.lrem(key, -1, raw[i]) > 0   # 항목에 seq 가 있어 값이 유일
+        return False
+
+    async def hit_cooldown(self, key: str, cooldown_sec: float) -> float:
+        ms = max(int(cooldown_sec * 1000), 1)
+        if await self._r.set(self._key("rl", key), 1, px=ms, nx=True):
+            return 0.0
+        left_ms = await self._r.pttl(self._key("rl", key))
+        return max(left_ms, 1) / 1000
+
+    # 확인 버튼: 토큰별 해시 + 만료 시각 sorted set (정리용). 상태 판단은 SQLite 쪽과 같음.
+    @staticmethod
+    def _confirm_state(row: dict, now: float) -> tuple[bool, bool]:
+        """(만료 전인지, 처리 중이 아닌지)"""
+        live = bool(row) and float(row["expires_at"]) >= now
+        free = not row.get("claimed_until") or float(row["claimed_until"]) < now
+        return live, free
+
+    async def _confirm_update(self, token: str, change):
+        """WATCH 로 확인 행을 읽고 change(row, now) → (결과, 쓰기 함수 | None) 의 쓰기를 원자적으로 적용"""
+        from redis.exceptions import WatchError   # 이 백엔드는 redis 패키지가 있을 때만 씀
+        key = self._key("confirm", token)
+        async with self._r.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    result, write = change(await pipe.hgetall(key), time.time())
+                    if write is None:
+                        await pipe.unwatch()
+                        return result
+                    pipe.multi()
+                    write(pipe, key)
+                    await pipe.execute()
+                    return result
+                except WatchError:
+                    continue   # 다른 클릭이 먼저 바꿈 — 다시 읽고 판단
+
+    async def confirm_put(self, token: str, kind: str, channel_id: int, data: dict, ttl_sec: float):
+        expires_at = time.time() + ttl_sec
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key("confirm", token), mapping={
+                "kind": kind, "channel_id": channel_id, "expires_at": expires_at,
+                "data": json.dumps(data, ensure_ascii=False),
+            })
+            pipe.zadd(self._key("confirm_exp"), {token: expires_at})
+            await pipe.execute()
+
+    async def confirm_attach(self, token: str, message_id: int):
+        def attach(pipe, key):
+            pipe.hset(key, "message_id", message_id)
+
+        def change(row, now):
+            return None, attach if row else None   # 이미 정리됐으면 빈 해시를 되살리지 않음
+        await self._confirm_update(token, change)
+
+    async def confirm_claim(self, token: str) -> tuple[str, dict | None]:
+        def change(row, now):
+            def claim(pipe, key):
+                pipe.hset(key, "claimed_until", now + CONFIRM_CLAIM_SEC)
+
+            live, free = self._confirm_state(row, now)
+            if not live:
+                return ("gone", None), None
+            if not free:
+                return ("busy", None), None
+            return ("ok", json.loads(row["data"])), claim
+        return await self._confirm_update(token, change)
+
+    async def confirm_release(self, token: str):
+        await self._r.hdel(self._key("confirm", token), "claimed_until")
+
+    async def confirm_cancel(self, token: str) -> str:
+        def drop(pipe, key):
+            pipe.delete(key)
+            pipe.zrem(self._key("confirm_exp"), token)
+
+        def change(row, now):
+            live, free = self._confirm_state(row, now)
+            if not live:
+                return "gone", None
+            if not free:
+                return "busy", None
+            return "ok", drop
+        return await self._confirm_update(token, change)
+
+    async def confirm_expired(self) -> list[tuple]:
+        """만료된 확인 (처리 중인 것은 제외)"""
+        now     = time.time()
+        expired = []
+        for token in await self._r.zrangebyscore(self._key("confirm_exp"), "-inf", now):
+            row = await self._r.hgetall(self._key("confirm", token))
+            if not row:
+                await self._r.zrem(self._key("confirm_exp"), token)   # 이미 지워진 행
+                continue
+            if self._confirm_state(row, now)[1]:
+                message_id = row.get("message_id")
+                expired.append((token, int(row["channel_id"]), int(message_id) if message_id else None))
+        return expired
+
+    async def confirm_drop(self, token: str) -> bool:
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key("confirm", token))
+            pipe.zrem(self._key("confirm_exp"), token)
+            deleted, _ = await pipe.execute()
+        return deleted == 1
+
+    async def close(self):
+        await self._r.aclose()
+
+def make_state_backend():
+    if STATE_BACKEND == "redis":
+        try:
+            import redis.asyncio as aioredis   # 선택 의존성
+        except ImportError:
+            raise EnvironmentError("❌ STATE_BACKEND=redis 인데 redis 패키지가 없어요 (pip install redis)")
+        return RedisStateBackend(aioredis.from_url(REDIS_URL, decode_responses=True))
+    return SqliteStateBackend()
+
 async def get_history(channel_id: int):
-    return await asyncio.to_thread(_get_history, channel_id)
+    return await state_backend.get_history(channel_id)
 
 async def get_today_history(channel_id: int):
-    return await asyncio.to_thread(_get_today_history, channel_id)
+    return await state_backend.get_today_history(channel_id)
 
 async def add_message(channel_id: int, role: str, content: str):
-    await asyncio.to_thread(_add_message, channel_id, role, content)
+    await state_backend.add_message(channel_id, role, content)
 
 async def clear_history(channel_id: int):
-    await asyncio.to_thread(_clear_history, channel_id)
+    await state_backend.clear_history(channel_id)
 
 async def count_history(channel_id: int) -> int:
-    return await asyncio.to_thread(_count_history, channel_id)
+    return await state_backend.count_history(channel_id)
 
 # ─── 유틸 ────────────────────────────────────────────
+KST = timezone(timedelta(hours=9))
+
+def kst_now() -> datetime:
+    return datetime.now(KST)
+
+def kst_today() -> date:
+    return kst_now().date()
+
+class LazyClient:
+    """첫 속성 접근 때 factory() 로 실제 클라이언트를 만든다 (SDK import 포함).
+    접속 후 warm_up() 이 스레드에서 미리 load() 해 두므로 보통 이벤트 루프는 기다리지 않음."""
+
+    def __init__(self, name: str, factory):
+        self._name    = name
+        self._factory = factory
+        self._client  = None
+        self._lock    = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._client is not None
+
+    def load(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    t0 = time.perf_counter()
+                    self._client = self._factory()
+                    log("지연 로드", self._name, latency_ms=ms_since(t0))
+        return self._client
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+# ─── HTTP 연결 풀 (Anthropic · Notion) ─────────────────
+# 두 SDK 모두 httpx 기반. 기본 keep-alive(5초)면 버스트 사이에 연결이 끊겨 매번 TLS 를 다시 맺으므로
+# 풀 크기·keep-alive 를 직접 지정하고, 쉬는 동안엔 HEAD 로 연결을 살려둠. 연결 지표는 httpcore trace 로.
+HTTP_POOL_SIZE            = int(os.environ.get("HTTP_POOL_SIZE", "20"))        # 클라이언트별 최대 연결
+HTTP_KEEPALIVE_CONNS      = int(os.environ.get("HTTP_KEEPALIVE_CONNS", "10"))  # 유휴로 유지할 연결 수
+HTTP_KEEPALIVE_SEC        = float(os.environ.get("HTTP_KEEPALIVE_SEC", "120"))
+HTTP_KEEPWARM_SEC         = float(os.environ.get("HTTP_KEEPWARM_SEC", "45"))   # 0 = 유지 ping 끔
+HTTP_KEEPWARM_MAX_IDLE_SEC = 1800   # 마지막 실제 호출 후 이 시간이 지나면 더 살려두지 않음
+# HTTP/2 는 h2 패키지가 있을 때만 (pip install h2), 없으면 HTTP/1.1 keep-alive
+HTTP2_ENABLED  = os.environ.get("HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+HTTP_CA_BUNDLE = os.environ.get("HTTP_CA_BUNDLE", "")   # 로컬 TLS 대역 서버로 테스트할 때만
+NOTION_API_BASE = os.environ.get("NOTION_API_BASE", "https://api.notion.com")   # Anthropic 은 SDK 가 ANTHROPIC_BASE_URL 을 읽음
+
+class _ConnTrace:
+    """요청 하나의 httpcore trace 이벤트 → 새 연결 여부 + TCP/TLS 시간"""
+    __slots__ = ("_started", "connect_ms", "tls_ms")
+
+    def __init__(self):
+        self._started: dict[str, float] = {}
+        self.connect_ms: float | None = None
+        self.tls_ms:     float | None = None
+
+    async def __call__(self, event: str, info: dict):
+        step, _, phase = event.rpartition(".")
+        if phase == "started":
+            self._started[step] = time.perf_counter()
+        elif phase == "complete" and step in self._started:
+            ms = (time.perf_counter() - self._started[step]) * 1000
+            if step == "connection.connect_tcp":
+                self.connect_ms = ms
+            elif step == "connection.start_tls":
+                self.tls_ms = ms
+
+class HttpPool:
+    def __init__(self, name: str):
+        self.name      = name
+        self.client    = None   # SDK 에 넘긴 httpx AsyncClient
+        self.warm_url  = ""
+        self.requests  = 0
+        self.new_conns = 0
+        self.handshake_ms: deque[float] = deque(maxlen=200)
+        self.versions  = Counter()
+        self.warm_pings = 0
+        self.warm_conns = 0      # 유지 ping 이 새로 맺은 연결 (끊긴 걸 미리 복구)
+        self.last_real  = 0.0    # 마지막 실제 API 호출
+        self.last_io    = 0.0    # 유지 ping 포함
+
+    def build(self, client_cls, limits_cls, warm_url: str):
+        """client_cls / limits_cls 는 SDK 가 쓰는 httpx 계열 (anthropic 은 자체 기본 클라이언트)"""
+        kwargs = {
+            "http2":  HTTP2_ENABLED,
+            "limits": limits_cls(max_connections=HTTP_POOL_SIZE,
+                                 max_keepalive_connections=HTTP_KEEPALIVE_CONNS,
+                                 keepalive_expiry=HTTP_KEEPALIVE_SEC),
+            "event_hooks": {"request": [self._on_request], "response": [self._on_response]},
+        }
+        if HTTP_CA_BUNDLE:
+            kwargs["verify"] = ssl.create_default_context(cafile=HTTP_CA_BUNDLE)
+        self.client   = client_cls(**kwargs)
+        self.warm_url = warm_url
+        return self.client
+
+    async def _on_request(self, request):
+        request.extensions["trace"] = _ConnTrace()
+
+    async def _on_response(self, response):
+        trace = response.request.extensions.get("trace")
+        warm  = response.request.method == "HEAD" and str(response.request.url) == self.warm_url
+        now   = time.monotonic()
+        self.last_io = now
+        new_conn = isinstance(trace, _ConnTrace) and trace.connect_ms is not None
+        if warm:
+            self.warm_pings += 1
+            self.warm_conns += new_conn
+        else:
+            self.last_real = now
+            self.requests += 1
+            self.versions[response.http_version] += 1
+        if new_conn:
+            self.new_conns += not warm
+            self.handshake_ms.append(trace.connect_ms + (trace.tls_ms or 0.0))
+
+    async def keep_warm(self, force: bool = False):
+        """쉬고 있는 연결을 HEAD 로 재사용해 keep-alive 갱신 (force: 시작 시 미리 연결)"""
+        if not self.client or not self.warm_url:
+            return
+        now = time.monotonic()
+        if not force and (now - self.last_io < HTTP_KEEPWARM_SEC * 0.9
+                          or now - self.last_real > HTTP_KEEPWARM_MAX_IDLE_SEC):
+            return
+        try:
+            await self.client.head(self.warm_url, timeout=10)
+        except Exception as e:
+            log("HTTP 연결 유지", f"{self.name} {type(e).__name__}: {e}", level=logging.WARNING)
+
+    def stats(self) -> dict:
+        hs = sorted(self.handshake_ms)
+        return {
+            "requests":   self.requests,
+            "new_conns":  self.new_conns,
+            "reuse_rate": round(1 - self.new_conns / self.requests, 3) if self.requests else None,
+            "handshake_p50_ms": round(hs[len(hs) // 2], 1) if hs else None,
+            "handshake_max_ms": round(hs[-1], 1) if hs else None,
+            "versions":   dict(self.versions),
+            "warm_pings": self.warm_pings,
+            "warm_conns": self.warm_conns,
+        }
+
+http_pools = {"anthropic": HttpPool("anthropic"), "notion": HttpPool("notion")}
+
+async def keep_http_warm():
+    """warm_up 에서 한 번만 시작: 미리 연결한 뒤 HTTP_KEEPWARM_SEC 마다 유휴 연결 갱신"""
+    await asyncio.gather(*(pool.keep_warm(force=True) for pool in http_pools.values()))
+    while HTTP_KEEPWARM_SEC > 0:
+        await asyncio.sleep(HTTP_KEEPWARM_SEC)
+        await asyncio.gather(*(pool.keep_warm() for pool in http_pools.values()))
+
+async def close_http_pools():
+    for pool in http_pools.values():
+        if pool.client:
+            await pool.client.aclose()
+
+def http_pool_report() -> str:
+    lines = [
+        f"HTTP 연결 풀 — HTTP/2 {'켜짐' if HTTP2_ENABLED else '꺼짐 (h2 미설치 또는 HTTP2=0)'}, "
+        f"최대 {HTTP_POOL_SIZE}개 / 유휴 유지 {HTTP_KEEPALIVE_CONNS}개 {HTTP_KEEPALIVE_SEC:.0f}초, "
+        f"유지 ping {HTTP_KEEPWARM_SEC:.0f}초",
+    ]
+    for name, pool in http_pools.items():
+        st = pool.stats()
+        if not pool.client:
+            lines.append(f"  {name}: (아직 생성 안 됨)")
+            continue
+        reuse = f"{st['reuse_rate']:.1%}" if st["reuse_rate"] is not None else "-"
+        lines.append(
+            f"  {name}: 요청 {st['requests']} · 새 연결 {st['new_conns']} (재사용률 {reuse}) · "
+            f"핸드셰이크 p50 {st['handshake_p50_ms'] or '-'}ms / 최대 {st['handshake_max_ms'] or '-'}ms · "
+            f"{' '.join(f'{v} {n}' for v, n in st['versions'].items()) or '-'} · "
+            f"유지 ping {st['warm_pings']} (재연결 {st['warm_conns']})"
+        )
+    return "\n".join(lines)
+
+def _make_anthropic():
+    import anthropic as sdk
+    base = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com").rstrip("/") + "/"
+    http = http_pools["anthropic"].build(sdk.DefaultAsyncHttpxClient, type(sdk.DEFAULT_CONNECTION_LIMITS), base)
+    return sdk.AsyncAnthropic(api_key=ANTHROPIC_API_KEY, http_client=http)
+
+def _make_notion():
+    import httpx
+    from notion_client import AsyncClient
+    http = http_pools["notion"].build(httpx.AsyncClient, httpx.Limits, NOTION_API_BASE.rstrip("/") + "/")
+    return AsyncClient(auth=NOTION_TOKEN, base_url=NOTION_API_BASE, client=http)
+
+# ─── 시작 벤치마크 ────────────────────────────────────
+# STARTUP_T0 기준 import → setup(DB) → ready(게이트웨이) → 첫 응답 시각(ms)을 기록.
+# `python bot.py --bench-startup` 은 접속 없이 새 프로세스 import 시간만 반복 측정.
+STARTUP_TARGET_IMPORT_MS = int(os.environ.get("STARTUP_TARGET_IMPORT_MS", "500"))
+STARTUP_BENCH_RUNS       = 5
+_startup_marks: dict[str, float] = {}
+
+def mark_startup(name: str):
+    if name in _startup_marks:
+        return
+    _startup_marks[name] = (time.perf_counter() - STARTUP_T0) * 1000
+    if name == "first_reply":
+        log("시작 벤치마크", startup_report(), marks_ms={k: round(v, 1) for k, v in _startup_marks.items()})
+
+def startup_report() -> str:
+    parts = " | ".join(f"{k} {v:.0f}ms" for k, v in _startup_marks.items())
+    imp   = _startup_marks.get("import")
+    if imp is None:
+        return parts
+    verdict = "✅" if imp <= STARTUP_TARGET_IMPORT_MS else "❌"
+    return f"{parts} (import 목표 {STARTUP_TARGET_IMPORT_MS}ms {verdict})"
+
+def run_startup_bench(runs: int = STARTUP_BENCH_RUNS):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--bench-import"],
+                             capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    samples.sort()
+    median = samples[len(samples) // 2]
+    verdict = "✅" if median <= STARTUP_TARGET_IMPORT_MS else "❌"
+    print(f"[시작 벤치마크] import 중앙값 {median:.0f}ms "
+          f"(최소 {samples[0]:.0f} / 최대 {samples[-1]:.0f}ms, {runs}회) "
+          f"— 목표 {STARTUP_TARGET_IMPORT_MS}ms {verdict}")
+
 def get_model(mode: str) -> str:
     return MODEL_MAP.get(mode, MODEL_MAP["default"])
 
+@lru_cache(maxsize=1024)
 def get_channel_mode(channel_name: str) -> str:
     for keyword, mode in CHANNEL_MODES.items():
         if keyword in channel_name:
             return mode
     return "default"
 
-async def send_long_message(target, text: str, view=None):
-    """2000자 초과 메시지 분할 전송. view는 마지막 메시지에만 첨부."""
-    if len(text) <= 1900:
-        await target.send(text, view=view)
-        return
-    chunks = [text[i:i + 1900] for i in range(0, len(text), 1900)]
-    for i, chunk in enumerate(chunks):
-        await target.send(chunk, view=view if i == len(chunks) - 1 else None)
+# ─── 채널 설정 레지스트리 ─────────────────────────────
+# 모드/모델/토큰/히스토리/쿨다운을 채널별로 SQLite에 저장하고 channel_id 로 메모리 캐시.
+# 핫패스는 dict 조회 한 번. 오버라이드 없는 항목은 채널 이름·기본값으로 채움.
+CHANNEL_CONFIG_FIELDS = ("mode", "model", "max_tokens", "history_budget", "cooldown_sec")
+
+@dataclass
+class ChannelConfig:
+    channel_id:     int
+    mode:           str
+    model:          str
+    max_tokens:     int
+    history_budget: int      # Claude에 보내는 최근 메시지 수
+    cooldown_sec:   float
+    overrides:      dict     # DB에 저장된 값만 (표시용)
+
+def _load_channel_overrides() -> dict[int, dict]:
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute(
+            f"SELECT channel_id, {', '.join(CHANNEL_CONFIG_FIELDS)} FROM channel_config"
+        ).fetchall()
+    return {
+        r[0]: {k: v for k, v in zip(CHANNEL_CONFIG_FIELDS, r[1:]) if v is not None}
+        for r in rows
+    }
 
-def _rich_text(text: str) -> list:
-    """Notion rich_text 블록 생성 (2000자 제한 대응)"""
-    return [{"type": "text", "text": {"content": text[:2000]}}]
+def _save_channel_overrides(channel_id: int, overrides: dict):
+    with sqlite3.connect(DB_PATH) as conn:
+        if not overrides:
+            conn.execute("DELETE FROM channel_config WHERE channel_id = ?", (channel_id,))
+        else:
+            values = [overrides.get(k) for k in CHANNEL_CONFIG_FIELDS]
+            conn.execute(f"""
+                INSERT INTO channel_config (channel_id, {', '.join(CHANNEL_CONFIG_FIELDS)})
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (channel_id) DO UPDATE SET
+                    {', '.join(f"{k} = excluded.{k}" for k in CHANNEL_CONFIG_FIELDS)},
+                    updated_at = CURRENT_TIMESTAMP
+            """, (channel_id, *values))
+        conn.commit()
 
-# 헬스 기록 자동 불러오기 키워드
+class ChannelRegistry:
+    def __init__(self):
+        self._overrides: dict[int, dict]          = {}
+        self._cache:     dict[int, ChannelConfig] = {}
+
+    def preload(self):
+        """시작 시 DB 오버라이드 전체 로드 (채널 수만큼이라 작음)"""
+        self._overrides = _load_channel_overrides()
+        self._cache.clear()
+
+    def get(self, channel_id: int, channel_name: str) -> ChannelConfig:
+        cfg = self._cache.get(channel_id)
+        if cfg is None:
+            cfg = self._resolve(channel_id, channel_name)
+            self._cache[channel_id] = cfg
+        return cfg
+
+    def _resolve(self, channel_id: int, channel_name: str) -> ChannelConfig:
+        o    = self._overrides.get(channel_id, {})
+        mode = o.get("mode") or get_channel_mode(channel_name)
+        return ChannelConfig(
+            channel_id     = channel_id,
+            mode           = mode,
+            model          = o.get("model") or get_model(mode),
+            max_tokens     = o.get("max_tokens") or DEFAULT_MAX_TOKENS,
+            history_budget = o.get("history_budget") or MAX_HISTORY,
+            cooldown_sec   = o.get("cooldown_sec") if o.get("cooldown_sec") is not None else COOLDOWN_SEC,
+            overrides      = dict(o),
+        )
 
-def _prop_text(page: dict, key: str) -> str:
-    """Notion 페이지 프로퍼티에서 텍스트 값 추출 (title / rich_text 모두 지원)"""
-    prop = page["properties"].get(key, {})
-    if not prop:
-        return ""
-    ptype = prop.get("type", "")
-    if ptype == "title":
-        items = prop.get("title", [])
-    elif ptype == "rich_text":
-        items = prop.get("rich_text", [])
-    else:
-        return ""
-    return "".join(r.get("text", {}).get("content", "") for r in items).strip()
+    def invalidate(self, channel_id: int):
+        self._cache.pop(channel_id, None)
 
-async def notion_get_health_logs(days: int = 7) -> str:
-    """
-    Notion 헬스 DB에서 최근 N일 기록 조회.
-    구조화된 프로퍼티(운동/아침/점심/저녁)에서 직접 읽어 raw 데이터 반환.
-    regex 파싱 없음 → 100% 정확.
-    """
-    if not notion or not NOTION_HEALTH_DB_ID:
-        print("[Notion 헬스 조회] 클라이언트 또는 DB ID 없음")
-        return ""
-    try:
-        since = (date.today() - timedelta(days=days)).isoformat()
-        res = await notion.databases.query(
-            database_id=NOTION_HEALTH_DB_ID,
-            filter={"property": "날짜", "date": {"on_or_after": since}},
-            sorts=[{"property": "날짜", "direction": "ascending"}],
+    async def update(self, channel_id: int, **changes) -> dict:
+        """값이 None이면 해당 오버라이드 제거. 변경 후 오버라이드 dict 반환."""
+        overrides = dict(self._overrides.get(channel_id, {}))
+        for key, value in changes.items():
+            if value is None:
+                overrides.pop(key, None)
+            else:
+                overrides[key] = value
+        await asyncio.to_thread(_save_channel_overrides, channel_id, overrides)
+        if overrides:
+            self._overrides[channel_id] = overrides
+        else:
+            self._overrides.pop(channel_id, None)
+        self.invalidate(channel_id)
+        return overrides
+
+    async def reset(self, channel_id: int):
+        await self.update(channel_id, **{k: None for k in CHANNEL_CONFIG_FIELDS})
+
+# ─── 적응형 모델 선택 ────────────────────────────────
+@dataclass(frozen=True)
+class ModelDecision:
+    model:  str
+    reason: str      # channel_override | static | base | complex | slo
+    score:  float
+
+_complexity_matcher = None                   # KeywordMatcher (첫 사용 시 컴파일)
+_model_latency_ewma: dict[str, float] = {}   # 모델별 응답 지연 EWMA (ms)
+
+def score_complexity(text: str) -> tuple[float, tuple[str, ...]]:
+    """로컬 휴리스틱 복잡도 점수 (0~1) + 걸린 특징들"""
+    global _complexity_matcher
+    if _complexity_matcher is None:
+        _complexity_matcher = KeywordMatcher({k: kws for k, (_, kws) in COMPLEXITY_FEATURES.items()})
+    hits  = _complexity_matcher.find(text)
+    score = min(len(text) / 300, 1.0) * COMPLEXITY_LENGTH_WEIGHT
+    feats = [f"len{len(text)}"]
+    for name in hits:
+        score += COMPLEXITY_FEATURES[name][0]
+        feats.append(name)
+    if text.count("?") + text.count("？") >= 2:
+        score += COMPLEXITY_MULTI_Q
+        feats.append("multi_q")
+    return min(score, 1.0), tuple(feats)
+
+def choose_model(cfg: ChannelConfig, text: str) -> ModelDecision:
+    if "model" in cfg.overrides:
+        return ModelDecision(cfg.model, "channel_override", 0.0)
+    policy = MODEL_POLICIES.get(cfg.mode, MODEL_POLICIES["default"])
+    if not ADAPTIVE_MODEL_ROUTING:
+        return ModelDecision(cfg.model, "static", 0.0)
+
+    score, feats = score_complexity(text)
+    base = MODEL_ALIASES[policy["base"]]
+    if not policy.get("upgrade") or score < policy["threshold"]:
+        return ModelDecision(base, f"base({','.join(feats)})", score)
+
+    upgrade = MODEL_ALIASES[policy["upgrade"]]
+    # 지연 SLO: 상위 모델 최근 지연이 SLO를 넘고 기본 모델이 더 빠르면 강등
+    if MODEL_LATENCY_SLO_MS:
+        up_ms   = _model_latency_ewma.get(upgrade, 0.0)
+        base_ms = _model_latency_ewma.get(base, 0.0)
+        if up_ms > MODEL_LATENCY_SLO_MS and base_ms < up_ms:
+            return ModelDecision(base, f"slo({up_ms:.0f}ms>{MODEL_LATENCY_SLO_MS}ms)", score)
+    return ModelDecision(upgrade, f"complex({','.join(feats)})", score)
+
+def _record_model_decision(channel_id: int, mode: str, decision: ModelDecision,
+                           static_model: str, latency_ms: float, input_len: int):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            "INSERT INTO model_decisions "
+            "(channel_id, mode, model, static_model, reason, score, latency_ms, input_len) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (channel_id, mode, decision.model, static_model, decision.reason,
+             decision.score, latency_ms, input_len)
         )
-        print(f"[Notion 헬스 조회] {len(res['results'])}개 (최근 {days}일)")
-        if not res["results"]:
-            return ""
+        conn.commit()
 
-        rows = []
-        for page in res["results"]:
-            date_obj = page["properties"].get("날짜", {}).get("date") or {}
-            log_date = date_obj.get("start", "날짜미상")
+def _model_decision_stats(days: int) -> list[tuple]:
+    """모델별 (호출 수, 평균 지연, 정적 MODEL_MAP과 다른 선택 수)"""
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("""
+            SELECT model, COUNT(*), AVG(latency_ms), SUM(model != static_model)
+            FROM model_decisions
+            WHERE ts >= datetime('now', ?)
+            GROUP BY model ORDER BY COUNT(*) DESC
+        """, (f"-{days} days",)).fetchall()
+
+async def record_model_decision(channel_id: int, mode: str, decision: ModelDecision,
+                                latency_ms: float, input_len: int):
+    prev = _model_latency_ewma.get(decision.model)
+    _model_latency_ewma[decision.model] = latency_ms if prev is None else prev * 0.8 + latency_ms * 0.2
+    log("모델 선택", decision.model, level=logging.DEBUG,
+        reason=decision.reason, score=round(decision.score, 2), latency_ms=round(latency_ms, 1))
+    await asyncio.to_thread(
+        _record_model_decision, channel_id, mode, decision,
+        get_model(mode), latency_ms, input_len
+    )
 
-            workout   = _prop_text(page, "운동")
-            breakfast = _prop_text(page, "아침")
-            lunch     = _prop_text(page, "점심")
-            dinner    = _prop_text(page, "저녁")
+# ─── 토큰 사용량 장부 ─────────────────────────────────
+# 모든 Anthropic 호출은 claude_create 를 거쳐 용도·채널·토큰·지연을 기록.
+# 비용은 MTok 당 USD 추정치 (캐시 읽기 0.1배, 캐시 쓰기 1.25배 입력 단가).
+MODEL_PRICES = {
+    "claude-haiku-4-5-20251001": (1.0, 5.0),    # (입력, 출력)
+    "claude-sonnet-4-6":         (3.0, 15.0),
+}
 
-            parts = [f"날짜: {log_date}"]
-            if workout:   parts.append(f"운동: {workout}")
-            if breakfast: parts.append(f"아침: {breakfast}")
-            if lunch:     parts.append(f"점심: {lunch}")
-            if dinner:    parts.append(f"저녁: {dinner}")
+USAGE_PURPOSE_LABELS = {
+    "chat":             "대화",
+    "summary":          "일일 요약",
+    "event_parse":      "일정 파싱",
+    "health_parse":     "헬스 파싱",
+    "health_narrative": "헬스 일지",
+    "tool_use":         "도구 후속 호출",
+}
 
-            rows.append(" | ".join(parts))
+@dataclass
+class UsageRecord:
+    channel_id:    int | None
+    purpose:       str
+    model:         str
+    input_tokens:  int
+    output_tokens: int
+    cache_read:    int
+    cache_write:   int
+    latency_ms:    float
+
+def usage_cost(model: str, input_tokens: int, output_tokens: int,
+               cache_read: int = 0, cache_write: int = 0) -> float:
+    price_in, price_out = MODEL_PRICES.get(model, MODEL_PRICES["claude-sonnet-4-6"])
+    return (input_tokens * price_in + output_tokens * price_out
+            + cache_read * price_in * 0.1 + cache_write * price_in * 1.25) / 1_000_000
+
+def _record_usage(rec: UsageRecord):
+    day = kst_today().isoformat()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            "INSERT INTO usage_ledger (ts, day, channel_id, purpose, model, input_tokens, "
+            "output_tokens, cache_read, cache_write, latency_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (time.time(), day, rec.channel_id, rec.purpose, rec.model, rec.input_tokens,
+             rec.output_tokens, rec.cache_read, rec.cache_write, rec.latency_ms)
+        )
+        conn.execute("""
+            INSERT INTO usage_daily VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, channel_id, purpose, model) DO UPDATE SET
+                calls         = calls + 1,
+                input_tokens  = input_tokens  + excluded.input_tokens,
+                output_tokens = output_tokens + excluded.output_tokens,
+                cache_read    = cache_read    + excluded.cache_read,
+                cache_write   = cache_write   + excluded.cache_write,
+                latency_ms    = latency_ms    + excluded.latency_ms
+        """, (day, rec.channel_id or 0, rec.purpose, rec.model, rec.input_tokens,
+              rec.output_tokens, rec.cache_read, rec.cache_write, rec.latency_ms))
+        conn.commit()
 
-        return "\n".join(rows)
-    except Exception as e:
-        print(f"[Notion 헬스 조회 오류] {type(e).__name__}: {e}")
-        return ""
+# group_by → SQL 컬럼 (f-string 에 들어가므로 여기 있는 것만 허용)
+USAGE_ROLLUP_COLUMNS = {
+    "channel_id": "channel_id",
+    "purpose":    "purpose",
+    "model":      "model",
+    "day":        "day",
+}
 
-async def notion_save_health_structured(
-    log_date: str,
-    workout: str,
-    breakfast: str,
-    lunch: str,
-    dinner: str,
-    narrative: str,
-) -> str:
+def _usage_rollup(since_day: str, group_by: str) -> list[tuple]:
+    """since_day 이후 group_by(channel_id/purpose/model/day)별 (키, 호출, 입력, 출력, 캐시읽기, 캐시쓰기, 지연합)"""
+    column = USAGE_ROLLUP_COLUMNS.get(group_by)
+    if column is None:
+        raise ValueError(f"알 수 없는 group_by: {group_by!r}")
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute(f"""
+            SELECT {column}, model, SUM(calls), SUM(input_tokens), SUM(output_tokens),
+                   SUM(cache_read), SUM(cache_write), SUM(latency_ms)
+            FROM usage_daily WHERE day >= ?
+            GROUP BY {column}, model
+        """, (since_day,)).fetchall()
+
+async def claude_create(purpose: str, channel_id: int | None = None, **request):
+    """anthropic.messages.create + 사용량 기록"""
+    t0 = time.perf_counter()
+    response = await anthropic.messages.create(**request)
+    latency_ms = (time.perf_counter() - t0) * 1000
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        rec = UsageRecord(
+            channel_id, purpose, request["model"],
+            usage.input_tokens or 0, usage.output_tokens or 0,
+            getattr(usage, "cache_read_input_tokens", 0) or 0,
+            getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            latency_ms,
+        )
+        try:
+            await asyncio.to_thread(_record_usage, rec)
+        except sqlite3.Error as e:   # 장부 기록 실패가 응답을 막지 않도록
+            log("사용량 기록", str(e), level=logging.ERROR)
+    return response
+
+# ─── 인텐트 라우터 ────────────────────────────────────
+class KeywordMatcher:
+    """Aho-Corasick 오토마톤: 여러 라벨의 키워드를 텍스트 한 번 스캔으로 전부 매칭"""
+
+    def __init__(self, patterns: dict[str, tuple[str, ...]]):
+        self._goto: list[dict[str, int]]             = [{}]
+        self._fail: list[int]                        = [0]
+        self._out:  list[tuple[tuple[str, str], ...]] = [()]
+        for label, keywords in patterns.items():
+            for kw in keywords:
+                node = 0
+                for ch in kw:
+                    nxt = self._goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[node][ch] = nxt
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._out.append(())
+                    node = nxt
+                self._out[node] += ((label, kw),)
+        # BFS로 실패 링크 계산 + 실패 노드의 출력 병합
+        queue = list(self._goto[0].values())
+        while queue:
+            node = queue.pop(0)
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fail = self._goto[f].get(ch, 0)
+                self._fail[nxt] = fail if fail != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> dict[str, list[str]]:
+        """{라벨: [매칭된 키워드, ...]}"""
+        hits: dict[str, list[str]] = {}
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for label, kw in out[node]:
+                hits.setdefault(label, []).append(kw)
+        return hits
+
+@dataclass(frozen=True)
+class Intent:
+    mode:       str
+    action:     str                 # "memo" (Claude 호출 없이 메모 저장) | "chat"
+    labels:     frozenset[str]      # 채널 모드에서 활성화된 인텐트들
+    keywords:   tuple[str, ...]     # 매칭된 키워드 (로그용)
+    elapsed_us: float
+
+    @property
+    def inject_health(self) -> bool:
+        return "record" in self.labels
+
+    @property
+    def parse_event(self) -> bool:
+        return "time" in self.labels
+
+    @property
+    def summary_request(self) -> bool:
+        return "summary" in self.labels
+
+class IntentRouter:
+    """INTENT_RULES로 시작 시 한 번 컴파일 → 메시지당 한 번 스캔으로 모드 + 인텐트 결정"""
+
+    def __init__(self, rules: dict[str, dict]):
+        self._rules   = rules
+        self._matcher = KeywordMatcher({name: tuple(r["keywords"]) for name, r in rules.items()})
+        self.stats    = {"count": 0, "total_us": 0.0, "max_us": 0.0}
+
+    def labels(self, text: str) -> set[str]:
+        """모드 필터 없이 매칭된 인텐트 라벨만"""
+        return set(self._matcher.find(text))
+
+    def route(self, channel_name: str, text: str, mode: str | None = None) -> Intent:
+        t0   = time.perf_counter()
+        mode = mode or get_channel_mode(channel_name)
+        hits = self._matcher.find(text)
+        active = frozenset(
+            name for name in hits
+            if self._rules[name]["modes"] is None or mode in self._rules[name]["modes"]
+        )
+        intent = Intent(
+            mode       = mode,
+            action     = "memo" if "memo" in active else "chat",
+            labels     = active,
+            keywords   = tuple(kw for name in active for kw in hits[name]),
+            elapsed_us = (time.perf_counter() - t0) * 1e6,
+        )
+        self.stats["count"]    += 1
+        self.stats["total_us"] += intent.elapsed_us
+        self.stats["max_us"]    = max(self.stats["max_us"], intent.elapsed_us)
+        log("라우팅", intent.action, level=logging.DEBUG, channel_name=channel_name, mode=mode,
+            intents=sorted(active), kw=list(intent.keywords)[:5], elapsed_us=round(intent.elapsed_us))
+        return intent
+
+    def benchmark(self, samples: list[str], rounds: int = 1000) -> tuple[float, float]:
+        """(컴파일된 매처, 기존 튜플 any() 스캔) 메시지당 평균 µs"""
+        keyword_sets = [tuple(r["keywords"]) for r in self._rules.values()]
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for text in samples:
+                self._matcher.find(text)
+        compiled = (time.perf_counter() - t0) / (rounds * len(samples)) * 1e6
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for text in samples:
+                for kws in keyword_sets:
+                    any(kw in text for kw in kws)
+        naive = (time.perf_counter() - t0) / (rounds * len(samples)) * 1e6
+        return compiled, naive
+
+ROUTER_BENCH_SAMPLES = [
+    "내일 오후 3시 치과 예약 있어",
+    "오늘 점심 뭐먹을까? 최근 식단 기록 보여줘",
+    "이거 메모로 저장해줘",
+    "유니티에서 코루틴이랑 async 차이가 뭐야? 예제 코드도 같이 알려줘",
+    "오늘 대화 요약해줘",
+]
+
+# ─── 출력: 마크다운 인식 분할 + 배치 전송 ──────────────
+MSG_CHUNK_LEN     = 1900   # 일반 메시지 청크 (2000자 제한 여유분)
+EMBED_CHUNK_LEN   = 2900   # 임베드 description 청크 (메시지당 임베드 합계 6000자 → 2개씩 묶임)
+EMBED_TOTAL_LEN   = 5800   # 메시지 1개에 싣는 임베드 합계 상한 (디스코드 제한 6000)
+EMBED_MAX_PER_MSG = 10
+EMBED_MIN_CHUNKS  = 3      # 일반 청크가 이 개수 이상이면 임베드로 묶어서 API 호출 수 절감
+SEND_MAX_RETRIES  = 3      # 429 재시도 횟수
+DISCORD_MAX_RATELIMIT_SEC = 30.0   # 이보다 긴 대기는 discord.py가 RateLimited로 올려줌 (최소값 30)
+
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+def _split_long_line(line: str, limit: int) -> list[str]:
+    """한 줄이 limit보다 길면 공백 기준으로, 공백이 없으면 글자 단위로 자름"""
+    pieces = []
+    while len(line) > limit:
+        cut = line.rfind(" ", 0, limit)
+        if cut < limit // 2:   # 공백이 너무 앞에 있거나 없음 (긴 한글/URL 등)
+            cut = limit
+        pieces.append(line[:cut].rstrip())
+        line = line[cut:].lstrip()
+    pieces.append(line)
+    return pieces
+
+def split_message(text: str, limit: int = MSG_CHUNK_LEN) -> list[str]:
     """
-    헬스 기록을 구조화 프로퍼티 + 서술형 본문으로 저장.
-    기존 날짜 → UPDATE, 없으면 → CREATE.
-    반환: "created" | "updated" | "error"
+    문단 → 줄 → 공백 순으로 경계를 찾아 limit 이하로 분할.
+    코드블록 중간에서 잘리면 청크 끝에서 닫고 다음 청크에서 같은 언어로 다시 연다.
     """
-    if not notion or not NOTION_HEALTH_DB_ID:
-        return "error"
-    try:
-        props = {
-            "이름":  {"title": [{"text": {"content": f"헬스 일지 - {log_date}"}}]},
-            "날짜":  {"date": {"start": log_date}},
-            "운동":  {"rich_text": _rich_text(workout)},
-            "아침":  {"rich_text": _rich_text(breakfast)},
-            "점심":  {"rich_text": _rich_text(lunch)},
-            "저녁":  {"rich_text": _rich_text(dinner)},
-        }
-        children = [{"object": "block", "type": "paragraph",
-                     "paragraph": {"rich_text": _rich_text(narrative)}}] if narrative else []
+    if len(text) <= limit:
+        return [text]
+
+    fence_close_len = 4   # "\n```" / "\n~~~"
+    fence_open_max  = 16  # 다시 여는 줄 길이 상한 ("```python" 등, 긴 info 문자열은 자름)
+    lines: list[str] = []
+    for line in text.split("\n"):
+        # 다시 연 fence 줄 + 이 줄 + 닫는 fence 가 항상 한 청크에 들어가도록 여유를 둠
+        lines.extend(_split_long_line(line, limit - fence_close_len - fence_open_max - 2))
+
+    chunks: list[str] = []
+    cur:    list[tuple[str, str | None]] = []   # (줄, 이 줄 이후 열려 있는 fence 여는 줄)
+    fence:  str | None = None                   # 현재 열린 코드블록 (예: "```python")
+
+    def body_len(entries) -> int:
+        return sum(len(l) for l, _ in entries) + max(len(entries) - 1, 0)
+
+    def emit(entries):
+        body = "\n".join(l for l, _ in entries)
+        if entries and entries[-1][1]:
+            body += "\n" + entries[-1][1][:3]   # 연 것과 같은 기호로 닫음
+        if body.strip():
+            chunks.append(body)
+
+    def flush():
+        nonlocal cur
+        # 가능하면 청크 후반부의 빈 줄(문단 경계)에서 자름
+        split_at = None
+        for i in range(len(cur) - 1, 0, -1):
+            if cur[i][0].strip() == "" and cur[i][1] is None and body_len(cur[:i]) >= limit // 2:
+                split_at = i
+                break
+        if split_at is None:
+            head, tail = cur, []
+        else:
+            head, tail = cur[:split_at], cur[split_at + 1:]
+        emit(head)
+        reopen = head[-1][1] if head else None
+        cur = ([(reopen, reopen)] if reopen else []) + tail
+
+    for line in lines:
+        m = _FENCE_RE.match(line)
+        if m:
+            fence = None if fence else line.strip()[:fence_open_max]
+        reserve = fence_close_len if fence else 0
+        # 문단 경계에서 자르면 뒷부분(tail)이 남으므로 들어갈 때까지 반복
+        while cur and body_len(cur) + 1 + len(line) + reserve > limit:
+            if len(cur) == 1 and cur[0][0] == cur[0][1]:   # 다시 연 fence 줄만 남음 — 더 줄일 수 없음
+                break
+            flush()
+        cur.append((line, fence))
+    if cur:
+        emit(cur)
+    return chunks
+
+def _pack_embeds(pieces: list[str]) -> list[list[str]]:
+    """임베드 조각들을 메시지 단위로 묶기 (합계 EMBED_TOTAL_LEN, 최대 10개)"""
+    batches: list[list[str]] = []
+    for piece in pieces:
+        if (batches and len(batches[-1]) < EMBED_MAX_PER_MSG
+                and sum(map(len, batches[-1])) + len(piece) <= EMBED_TOTAL_LEN):
+            batches[-1].append(piece)
+        else:
+            batches.append([piece])
+    return batches
+
+async def _send_with_retry(target, **kwargs):
+    """target.send + 429 대응 (retry_after 만큼 기다렸다가 재시도)"""
+    for attempt in range(1, SEND_MAX_RETRIES + 1):
+        try:
+            return await target.send(**kwargs)
+        except discord.RateLimited as e:
+            wait = e.retry_after
+        except discord.HTTPException as e:
+            if e.status != 429 or attempt == SEND_MAX_RETRIES:
+                raise
+            headers = getattr(e.response, "headers", None) or {}
+            wait = float(headers.get("Retry-After", 1.0))
+        if attempt == SEND_MAX_RETRIES:
+            raise discord.RateLimited(wait)
+        log("Discord 429", f"{wait:.1f}초 후 재시도 ({attempt}/{SEND_MAX_RETRIES})", level=logging.WARNING, retry_after=wait, attempt=attempt)
+        await asyncio.sleep(wait)
+
+def message_target(channel_id: int):
+    """채널 객체. 이 워커의 샤드 밖 길드 채널이면 HTTP 전송용 PartialMessageable."""
+    return bot.get_channel(channel_id) or bot.get_partial_messageable(channel_id)
 
-        res = await notion.databases.query(
-            database_id=NOTION_HEALTH_DB_ID,
-            filter={"property": "날짜", "date": {"equals": log_date}}
-        )
-        if res["results"]:
-            page_id = res["results"][0]["id"]
-            await notion.pages.update(page_id=page_id, properties=props)
+async def send_long_message(target, text: str, view=None):
+    """
+    긴 메시지 분할 전송. view는 마지막 메시지에만 첨부.
+    청크가 많으면 임베드(메시지당 ~5800자)로 묶어서 API 호출 수를 줄임.
+    """
+    chunks = split_message(text, MSG_CHUNK_LEN)
+    if len(chunks) < EMBED_MIN_CHUNKS:
+        for i, chunk in enumerate(chunks):
+            await _send_with_retry(target, content=chunk,
+                                   view=view if i == len(chunks) - 1 else None)
+        return
+
+    batches = _pack_embeds(split_message(text, EMBED_CHUNK_LEN))
+    for i, batch in enumerate(batches):
+        embeds = [discord.Embed(description=piece) for piece in batch]
+        await _send_with_retry(target, embeds=embeds,
+                               view=view if i == len(batches) - 1 else None)
+
+# ─── 확인 버튼 (재시작에도 유지) ─────────────────────
+# 확인할 내용은 상태 백엔드(SQLite confirmations 테이블 | Redis 해시)에 토큰으로 저장하고 버튼 custom_id 에 "confirm:{kind}:{ok|no}:{token}" 만 실음.
+# 버튼 클래스는 시작 시 한 번 등록 → 메시지마다 View 객체를 들고 있지 않고, 재시작 후에도 클릭이 디스패처로 옴.
+# 새 확인 흐름은 register_confirm(kind, ...) + send_confirmation(...) 만 쓰면 됨.
+@dataclass
+class ConfirmFlow:
+    on_confirm:   callable   # async (interaction, data) -> 결과 메시지 (실패는 ConfirmFailed)
+    cancel_text:  str
+    expired_text: str = "⌛ 이미 처리됐거나 만료된 요청이에요."
+    labels:       tuple[str, str] = ("✅ 확인", "❌ 취소")
+
+CONFIRM_FLOWS: dict[str, ConfirmFlow] = {}
+
+class ConfirmFailed(Exception):
+    """on_confirm 에서 올리면 메시지를 그대로 보여주고 버튼을 남겨 다시 누를 수 있게 함"""
+
+def register_confirm(kind: str, on_confirm, cancel_text: str, **options):
+    """코그 cog_load 에서 호출 (리로드하면 새 핸들러로 교체됨)"""
+    CONFIRM_FLOWS[kind] = ConfirmFlow(on_confirm, cancel_text, **options)
+
+def _confirm_put(token: str, kind: str, channel_id: int, data: dict, ttl_sec: float):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            "INSERT INTO confirmations (token, kind, channel_id, data, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (token, kind, channel_id, json.dumps(data, ensure_ascii=False), time.time() + ttl_sec)
+        )
+        conn.commit()
+
+def _confirm_attach(token: str, message_id: int):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("UPDATE confirmations SET message_id = ? WHERE token = ?", (message_id, token))
+        conn.commit()
+
+def _confirm_missing(conn: sqlite3.Connection, token: str, now: float) -> str:
+    """처리 권한을 못 얻은 이유: busy (다른 클릭이 처리 중) | gone (처리됨·취소됨·만료)"""
+    row = conn.execute("SELECT expires_at FROM confirmations WHERE token = ?", (token,)).fetchone()
+    return "busy" if row and row[0] >= now else "gone"
+
+def _confirm_claim(token: str) -> tuple[str, dict | None]:
+    """확인 처리 권한 획득 — 버튼을 두 번 눌러도(다른 프로세스에서도) 한 번만 처리. 행은 성공 후 삭제."""
+    now = time.time()
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute("""
+            UPDATE confirmations SET claimed_until = ?
+            WHERE token = ? AND expires_at >= ? AND (claimed_until IS NULL OR claimed_until < ?)
+            RETURNING data
+        """, (now + CONFIRM_CLAIM_SEC, token, now, now)).fetchone()
+        conn.commit()
+        if row:
+            return "ok", json.loads(row[0])
+        return _confirm_missing(conn, token, now), None
+
+def _confirm_release(token: str):
+    """on_confirm 실패 — 처리 중 표시를 풀어 다시 누를 수 있게"""
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("UPDATE confirmations SET claimed_until = NULL WHERE token = ?", (token,))
+        conn.commit()
+
+def _confirm_cancel(token: str) -> str:
+    """처리 중이 아니면 삭제: ok | busy | gone"""
+    now = time.time()
+    with sqlite3.connect(DB_PATH) as conn:
+        cur = conn.execute("""
+            DELETE FROM confirmations
+            WHERE token = ? AND expires_at >= ? AND (claimed_until IS NULL OR claimed_until < ?)
+        """, (token, now, now))
+        conn.commit()
+        return "ok" if cur.rowcount else _confirm_missing(conn, token, now)
+
+def _confirm_expired() -> list[tuple]:
+    """만료된 확인 (처리 중인 것은 제외)"""
+    now = time.time()
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("""
+            SELECT token, channel_id, message_id FROM confirmations
+            WHERE expires_at < ? AND (claimed_until IS NULL OR claimed_until < ?)
+        """, (now, now)).fetchall()
+
+def _confirm_drop(token: str) -> bool:
+    with sqlite3.connect(DB_PATH) as conn:
+        cur = conn.execute("DELETE FROM confirmations WHERE token = ?", (token,))
+        conn.commit()
+        return cur.rowcount == 1
+
+class ConfirmButton(discord.ui.DynamicItem[discord.ui.Button],
+                    template=r"confirm:(?P<kind>\w+):(?P<action>ok|no):(?P<token>[0-9a-f]{16})"):
+    """확인/취소 버튼. 상태는 custom_id 에만 있으므로 어느 프로세스·재시작 후에도 같은 디스패처로 처리."""
+
+    def __init__(self, kind: str, action: str, token: str, label: str | None = None):
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=discord.ButtonStyle.green if action == "ok" else discord.ButtonStyle.red,
+            custom_id=f"confirm:{kind}:{action}:{token}",
+        ))
+        self.kind, self.action, self.token = kind, action, token
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["kind"], match["action"], match["token"], item.label)
+
+    async def callback(self, interaction: discord.Interaction):
+        await dispatch_confirm(interaction, self.kind, self.action, self.token)
+
+async def send_confirmation(target, kind: str, content: str, data: dict,
+                            ttl_sec: float = CONFIRM_TTL_SEC) -> discord.Message:
+    """미리보기 + 확인/취소 버튼 전송. data 는 확인 시 on_confirm 에 그대로 전달."""
+    flow  = CONFIRM_FLOWS[kind]
+    token = secrets.token_hex(8)
+    channel_id = target.channel.id if isinstance(target, commands.Context) else target.id
+    await state_backend.confirm_put(token, kind, channel_id, data, ttl_sec)
+    view = discord.ui.View(timeout=None)
+    view.add_item(ConfirmButton(kind, "ok", token, flow.labels[0]))
+    view.add_item(ConfirmButton(kind, "no", token, flow.labels[1]))
+    view.stop()   # 컴포넌트만 보내고 View 는 보관하지 않음 (클릭은 ConfirmButton 템플릿으로 들어옴)
+    message = await _send_with_retry(target, content=content, view=view)
+    await state_backend.confirm_attach(token, message.id)
+    return message
+
+async def dispatch_confirm(interaction: discord.Interaction, kind: str, action: str, token: str):
+    flow = CONFIRM_FLOWS.get(kind)
+    if flow is None:   # 코그 리로드 중 등 — 행은 그대로 두고 다시 누르게
+        await interaction.response.send_message("⏳ 잠시 후 다시 눌러주세요.", ephemeral=True)
+        return
+    if action == "no":
+        state = await state_backend.confirm_cancel(token)
+        if state == "ok":
+            await interaction.response.edit_message(content=flow.cancel_text, view=None)
+        elif state == "busy":
+            await interaction.response.send_message("⏳ 이미 처리 중이에요.", ephemeral=True)
+        else:
+            await interaction.response.edit_message(content=flow.expired_text, view=None)
+        return
+    state, data = await state_backend.confirm_claim(token)
+    if state == "busy":
+        await interaction.response.send_message("⏳ 이미 처리 중이에요.", ephemeral=True)
+        return
+    if state == "gone":
+        await interaction.response.edit_message(content=flow.expired_text, view=None)
+        return
+    await interaction.response.defer()
+    try:
+        result = await flow.on_confirm(interaction, data)
+    except Exception as e:
+        log("확인 버튼", f"{kind} {type(e).__name__}: {e}", level=logging.ERROR, channel=interaction.channel_id)
+        await state_backend.confirm_release(token)   # 버튼은 그대로 — 다시 누를 수 있음
+        text = str(e) if isinstance(e, ConfirmFailed) else "❌ 처리 중 오류가 났어요. 다시 시도해주세요."
+        await interaction.followup.send(text, ephemeral=True)
+        return
+    await state_backend.confirm_drop(token)
+    await interaction.edit_original_response(content=result, view=None)
+
+async def sweep_confirmations():
+    """만료된 확인의 버튼 제거. TTL 만으로 판단 — 행을 지운 워커가 (채널 캐시 없이 REST 로) 버튼도 제거."""
+    for token, channel_id, message_id in await state_backend.confirm_expired():
+        if not await state_backend.confirm_drop(token):
+            continue   # 다른 워커가 이미 정리
+        if message_id:
+            try:
+                await bot.get_partial_messageable(channel_id).get_partial_message(message_id).edit(view=None)
+            except discord.HTTPException:
+                pass
+
+async def _confirm_sweeper():
+    while True:
+        await asyncio.sleep(CONFIRM_SWEEP_SEC)
+        try:
+            await sweep_confirmations()
+        except Exception as e:
+            log("확인 버튼", f"만료 정리 {type(e).__name__}: {e}", level=logging.WARNING)
+
+# ─── 중복 방지 (멱등성) ───────────────────────────────
+# (제목, 날짜, 시간) / (제목, 본문)을 정규화한 지문을 TTL 테이블에 기록하고
+# 같은 지문이 다시 오면 Notion/캘린더 호출 전에 건너뜀.
+_idem_inflight: dict[str, asyncio.Future] = {}   # 진행 중인 쓰기 → 성공 여부 (같은 요청은 결과를 기다림)
+_idem_saved:    dict[str, int] = {}      # 종류별 이번 실행에서 아낀 API 호출 수
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[\W_]+", "", unicodedata.normalize("NFKC", text or "").lower())
+
+def fingerprint(kind: str, *parts: str) -> str:
+    key = "\x1f".join([kind, *(_normalize(p) for p in parts)])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def _idem_seen(fp: str) -> bool:
+    with sqlite3.connect(DB_PATH) as conn:
+        cur = conn.execute(
+            "UPDATE idempotency_keys SET hits = hits + 1 WHERE fingerprint = ? AND expires_at > ?",
+            (fp, time.time())
+        )
+        conn.commit()
+        return cur.rowcount > 0
+
+def _idem_store(fp: str, kind: str, label: str):
+    now = time.time()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "INSERT OR REPLACE INTO idempotency_keys (fingerprint, kind, label, expires_at) "
+            "VALUES (?, ?, ?, ?)",
+            (fp, kind, label[:100], now + IDEMPOTENCY_TTL_SEC[kind])
+        )
+        conn.commit()
+
+def _idem_totals() -> list[tuple]:
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute(
+            "SELECT kind, COUNT(*), SUM(hits) FROM idempotency_keys "
+            "WHERE expires_at > ? GROUP BY kind", (time.time(),)
+        ).fetchall()
+
+def _idem_skip(kind: str, parts: tuple) -> None:
+    _idem_saved[kind] = _idem_saved.get(kind, 0) + 1
+    log("중복 방지", f"{kind} 건너뜀: {' | '.join(parts)[:60]}", kind=kind)
+    return None
+
+def _idem_release(fp: str, ok: bool):
+    fut = _idem_inflight.pop(fp, None)
+    if fut is not None and not fut.done():
+        fut.set_result(ok)
+
+async def idem_begin(kind: str, *parts: str) -> str | None:
+    """
+    이미 기록된 요청이면 None, 처음이면 지문 반환 (작업 후 finally 에서 idem_end 호출 필수).
+    같은 요청이 처리 중이면 그 결과를 기다림 — 성공했으면 중복, 실패했으면 이쪽이 다시 시도.
+    """
+    fp = fingerprint(kind, *parts)
+    while (first := _idem_inflight.get(fp)) is not None:
+        if await asyncio.shield(first):
+            return _idem_skip(kind, parts)
+    _idem_inflight[fp] = asyncio.get_running_loop().create_future()   # 확인 전에 선점 (await 사이 경합 방지)
+    try:
+        seen = await asyncio.to_thread(_idem_seen, fp)
+    except BaseException:
+        _idem_release(fp, False)
+        raise
+    if seen:
+        _idem_release(fp, True)
+        return _idem_skip(kind, parts)
+    return fp
+
+async def idem_end(kind: str, fp: str, label: str, ok: bool):
+    """원격 쓰기 성공 시에만 지문 기록. 기다리던 같은 요청에 결과 전달."""
+    try:
+        if ok:
+            await asyncio.to_thread(_idem_store, fp, kind, label)
+    finally:
+        _idem_release(fp, ok)
+
+def _rich_text(text: str) -> list:
+    """Notion rich_text 블록 생성 (2000자 제한 대응)"""
+    return [{"type": "text", "text": {"content": text[:2000]}}]
+
+# 헬스 기록 자동 불러오기 키워드
+
+def _prop_text(page: dict, key: str) -> str:
+    """Notion 페이지 프로퍼티에서 텍스트 값 추출 (title / rich_text 모두 지원)"""
+    prop = page["properties"].get(key, {})
+    if not prop:
+        return ""
+    ptype = prop.get("type", "")
+    if ptype == "title":
+        items = prop.get("title", [])
+    elif ptype == "rich_text":
+        items = prop.get("rich_text", [])
+    else:
+        return ""
+    return "".join(r.get("text", {}).get("content", "") for r in items).strip()
+
+async def notion_get_health_logs(days: int = 7) -> str:
+    """
+    Notion 헬스 DB에서 최근 N일 기록 조회.
+    구조화된 프로퍼티(운동/아침/점심/저녁)에서 직접 읽어 raw 데이터 반환.
+    regex 파싱 없음 → 100% 정확. 실패하면 로그 후 "".
+    """
+    try:
+        return await _notion_get_health_logs(days)
+    except Exception as e:
+        log("Notion 헬스 조회", f"{type(e).__name__}: {e}", level=logging.ERROR)
+        return ""
+
+async def _notion_get_health_logs(days: int) -> str:
+    """notion_get_health_logs 의 예외를 그대로 올리는 버전 (브리핑 캐시용 — 실패를 "기록 없음" 으로 캐시하지 않게)"""
+    if not notion or not NOTION_HEALTH_DB_ID:
+        log("Notion 헬스 조회", "클라이언트 또는 DB ID 없음", level=logging.WARNING)
+        return ""
+    since = (kst_today() - timedelta(days=days)).isoformat()
+    res = await notion.databases.query(
+        database_id=NOTION_HEALTH_DB_ID,
+        filter={"property": "날짜", "date": {"on_or_after": since}},
+        sorts=[{"property": "날짜", "direction": "ascending"}],
+    )
+    log("Notion 헬스 조회", f"{len(res['results'])}개 (최근 {days}일)", level=logging.DEBUG, count=len(res["results"]), days=days)
+    if not res["results"]:
+        return ""
+
+    rows = []
+    for page in res["results"]:
+        date_obj = page["properties"].get("날짜", {}).get("date") or {}
+        log_date = date_obj.get("start", "날짜미상")
+
+        workout   = _prop_text(page, "운동")
+        breakfast = _prop_text(page, "아침")
+        lunch     = _prop_text(page, "점심")
+        dinner    = _prop_text(page, "저녁")
+
+        parts = [f"날짜: {log_date}"]
+        if workout:   parts.append(f"운동: {workout}")
+        if breakfast: parts.append(f"아침: {breakfast}")
+        if lunch:     parts.append(f"점심: {lunch}")
+        if dinner:    parts.append(f"저녁: {dinner}")
+
+        rows.append(" | ".join(parts))
+
+    return "\n".join(rows)
+
+async def notion_save_health_structured(
+    log_date: str,
+    workout: str,
+    breakfast: str,
+    lunch: str,
+    dinner: str,
+    narrative: str,
+) -> str:
+    """
+    헬스 기록을 구조화 프로퍼티 + 서술형 본문으로 저장.
+    기존 날짜 → UPDATE, 없으면 → CREATE.
+    반환: "created" | "updated" | "error"
+    """
+    if not notion or not NOTION_HEALTH_DB_ID:
+        return "error"
+    try:
+        props = {
+            "이름":  {"title": [{"text": {"content": f"헬스 일지 - {log_date}"}}]},
+            "날짜":  {"date": {"start": log_date}},
+            "운동":  {"rich_text": _rich_text(workout)},
+            "아침":  {"rich_text": _rich_text(breakfast)},
+            "점심":  {"rich_text": _rich_text(lunch)},
+            "저녁":  {"rich_text": _rich_text(dinner)},
+        }
+        children = [{"object": "block", "type": "paragraph",
+                     "paragraph": {"rich_text": _rich_text(narrative)}}] if narrative else []
+
+        res = await notion.databases.query(
+            database_id=NOTION_HEALTH_DB_ID,
+            filter={"property": "날짜", "date": {"equals": log_date}}
+        )
+        if res["results"]:
+            page_id = res["results"][0]["id"]
+            await notion.pages.update(page_id=page_id, properties=props)
             if children:
                 old_blocks = await notion.blocks.children.list(block_id=page_id)
                 for b in old_blocks["results"]:
                     await notion.blocks.delete(block_id=b["id"])
                 await notion.blocks.children.append(block_id=page_id, children=children)
-            print(f"[Notion 헬스 업데이트] {log_date}")
+            log("Notion 헬스 저장", f"업데이트 {log_date}")
+            briefing_cache.invalidate("health")
             return "updated"
         else:
             await notion.pages.create(
@@ -420,18 +2534,32 @@ async def notion_save_health_structured(
                 properties=props,
                 children=children,
             )
-            print(f"[Notion 헬스 생성] {log_date}")
+            log("Notion 헬스 저장", f"생성 {log_date}")
+            briefing_cache.invalidate("health")
             return "created"
     except Exception as e:
-        print(f"[Notion 헬스 저장 오류] {log_date}: {e}")
+        log("Notion 헬스 저장", f"{log_date}: {e}", level=logging.ERROR)
         return "error"
 
 
 # ─── Notion: 할일 ─────────────────────────────────────
 async def notion_add_todo(title: str, due_date: str = "", priority: str = "중간") -> bool:
-    """할일을 Notion DB에 추가 (프로퍼티: 이름/마감일/완료/우선순위)"""
+    """할일을 Notion DB에 추가 (프로퍼티: 이름/마감일/완료/우선순위). 같은 할일은 TTL 동안 한 번만."""
     if not notion or not NOTION_TODO_DB_ID:
         return False
+    fp = await idem_begin("todo", title, due_date)
+    if fp is None:
+        return True   # 이미 추가됨 (멱등)
+    ok = False
+    try:
+        ok = await _notion_add_todo(title, due_date, priority)
+    finally:
+        await idem_end("todo", fp, title, ok)
+    if ok:
+        briefing_cache.invalidate("todos")
+    return ok
+
+async def _notion_add_todo(title: str, due_date: str, priority: str) -> bool:
     try:
         props = {
             "이름":     {"title": [{"text": {"content": title}}]},
@@ -440,39 +2568,58 @@ async def notion_add_todo(title: str, due_date: str = "", priority: str = "중
         }
         if due_date:
             props["마감일"] = {"date": {"start": due_date}}
-        await notion.pages.create(
+        page = await notion.pages.create(
             parent={"database_id": NOTION_TODO_DB_ID},
             properties=props
         )
+        reminder_engine.upsert(page["id"], title, due_date)
         return True
     except Exception as e:
-        print(f"[Notion 할일 추가 오류] {e}")
+        log("Notion 할일 추가", str(e), level=logging.ERROR)
         return False
 
+def _parse_todo_page(page: dict) -> dict:
+    props = page["properties"]
+    title_arr = props.get("이름", {}).get("title", [])
+    title     = title_arr[0]["text"]["content"] if title_arr else "제목없음"
+    due_obj   = props.get("마감일", {}).get("date") or {}
+    due       = due_obj.get("start", "")
+    pri_obj   = props.get("우선순위", {}).get("select") or {}
+    priority  = pri_obj.get("name", "")
+    done      = props.get("완료", {}).get("checkbox", False)
+    return {"id": page["id"], "title": title, "due": due, "priority": priority, "done": done}
+
+async def notion_query_todos(filter: dict) -> list[dict]:
+    """할일 DB 전체 페이지네이션 조회 (마감 알림 동기화용)"""
+    todos, cursor = [], None
+    while True:
+        kwargs = {"database_id": NOTION_TODO_DB_ID, "filter": filter, "page_size": 100}
+        if cursor:
+            kwargs["start_cursor"] = cursor
+        res = await notion.databases.query(**kwargs)
+        todos.extend(_parse_todo_page(page) for page in res["results"])
+        if not res.get("has_more"):
+            return todos
+        cursor = res["next_cursor"]
+
 async def notion_get_todos() -> list[dict]:
-    """Notion DB에서 미완료 할일 조회"""
-    if not notion or not NOTION_TODO_DB_ID:
-        return []
+    """Notion DB에서 미완료 할일 조회 (실패하면 로그 후 [])"""
     try:
-        res = await notion.databases.query(
-            database_id=NOTION_TODO_DB_ID,
-            filter={"property": "완료", "checkbox": {"equals": False}},
-            sorts=[{"property": "마감일", "direction": "ascending"}]
-        )
-        todos = []
-        for page in res["results"]:
-            props = page["properties"]
-            title_arr = props.get("이름", {}).get("title", [])
-            title     = title_arr[0]["text"]["content"] if title_arr else "제목없음"
-            due_obj   = props.get("마감일", {}).get("date") or {}
-            due       = due_obj.get("start", "")
-            pri_obj   = props.get("우선순위", {}).get("select") or {}
-            priority  = pri_obj.get("name", "")
-            todos.append({"id": page["id"], "title": title, "due": due, "priority": priority})
-        return todos
+        return await _notion_get_todos()
     except Exception as e:
-        print(f"[Notion 할일 조회 오류] {e}")
+        log("Notion 할일 조회", str(e), level=logging.ERROR)
+        return []
+
+async def _notion_get_todos() -> list[dict]:
+    """예외를 그대로 올리는 버전 (브리핑 캐시용)"""
+    if not notion or not NOTION_TODO_DB_ID:
         return []
+    res = await notion.databases.query(
+        database_id=NOTION_TODO_DB_ID,
+        filter={"property": "완료", "checkbox": {"equals": False}},
+        sorts=[{"property": "마감일", "direction": "ascending"}]
+    )
+    return [_parse_todo_page(page) for page in res["results"]]
 
 async def notion_complete_todo(title: str) -> bool:
     """할일 이름으로 검색해 완료 처리"""
@@ -495,9 +2642,11 @@ async def notion_complete_todo(title: str) -> bool:
             page_id=page_id,
             properties={"완료": {"checkbox": True}}
         )
+        briefing_cache.invalidate("todos")
+        reminder_engine.remove(page_id)
         return True
     except Exception as e:
-        print(f"[Notion 할일 완료 오류] {e}")
+        log("Notion 할일 완료", str(e), level=logging.ERROR)
         return False
 
 # ─── Notion: 번역 기록 ────────────────────────────────
@@ -506,7 +2655,7 @@ async def notion_save_translation(original: str, translated: str) -> bool:
     if not notion or not NOTION_TRANSLATION_DB_ID:
         return False
     try:
-        today = date.today().isoformat()
+        today = kst_today().isoformat()
         await notion.pages.create(
             parent={"database_id": NOTION_TRANSLATION_DB_ID},
             properties={
@@ -523,16 +2672,27 @@ async def notion_save_translation(original: str, translated: str) -> bool:
         )
         return True
     except Exception as e:
-        print(f"[Notion 번역 저장 오류] {e}")
+        log("Notion 번역 저장", str(e), level=logging.ERROR)
         return False
 
 # ─── Notion: 메모 ─────────────────────────────────────
 async def notion_save_memo(title: str, content: str) -> bool:
-    """메모를 Notion DB에 저장 (프로퍼티: 제목/내용/날짜)"""
+    """메모를 Notion DB에 저장 (프로퍼티: 제목/내용/날짜). 같은 메모는 TTL 동안 한 번만."""
     if not notion or not NOTION_MEMO_DB_ID:
         return False
+    fp = await idem_begin("memo", title, content)
+    if fp is None:
+        return True   # 이미 저장됨 (멱등)
+    ok = False
+    try:
+        ok = await _notion_save_memo(title, content)
+    finally:
+        await idem_end("memo", fp, title, ok)
+    return ok
+
+async def _notion_save_memo(title: str, content: str) -> bool:
     try:
-        today = date.today().isoformat()
+        today = kst_today().isoformat()
         await notion.pages.create(
             parent={"database_id": NOTION_MEMO_DB_ID},
             properties={
@@ -544,7 +2704,7 @@ async def notion_save_memo(title: str, content: str) -> bool:
         )
         return True
     except Exception as e:
-        print(f"[Notion 메모 저장 오류] {e}")
+        log("Notion 메모 저장", str(e), level=logging.ERROR)
         return False
 
 # ─── Notion: 수정 함수들 ──────────────────────────────
@@ -570,9 +2730,13 @@ async def notion_update_todo(old_title: str, new_title: str = "", due_date: str
         if not props:
             return False
         await notion.pages.update(page_id=page_id, properties=props)
+        briefing_cache.invalidate("todos")
+        todo = _parse_todo_page(res["results"][0])
+        if not todo["done"]:
+            reminder_engine.upsert(page_id, new_title or todo["title"], due_date or todo["due"])
         return True
     except Exception as e:
-        print(f"[Notion 할일 수정 오류] {e}")
+        log("Notion 할일 수정", str(e), level=logging.ERROR)
         return False
 
 async def notion_update_memo(title: str, new_title: str = "", new_content: str = "") -> bool:
@@ -605,7 +2769,7 @@ async def notion_update_memo(title: str, new_title: str = "", new_content: str =
             )
         return True
     except Exception as e:
-        print(f"[Notion 메모 수정 오류] {e}")
+        log("Notion 메모 수정", str(e), level=logging.ERROR)
         return False
 
 async def notion_update_health_log(date_str: str, new_content: str) -> bool:
@@ -631,101 +2795,357 @@ async def notion_update_health_log(date_str: str, new_content: str) -> bool:
         )
         return True
     except Exception as e:
-        print(f"[Notion 헬스 기록 수정 오류] {e}")
+        log("Notion 헬스 기록 수정", str(e), level=logging.ERROR)
         return False
 
-# ─── Google Calendar ──────────────────────────────────
-def _get_calendar_service():
+# ─── Google Calendar (비동기 클라이언트) ───────────────
+# googleapiclient + to_thread 대신 events insert/list 엔드포인트를 aiohttp keep-alive 세션으로 직접 호출.
+# 스레드를 점유하지 않고, 연결은 풀에서 재사용. 토큰은 서비스 계정 JWT로 비동기 갱신.
+GOOGLE_CALENDAR_SCOPE = "https://www.googleapis.com/auth/calendar"
+GOOGLE_BATCH_MAX      = 50   # batch 요청 1개당 최대 하위 요청 수
+
+_BATCH_STATUS_RE = re.compile(r"^HTTP/1\.1 (\d{3})", re.M)
+
+class CalendarError(Exception):
+    def __init__(self, status: int, body):
+        self.status = status
+        self.body   = body
+        super().__init__(f"HTTP {status}: {body}")
+
+class AsyncCalendarClient:
+    def __init__(self, creds_info: dict, calendar_id: str,
+                 api_base: str = GOOGLE_CALENDAR_API_BASE, pool_size: int = GOOGLE_CALENDAR_POOL):
+        self._email       = creds_info["client_email"]
+        from google.auth import crypt as google_crypt
+        self._signer      = google_crypt.RSASigner.from_service_account_info(creds_info)
+        self._token_uri   = GOOGLE_TOKEN_URI or creds_info.get("token_uri", "https://oauth2.googleapis.com/token")
+        self._calendar_id = calendar_id
+        self._api_base    = api_base.rstrip("/")
+        self._pool_size   = pool_size
+        self._session:    aiohttp.ClientSession | None = None
+        self._token       = ""
+        self._expiry      = 0.0
+        self._token_lock  = asyncio.Lock()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._pool_size, keepalive_timeout=60, ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(total=15),
+            )
+        return self._session
+
+    async def _access_token(self) -> str:
+        if self._token and time.time() < self._expiry - 60:
+            return self._token
+        async with self._token_lock:
+            if self._token and time.time() < self._expiry - 60:   # 대기 중 다른 코루틴이 갱신함
+                return self._token
+            now = int(time.time())
+            from google.auth import jwt as google_jwt
+            assertion = google_jwt.encode(self._signer, {
+                "iss":   self._email,
+                "scope": GOOGLE_CALENDAR_SCOPE,
+                "aud":   self._token_uri,
+                "iat":   now,
+                "exp":   now + 3600,
+            })
+            async with self._get_session().post(self._token_uri, data={
+                "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
+                "assertion":  assertion.decode(),
+            }) as resp:
+                body = await resp.json(content_type=None)
+                if resp.status != 200:
+                    raise CalendarError(resp.status, body)
+            self._token  = body["access_token"]
+            self._expiry = now + int(body.get("expires_in", 3600))
+            return self._token
+
+    async def _request(self, method: str, path: str, *, params: dict | None = None,
+                       json_body: dict | None = None) -> dict:
+        for attempt in (1, 2):
+            token = await self._access_token()
+            async with self._get_session().request(
+                method, f"{self._api_base}{path}", params=params, json=json_body,
+                headers={"Authorization": f"Bearer {token}"},
+            ) as resp:
+                if resp.status == 401 and attempt == 1:   # 토큰 만료/회수 → 한 번만 재발급
+                    self._token = ""
+                    continue
+                body = await resp.json(content_type=None)
+                if resp.status >= 400:
+                    raise CalendarError(resp.status, body)
+                return body
+
+    @property
+    def _events_path(self) -> str:
+        return f"/calendars/{quote(self._calendar_id, safe='')}/events"
+
+    async def check(self):
+        """토큰 발급으로 자격 증명 확인 + 연결 미리 열기"""
+        await self._access_token()
+
+    async def insert_event(self, event: dict) -> dict:
+        return await self._request("POST", self._events_path, json_body=event)
+
+    async def insert_events(self, events: list[dict]) -> list[dict | CalendarError]:
+        """
+        여러 일정을 batch 엔드포인트(multipart/mixed)로 한 번의 HTTP 요청에 추가.
+        결과는 입력 순서대로 — 성공은 이벤트 dict, 실패는 CalendarError.
+        """
+        if len(events) == 1:
+            try:
+                return [await self.insert_event(events[0])]
+            except CalendarError as e:
+                return [e]
+        results: list[dict | CalendarError] = []
+        for i in range(0, len(events), GOOGLE_BATCH_MAX):
+            results.extend(await self._batch_insert(events[i:i + GOOGLE_BATCH_MAX]))
+        return results
+
+    async def _batch_insert(self, events: list[dict]) -> list[dict | CalendarError]:
+        api       = urlsplit(self._api_base)
+        batch_url = f"{api.scheme}://{api.netloc}/batch{api.path}"
+        boundary  = f"batch_{int(time.time() * 1000)}"
+        parts = []
+        for i, event in enumerate(events):
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <item{i}>\r\n\r\n"
+                f"POST {api.path}{self._events_path} HTTP/1.1\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(event, ensure_ascii=False)}\r\n"
+            )
+        payload = ("".join(parts) + f"--{boundary}--\r\n").encode()
+
+        for attempt in (1, 2):
+            token = await self._access_token()
+            async with self._get_session().post(batch_url, data=payload, headers={
+                "Authorization": f"Bearer {token}",
+                "Content-Type":  f"multipart/mixed; boundary={boundary}",
+            }) as resp:
+                if resp.status == 401 and attempt == 1:
+                    self._token = ""
+                    continue
+                text = await resp.text()
+                if resp.status >= 400:
+                    raise CalendarError(resp.status, text)
+                ctype = resp.headers.get("Content-Type", "")
+                resp_boundary = ctype.split("boundary=", 1)[1].strip('"') if "boundary=" in ctype else boundary
+                return self._parse_batch_response(text, resp_boundary, len(events))
+
+    @staticmethod
+    def _parse_batch_response(text: str, boundary: str, count: int) -> list[dict | CalendarError]:
+        results: list[dict | CalendarError] = [CalendarError(0, "응답 없음")] * count
+        for part in text.split(f"--{boundary}"):
+            m_id     = re.search(r"Content-ID:\s*<response-item(\d+)>", part, re.I)
+            m_status = _BATCH_STATUS_RE.search(part)
+            if not m_id or not m_status:
+                continue
+            idx, status = int(m_id.group(1)), int(m_status.group(1))
+            body_text   = part[m_status.end():].split("\r\n\r\n", 1)[-1].strip()
+            try:
+                body = json.loads(body_text) if body_text else {}
+            except json.JSONDecodeError:
+                body = body_text
+            if idx < count:
+                results[idx] = body if status < 400 else CalendarError(status, body)
+        return results
+
+    async def list_events(self, time_min: str, time_max: str) -> list[dict]:
+        params = {
+            "timeMin":      time_min,
+            "timeMax":      time_max,
+            "singleEvents": "true",
+            "orderBy":      "startTime",
+        }
+        items = []
+        while True:
+            body = await self._request("GET", self._events_path, params=params)
+            items.extend(body.get("items", []))
+            if not body.get("nextPageToken"):
+                return items
+            params["pageToken"] = body["nextPageToken"]
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+_calendar_client: AsyncCalendarClient | None = None
+
+def get_calendar_client() -> AsyncCalendarClient | None:
+    global _calendar_client
+    if _calendar_client is not None:
+        return _calendar_client
     if not GOOGLE_AVAILABLE or not GOOGLE_CREDENTIALS_JSON or not GOOGLE_CALENDAR_ID:
         return None
     try:
-        creds_info = json.loads(GOOGLE_CREDENTIALS_JSON)
-        creds = service_account.Credentials.from_service_account_info(
-            creds_info,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        return google_build("calendar", "v3", credentials=creds)
+        _calendar_client = AsyncCalendarClient(json.loads(GOOGLE_CREDENTIALS_JSON), GOOGLE_CALENDAR_ID)
     except Exception as e:
-        print(f"[Google Calendar 서비스 오류] {e}")
+        log("Google Calendar 서비스", str(e), level=logging.ERROR)
         return None
+    return _calendar_client
 
-def _add_event_sync(title: str, start_dt: str, end_dt: str, description: str = "") -> bool:
-    service = _get_calendar_service()
-    if not service:
-        return False
+def build_event_body(title: str, start_dt: str, end_dt: str, description: str = "") -> dict:
     # 종일 이벤트: start_dt가 날짜(YYYY-MM-DD)만 있는 경우
     if "T" not in start_dt:
-        event = {
+        return {
             "summary":     title,
             "description": description,
             "start": {"date": start_dt},
             "end":   {"date": end_dt},
         }
-    else:
-        event = {
-            "summary":     title,
-            "description": description,
-            "start": {"dateTime": start_dt, "timeZone": "Asia/Seoul"},
-            "end":   {"dateTime": end_dt,   "timeZone": "Asia/Seoul"},
-        }
-    service.events().insert(calendarId=GOOGLE_CALENDAR_ID, body=event).execute()
-    return True
-
-def _get_events_sync(time_min: str, time_max: str) -> list[dict]:
-    service = _get_calendar_service()
-    if not service:
-        return []
-    result = service.events().list(
-        calendarId=GOOGLE_CALENDAR_ID,
-        timeMin=time_min,
-        timeMax=time_max,
-        singleEvents=True,
-        orderBy="startTime"
-    ).execute()
-    events = []
-    for e in result.get("items", []):
-        start = e["start"].get("dateTime", e["start"].get("date", ""))
-        events.append({"title": e.get("summary", "제목없음"), "start": start})
-    return events
+    return {
+        "summary":     title,
+        "description": description,
+        "start": {"dateTime": start_dt, "timeZone": "Asia/Seoul"},
+        "end":   {"dateTime": end_dt,   "timeZone": "Asia/Seoul"},
+    }
 
 async def calendar_add_event(title: str, start_dt: str, end_dt: str, description: str = "") -> bool:
+    client = get_calendar_client()
+    if not client:
+        return False
     try:
-        return await asyncio.to_thread(_add_event_sync, title, start_dt, end_dt, description)
+        await client.insert_event(build_event_body(title, start_dt, end_dt, description))
+        return True
     except Exception as e:
-        print(f"[Google Calendar 추가 오류] {e}")
+        log("Google Calendar 추가", str(e), level=logging.ERROR)
         return False
 
+async def calendar_add_events(events: list[dict]) -> list[str]:
+    """
+    event_datetimes 형식 일정 여러 개를 batch 요청 한 번으로 추가.
+    입력 순서대로 "added" | "duplicate" | "failed". 중복은 원격 호출 없이 건너뜀.
+    """
+    client = get_calendar_client()
+    if not client or not events:
+        return ["failed"] * len(events)
+    statuses = ["duplicate"] * len(events)
+    pending: list[tuple[int, str]] = []   # (인덱스, 지문) — 아직 idem_end 안 한 것
+    bodies = []
+    first_of: dict[str, int] = {}         # 지문 → 이 묶음에서 처음 나온 인덱스
+    repeats:  dict[int, int] = {}         # 같은 묶음 안 중복 인덱스 → 처음 인덱스
+    try:
+        for i, event in enumerate(events):
+            try:
+                start_dt, end_dt, time_str = event_datetimes(event)
+                body = build_event_body(event["title"], start_dt, end_dt, event.get("description", ""))
+            except (KeyError, ValueError) as e:   # 형식이 잘못된 일정만 실패 처리
+                log("Google Calendar 추가", f"{event.get('title', '?')}: {e}", level=logging.ERROR)
+                statuses[i] = "failed"
+                continue
+            key = fingerprint("calendar", event["title"], event["date"], time_str)
+            if key in first_of:   # 같은 묶음 안의 중복은 처음 것의 결과를 따름 (자기 결과를 기다리면 멈춤)
+                repeats[i] = first_of[key]
+                continue
+            first_of[key] = i
+            fp = await idem_begin("calendar", event["title"], event["date"], time_str)
+            if fp is None:
+                continue
+            pending.append((i, fp))
+            bodies.append(body)
+        if not bodies:
+            return statuses
+        try:
+            results = await client.insert_events(bodies)
+        except Exception as e:
+            log("Google Calendar 일괄 추가", str(e), level=logging.ERROR)
+            results = [CalendarError(0, str(e))] * len(bodies)
+        for (i, fp), r in zip(list(pending), results):
+            pending.remove((i, fp))
+            ok = not isinstance(r, CalendarError)
+            if not ok:
+                log("Google Calendar 추가", f"{events[i]['title']}: {r}", level=logging.ERROR)
+            statuses[i] = "added" if ok else "failed"
+            await idem_end("calendar", fp, events[i]["title"], ok)
+    finally:
+        for i, fp in pending:   # 예외·취소로 못 끝낸 지문은 실패로 해제
+            await idem_end("calendar", fp, events[i]["title"], False)
+    for i, first in repeats.items():
+        statuses[i] = "failed" if statuses[first] == "failed" else "duplicate"
+    if "added" in statuses:
+        briefing_cache.invalidate("events")
+    return statuses
+
+EVENT_STATUS_MARK = {"added": "✅", "duplicate": "♻️ (이미 있음)", "failed": "❌"}
+
+def format_event_results(events: list[dict], statuses: list[str], header: str) -> str:
+    """여러 일정 추가 결과를 디스코드 메시지 하나로"""
+    added = sum(st == "added" for st in statuses)
+    lines = [f"{header} ({added}/{len(events)}건)"]
+    for event, st in zip(events, statuses):
+        try:
+            _, _, time_str = event_datetimes(event)
+        except ValueError:   # 시간 형식이 잘못돼 "failed" 처리된 일정
+            time_str = event.get("start_time") or ""
+        lines.append(f"{EVENT_STATUS_MARK[st]} **{event['title']}** — {event['date']} {time_str}")
+    return "\n".join(lines)
+
 async def calendar_get_events(time_min: str, time_max: str) -> list[dict]:
+    """기간 내 일정 (실패하면 로그 후 [])"""
     try:
-        return await asyncio.to_thread(_get_events_sync, time_min, time_max)
+        return await _calendar_get_events(time_min, time_max)
     except Exception as e:
-        print(f"[Google Calendar 조회 오류] {e}")
+        log("Google Calendar 조회", str(e), level=logging.ERROR)
         return []
 
-async def parse_event_from_ai(text: str) -> dict | None:
-    """Claude로 자연어 → 일정 정보(JSON) 추출"""
-    today_str = date.today().isoformat()
+async def _calendar_get_events(time_min: str, time_max: str) -> list[dict]:
+    """예외를 그대로 올리는 버전 (브리핑 캐시용)"""
+    client = get_calendar_client()
+    if not client:
+        return []
+    items  = await client.list_events(time_min, time_max)
+    events = []
+    for e in items:
+        start = e["start"].get("dateTime", e["start"].get("date", ""))
+        events.append({"title": e.get("summary", "제목없음"), "start": start})
+    return events
+
+def event_datetimes(event: dict) -> tuple[str, str, str]:
+    """파싱된 일정 → (start_dt, end_dt, 표시용 시간 문자열). 시간이 없으면 종일."""
+    if not event.get("start_time"):
+        return event["date"], event["date"], "(종일)"
+    end_time = event.get("end_time")
+    if not end_time:   # 종료 시간이 없으면 시작 + 1시간
+        h, m = map(int, event["start_time"].split(":"))
+        end_time = f"{min(h + 1, 23):02d}:{m:02d}"
+    start_dt = f"{event['date']}T{event['start_time']}:00+09:00"
+    end_dt   = f"{event['date']}T{end_time}:00+09:00"
+    return start_dt, end_dt, f"{event['start_time']}~{end_time}"
+
+async def parse_events_from_ai(text: str, channel_id: int | None = None) -> list[dict]:
+    """Claude로 자연어 → 일정 목록(JSON) 추출. 한 메시지의 여러 일정을 한 번의 호출로."""
+    today_str = kst_today().isoformat()
     try:
-        response = await anthropic.messages.create(
+        response = await claude_create(
+            "event_parse", channel_id,
             model="claude-haiku-4-5-20251001",
-            max_tokens=300,
+            max_tokens=800,
             system=f"""너는 일정 파싱 전문가야. 오늘 날짜는 {today_str}이야.
-사용자 메시지에서 캘린더에 추가할 일정 정보를 추출해서 아래 JSON 형식으로만 답해줘.
-일정 정보가 없으면 {{"has_event": false}} 로만 답해줘.
+사용자 메시지에서 캘린더에 추가할 일정을 모두 추출해서 아래 JSON 형식으로만 답해줘.
+일정 정보가 없으면 {{"events": []}} 로만 답해줘.
 {{
-  "has_event": true,
-  "title": "일정 제목",
-  "date": "YYYY-MM-DD",
-  "start_time": "HH:MM",
-  "end_time": "HH:MM",
-  "description": ""
+  "events": [
+    {{
+      "title": "일정 제목",
+      "date": "YYYY-MM-DD",
+      "start_time": "HH:MM",
+      "end_time": "HH:MM",
+      "description": ""
+    }}
+  ]
 }}
 규칙:
+- 메시지에 일정이 여러 개면 (예: "내일 3시 치과, 금요일 저녁 7시 회식") 각각 따로 넣어줘
 - "이번주 토요일" = 이번주 토요일 날짜로 계산해줘 (오늘={today_str} 기준)
 - "이번주 일요일" = 이번주 일요일 날짜로 계산해줘
 - 시간이 없으면 start_time과 end_time을 모두 null로 설정 (종일 이벤트)
 - 시간이 있으면 end_time이 없을 경우 start_time + 1시간으로 설정
-- 일정 제목만 있어도 has_event: true로 처리해줘""",
+- 일정 제목만 있어도 일정으로 처리해줘""",
             messages=[{"role": "user", "content": text}]
         )
         raw = response.content[0].text.strip()
@@ -735,46 +3155,450 @@ async def parse_event_from_ai(text: str) -> dict | None:
             if raw.startswith("json"):
                 raw = raw[4:]
         data = json.loads(raw)
-        return data if data.get("has_event") else None
+        return [e for e in data.get("events", []) if e.get("title") and e.get("date")]
     except Exception as e:
-        print(f"[일정 파싱 오류] {e}")
-        return None
+        log("일정 파싱", str(e), level=logging.ERROR)
+        return []
+
+# ─── 컨텍스트 조립 (동시 수집) ────────────────────────
+# 히스토리 / Notion 헬스 기록 / 오늘 캘린더를 동시에 모으고 소스별 타임아웃 후 폴백.
+# 프롬프트 준비 지연 = 가장 느린 소스 (합이 아니라).
+CONTEXT_TIMEOUTS = {
+    "history":  2.0,
+    "health":   3.0,
+    "calendar": 2.5,
+}
+
+@dataclass
+class ChatContext:
+    messages: list[dict]          # Claude에 보낼 최종 messages
+    timings:  dict[str, float]    # 소스별 소요 ms (+ "total")
+    status:   dict[str, str]      # 소스별 ok | empty | timeout | error
+
+async def _timed_source(name: str, coro, fallback, ctx: ChatContext):
+    t0 = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(coro, CONTEXT_TIMEOUTS[name])
+        ctx.status[name] = "ok" if result else "empty"
+    except asyncio.TimeoutError:
+        result = fallback
+        ctx.status[name] = "timeout"
+    except Exception as e:
+        result = fallback
+        ctx.status[name] = "error"
+        log("컨텍스트", f"{name} {type(e).__name__}: {e}", level=logging.ERROR, source=name)
+    ctx.timings[name] = (time.perf_counter() - t0) * 1000
+    return result
+
+async def _history_source(channel_id: int, write: asyncio.Task, budget: int) -> list[dict]:
+    await asyncio.shield(write)   # 타임아웃으로 이 소스가 취소돼도 기록은 계속
+    history = (await get_history(channel_id))[-budget:]
+    while history and history[0]["role"] != "user":   # 예산으로 잘린 앞부분이 assistant면 제거
+        history = history[1:]
+    return history
+
+async def _calendar_snapshot_source() -> str:
+    today  = kst_today().isoformat()
+    events = await calendar_get_events(f"{today}T00:00:00+09:00", f"{today}T23:59:59+09:00")
+    return "\n".join(
+        f"{e['start'][11:16] if 'T' in e['start'] else '(종일)'} {e['title']}" for e in events
+    )
+
+async def build_context(cfg: ChannelConfig, user_text: str, intent: Intent | None) -> ChatContext:
+    ctx = ChatContext(messages=[], timings={}, status={})
+    t0  = time.perf_counter()
+
+    # 히스토리엔 원본 메시지만 저장 (Notion 주입 데이터 제외)
+    write = asyncio.create_task(add_message(cfg.channel_id, "user", user_text))
+    sources = {
+        "history": _timed_source(
+            "history", _history_source(cfg.channel_id, write, cfg.history_budget),
+            [{"role": "user", "content": user_text}], ctx,
+        ),
+    }
+    # 헬스 채널: "기록" 관련 키워드 있을 때만 최근 3일 raw 데이터 주입
+    if intent and intent.inject_health and notion:
+        sources["health"] = _timed_source("health", briefing_get("health"), "", ctx)
+    # 일정 채널: 시간 얘기가 나오면 오늘 일정 스냅샷 주입 (겹치는 일정 조언용)
+    if intent and intent.parse_event and GOOGLE_CALENDAR_ID:
+        sources["calendar"] = _timed_source("calendar", _calendar_snapshot_source(), "", ctx)
+
+    results = dict(zip(sources, await asyncio.gather(*sources.values())))
+    history = results["history"]
+    # 읽기가 타임아웃이어도 user 메시지 기록은 답장 기록보다 먼저 끝나도록 마저 기다림
+    await asyncio.wait({write})
+    if ctx.status["history"] == "timeout" and write.exception():
+        e = write.exception()
+        log("컨텍스트", f"history 기록 {type(e).__name__}: {e}", level=logging.ERROR, source="history")
+
+    sections = []
+    if results.get("health"):
+        sections.append(f"[정훈의 최근 3일 헬스 기록 — 코칭 참고용]\n{results['health']}")
+    if results.get("calendar"):
+        sections.append(f"[오늘 구글 캘린더 일정 — 참고용]\n{results['calendar']}")
+    # Claude에게 보내는 마지막 메시지만 주입 버전으로 교체 (히스토리엔 원본 유지)
+    if sections and history and history[-1]["role"] == "user":
+        injected = "\n\n".join(sections) + f"\n\n---\n[정훈의 메시지]\n{user_text}"
+        history = history[:-1] + [{"role": "user", "content": injected}]
+
+    ctx.messages = history
+    ctx.timings["total"] = (time.perf_counter() - t0) * 1000
+    log("컨텍스트", " ".join(f"{name}={ctx.status.get(name, '-')}" for name in sources), level=logging.DEBUG,
+        latency_ms=round(ctx.timings["total"], 1),
+        sources_ms={name: round(ctx.timings[name], 1) for name in sources})
+    return ctx
+
+# ─── 도구 사용 모드 (Claude tool use) ─────────────────
+TOOL_USE_SYSTEM_SUFFIX = """
+
+[도구 모드 — 위의 금지 사항보다 이 규칙이 우선해]
+- 지금은 도구로 실제 Notion/구글 캘린더 작업을 할 수 있어. 사용자가 할일·메모·일정 추가나 조회를 원하면 커맨드 안내 대신 도구를 직접 호출해.
+- 여러 작업이 필요하면 한 번에 여러 도구를 같이 호출해 (동시에 실행돼).
+- 도구 결과가 성공("ok": true)일 때만 "추가했어요/저장했어요"라고 말하고, 실패하면 실패했다고 솔직하게 말해.
+- 오늘 날짜는 {today}야. 날짜는 YYYY-MM-DD, 시간은 24시간제 HH:MM 으로 넣어."""
+
+TOOLS = [
+    {
+        "name": "notion_add_todo",
+        "description": "Notion 할일 DB에 할일을 추가한다.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "title":    {"type": "string", "description": "할일 제목"},
+                "due_date": {"type": "string", "description": "마감일 YYYY-MM-DD (없으면 생략)"},
+                "priority": {"type": "string", "enum": ["높음", "중간", "낮음"]},
+            },
+            "required": ["title"],
+        },
+    },
+    {
+        "name": "notion_save_memo",
+        "description": "Notion 메모 DB에 메모를 저장한다. 직전 대화 내용을 메모로 남겨달라는 요청에도 사용.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "title":   {"type": "string", "description": "메모 제목 (50자 이내)"},
+                "content": {"type": "string", "description": "메모 본문"},
+            },
+            "required": ["title", "content"],
+        },
+    },
+    {
+        "name": "calendar_add_event",
+        "description": "구글 캘린더에 일정을 추가한다. 시간이 없으면 종일 일정.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "title":       {"type": "string"},
+                "date":        {"type": "string", "description": "YYYY-MM-DD"},
+                "start_time":  {"type": "string", "description": "HH:MM (종일이면 생략)"},
+                "end_time":    {"type": "string", "description": "HH:MM (없으면 시작 + 1시간)"},
+                "description": {"type": "string"},
+            },
+            "required": ["title", "date"],
+        },
+    },
+    {
+        "name": "calendar_get_events",
+        "description": "구글 캘린더에서 기간 내 일정을 조회한다.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "start_date": {"type": "string", "description": "YYYY-MM-DD"},
+                "end_date":   {"type": "string", "description": "YYYY-MM-DD (포함)"},
+            },
+            "required": ["start_date", "end_date"],
+        },
+    },
+    {
+        "name": "notion_get_health_logs",
+        "description": "Notion 헬스 일지에서 최근 N일 운동/식단 기록을 조회한다.",
+        "input_schema": {
+            "type": "object",
+            "properties": {"days": {"type": "integer", "minimum": 1, "maximum": 31}},
+            "required": ["days"],
+        },
+    },
+]
+
+async def _tool_add_todo(title: str, due_date: str = "", priority: str = "중간") -> dict:
+    return {"ok": await notion_add_todo(title, due_date, priority)}
+
+async def _tool_save_memo(title: str, content: str) -> dict:
+    return {"ok": await notion_save_memo(title[:50], content)}
+
+async def _tool_add_event(title: str, date: str, start_time: str = "", end_time: str = "",
+                          description: str = "") -> dict:
+    event = {"title": title, "date": date, "start_time": start_time,
+             "end_time": end_time, "description": description}
+    _, _, time_str = event_datetimes(event)
+    [status] = await calendar_add_events([event])
+    return {"ok": status != "failed", "status": status, "title": title, "date": date, "time": time_str}
+
+async def _tool_get_events(start_date: str, end_date: str) -> dict:
+    # 조회 실패를 "일정 없음" 으로 답하지 않도록 예외를 올리는 쪽 사용 (_run_tool 이 ok=False 로)
+    events = await _calendar_get_events(f"{start_date}T00:00:00+09:00", f"{end_date}T23:59:59+09:00")
+    return {"ok": True, "events": events}
+
+async def _tool_health_logs(days: int = 7) -> dict:
+    return {"ok": True, "records": await _notion_get_health_logs(days) or "(기록 없음)"}
+
+TOOL_HANDLERS = {
+    "notion_add_todo":        _tool_add_todo,
+    "notion_save_memo":       _tool_save_memo,
+    "calendar_add_event":     _tool_add_event,
+    "calendar_get_events":    _tool_get_events,
+    "notion_get_health_logs": _tool_health_logs,
+}
+
+async def _run_tool(block) -> dict:
+    """tool_use 블록 1개 실행 → tool_result 블록"""
+    t0 = time.perf_counter()
+    try:
+        result   = await TOOL_HANDLERS[block.name](**block.input)
+        is_error = not result.get("ok", True)
+    except Exception as e:
+        result, is_error = {"ok": False, "error": f"{type(e).__name__}: {e}"}, True
+    log("도구", f"{block.name} {'실패' if is_error else '성공'}",
+        level=logging.WARNING if is_error else logging.INFO, tool=block.name, latency_ms=ms_since(t0))
+    return {
+        "type":        "tool_result",
+        "tool_use_id": block.id,
+        "content":     json.dumps(result, ensure_ascii=False),
+        "is_error":    is_error,
+    }
+
+# ─── 부하 조절 (어드미션) ─────────────────────────────
+# 대화 요청의 처리 중 + 대기 수(부하)를 보고 단계적으로 가볍게 처리:
+#   1 부가 정보(헬스 기록·캘린더 주입, 일정 자동 파싱) 생략 → 2 max_tokens·히스토리 절반
+#   → 3 Haiku 고정 → 4 Claude 호출 없이 바쁨 안내.
+# 부하가 기준의 ADMISSION_RECOVER 배 아래로 내려가면 자동으로 한 단계씩 복귀 (히스테리시스).
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get("ADMISSION_MAX_CONCURRENCY", "8"))   # 동시 Claude 대화 호출 수
+ADMISSION_LEVELS  = [int(x) for x in os.environ.get("ADMISSION_LEVELS", "4,8,12,20").split(",")]   # 단계 1~4 진입 부하
+ADMISSION_RECOVER = 0.7
+SHED_ENRICH, SHED_LEAN, SHED_HAIKU, SHED_BUSY = 1, 2, 3, 4
+SHED_LABELS = ("정상", "부가 정보 생략", "응답 축소", "Haiku 고정", "바쁨 안내")
+SHED_ACTION_LABELS = {"enrich": "부가 정보 생략", "lean": "토큰·히스토리 축소", "haiku": "Haiku 전환", "busy": "바쁨 안내"}
+SHED_MIN_MAX_TOKENS = 256
+SHED_MIN_HISTORY    = 4
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int, levels: list[int]):
+        self._slots     = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.levels     = levels
+        self.level      = 0
+        self.in_flight  = 0
+        self.waiting    = 0
+        self.admitted   = Counter()   # 입장 당시 단계별 요청 수
+        self.applied    = Counter()   # 실제로 적용된 조치별 횟수
+        self.transitions = 0
+        self._level_since = time.monotonic()
+        self._level_time  = [0.0] * len(SHED_LABELS)
+
+    @property
+    def load(self) -> int:
+        return self.in_flight + self.waiting
+
+    def _update(self):
+        target = sum(self.load >= t for t in self.levels)
+        if target < self.level and self.load >= self.levels[self.level - 1] * ADMISSION_RECOVER:
+            target = self.level   # 기준 근처에서 오르내림 반복 방지
+        if target == self.level:
+            return
+        now = time.monotonic()
+        self._level_time[self.level] += now - self._level_since
+        self._level_since = now
+        self.transitions += 1
+        log("부하 조절", f"{SHED_LABELS[self.level]} → {SHED_LABELS[target]}",
+            level=logging.WARNING if target > self.level else logging.INFO,
+            shed_level=target, in_flight=self.in_flight, waiting=self.waiting)
+        self.level = target
+
+    async def acquire(self) -> int | None:
+        """대화 요청 입장. 적용할 단계를 반환, 바쁨 단계면 None (release 불필요)."""
+        self.waiting += 1
+        self._update()
+        if self.level >= SHED_BUSY:
+            self.waiting -= 1
+            self.applied["busy"] += 1
+            self._update()
+            return None
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self._update()
+        level = min(self.level, SHED_HAIKU)   # 이미 기다린 요청은 바쁨 안내 대신 가장 가볍게 처리
+        self.admitted[level] += 1
+        return level
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+        self._update()
+
+    def stats(self) -> dict:
+        level_time = list(self._level_time)
+        level_time[self.level] += time.monotonic() - self._level_since
+        return {
+            "level": self.level, "in_flight": self.in_flight, "waiting": self.waiting,
+            "admitted": dict(self.admitted), "applied": dict(self.applied),
+            "transitions": self.transitions, "level_sec": [round(t, 1) for t in level_time],
+        }
+
+    def report(self) -> str:
+        st = self.stats()
+        return "\n".join([
+            f"부하 조절 — 현재 {st['level']}단계 ({SHED_LABELS[st['level']]}), "
+            f"처리 중 {st['in_flight']} / 대기 {st['waiting']} (동시 처리 {self.max_concurrency})",
+            f"단계 진입 부하: {' / '.join(map(str, self.levels))}, 기준의 {ADMISSION_RECOVER:.0%} 아래면 복귀",
+            "단계별 입장: " + " · ".join(f"{SHED_LABELS[lv]} {n}" for lv, n in sorted(st["admitted"].items())),
+            "적용된 조치: " + (" · ".join(f"{SHED_ACTION_LABELS[k]} {n}" for k, n in st["applied"].items()) or "없음"),
+            f"단계 전환 {st['transitions']}회, 단계별 누적: "
+            + " · ".join(f"{label} {sec:.1f}초" for label, sec in zip(SHED_LABELS, st["level_sec"]) if sec),
+        ])
 
 # ─── AI 응답 ─────────────────────────────────────────
 async def get_ai_response(
     channel_id: int,
     channel_name: str,
     user_message: str,
-    save_message: str | None = None,   # 히스토리에 저장할 텍스트 (None이면 user_message 그대로)
+    intent: Intent | None = None,   # on_message 라우팅 결과 (컨텍스트 소스 선택용)
+    shed: int = 0,                  # 부하 조절 단계 (admission.acquire 결과)
 ) -> str:
-    # 히스토리엔 원본 메시지만 저장 (Notion 주입 데이터 제외)
-    await add_message(channel_id, "user", save_message if save_message is not None else user_message)
-    history = await get_history(channel_id)
-    mode    = get_channel_mode(channel_name)
-    # Claude에게 보내는 마지막 메시지는 injected_text (Notion 포함 버전)로 교체
-    if save_message is not None and history and history[-1]["content"] == save_message:
-        history = history[:-1] + [{"role": "user", "content": user_message}]
-
-    response = await anthropic.messages.create(
-        model=get_model(mode),
-        max_tokens=1024,   # 일반 대화: 1024로 충분 (2048 불필요)
-        system=SYSTEM_PROMPTS[mode],
-        messages=history,
-    )
-    reply = response.content[0].text
+    cfg = channel_registry.get(channel_id, channel_name)
+    if shed >= SHED_ENRICH and intent and (intent.inject_health or intent.parse_event):
+        admission.applied["enrich"] += 1
+    if shed >= SHED_ENRICH:
+        intent = None   # 헬스 기록·캘린더 스냅샷 주입 생략 (히스토리만)
+    if shed >= SHED_LEAN:
+        cfg = replace(cfg, max_tokens=min(cfg.max_tokens, max(SHED_MIN_MAX_TOKENS, cfg.max_tokens // 2)),
+                      history_budget=min(cfg.history_budget, max(SHED_MIN_HISTORY, cfg.history_budget // 2)))
+        admission.applied["lean"] += 1
+    context = await build_context(cfg, user_message, intent)
+
+    decision = choose_model(cfg, user_message)
+    if shed >= SHED_HAIKU and decision.model != MODEL_ALIASES["haiku"]:
+        decision = ModelDecision(MODEL_ALIASES["haiku"], f"shed({decision.reason})", decision.score)
+        admission.applied["haiku"] += 1
+    request  = {
+        "model":      decision.model,
+        "max_tokens": cfg.max_tokens,
+        "system":     system_prompt(cfg.mode),
+    }
+    if TOOL_USE_ENABLED:
+        request["system"] += TOOL_USE_SYSTEM_SUFFIX.format(today=kst_today().isoformat())
+        request["tools"]   = TOOLS
+
+    messages = context.messages
+    t0 = time.perf_counter()
+    for round_no in range(TOOL_USE_MAX_ROUNDS + 1):
+        # 도구 결과를 돌려주는 후속 호출은 따로 집계 (/사용량 에서 도구 비용이 보이게)
+        purpose   = "chat" if round_no == 0 else "tool_use"
+        response  = await claude_create(purpose, channel_id, **request, messages=messages)
+        tool_uses = [b for b in response.content if b.type == "tool_use"]
+        if response.stop_reason != "tool_use" or not tool_uses:
+            break
+        # 한 턴에 요청된 도구들은 동시에 실행하고 결과를 한 번에 돌려줌
+        results  = await asyncio.gather(*(_run_tool(b) for b in tool_uses))
+        messages = messages + [
+            {"role": "assistant", "content": response.content},
+            {"role": "user",      "content": list(results)},
+        ]
+    latency_ms = (time.perf_counter() - t0) * 1000
+    reply = "".join(b.text for b in response.content if b.type == "text").strip()
+    if not reply:
+        reply = "⚠️ 요청을 처리하지 못했어요. 다시 한 번 말해주세요."
     await add_message(channel_id, "assistant", reply)
+    await record_model_decision(channel_id, cfg.mode, decision, latency_ms, len(user_message))
+    schedule_summary_refresh(channel_id, cfg.mode, cfg.model)
 
     return reply
 
-SUMMARY_TRIGGER_KEYWORDS = (
-    "요약", "정리", "포맷", "일지", "저장해줘", "기록해줘", "오늘 어땠", "오늘 뭐했"
-)
+def _summary_request(mode: str) -> str:
+    today_str = kst_today().strftime("%Y년 %m월 %d일")
+    summary_prompts = {
+        "일정": f"오늘({today_str}) 일정 대화 내용을 정리해줘. 완료한 일, 남은 할일, 내일 계획 순서로. 없는 내용은 지어내지 마.",
+    }
+    return summary_prompts.get(mode, f"오늘({today_str}) 대화 내용을 간단히 요약해줘. 없는 내용은 절대 지어내지 마.")
+
+# ─── 일일 요약 (증분 갱신) ────────────────────────────
+# 턴이 쌓일 때마다 백그라운드에서 "기존 요약 + 새 대화(delta)"만 보내 요약을 갱신.
+# /저장 시엔 남은 delta만 요약하거나, 변화가 없으면 캐시를 바로 반환.
+_summary_locks:   dict[int, asyncio.Lock] = {}
+_summary_tasks:   dict[int, asyncio.Task] = {}
+_summary_pending: dict[int, int]          = {}   # 채널별 마지막 갱신 이후 쌓인 턴 수
+
+async def update_daily_summary(channel_id: int, mode: str, model: str) -> str:
+    """오늘 요약을 delta만큼 갱신해서 반환. 오늘 대화가 없으면 빈 문자열."""
+    lock = _summary_locks.setdefault(channel_id, asyncio.Lock())
+    async with lock:
+        day    = kst_today().isoformat()
+        cached = await asyncio.to_thread(_get_daily_summary, channel_id, day)
+        prev_summary, last_seq = cached if cached else ("", 0)
+        delta = await state_backend.get_today_messages_after(channel_id, last_seq)
+        _summary_pending.pop(channel_id, None)
+        if not delta:
+            return prev_summary   # 변화 없음 → Claude 호출 없이 캐시 반환
+
+        transcript = "\n".join(
+            f"{'사용자' if m['role'] == 'user' else '봇'}: {m['content']}"
+            for m in delta
+        )
+        if prev_summary:
+            request = (
+                f"[지금까지의 오늘 요약]\n{prev_summary}\n\n"
+                f"[이후 새 대화]\n{transcript}\n\n---\n"
+                f"기존 요약에 새 대화 내용을 반영해서 갱신된 전체 요약만 써줘. {_summary_request(mode)}"
+            )
+        else:
+            request = f"[오늘 대화]\n{transcript}\n\n---\n{_summary_request(mode)}"
+
+        response = await claude_create(
+            "summary", channel_id,
+            model=model,
+            max_tokens=2048,
+            temperature=0,
+            system=system_prompt(mode),
+            messages=[{"role": "user", "content": request}],
+        )
+        summary = response.content[0].text
+        await asyncio.to_thread(_save_daily_summary, channel_id, day, summary, delta[-1]["seq"])
+        log("일일 요약 갱신", f"새 메시지 {len(delta)}개 반영", channel=channel_id)
+        return summary
+
+async def _debounced_summary_refresh(channel_id: int, mode: str, model: str):
+    try:
+        await asyncio.sleep(SUMMARY_DEBOUNCE_SEC)
+        # shield: 갱신 도중 새 턴이 와서 취소돼도 진행 중인 API 호출은 끝까지 반영
+        await asyncio.shield(update_daily_summary(channel_id, mode, model))
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        log("일일 요약 갱신", f"{type(e).__name__}: {e}", level=logging.ERROR)
+
+def schedule_summary_refresh(channel_id: int, mode: str, model: str):
+    """턴이 끝날 때 호출. 연속된 턴은 디바운스로 묶어서 한 번만 갱신."""
+    if mode == "헬스":   # 헬스는 /저장에서 구조화 파싱으로 별도 처리
+        return
+    pending = _summary_pending.get(channel_id, 0) + 1
+    _summary_pending[channel_id] = pending
+    task = _summary_tasks.get(channel_id)
+    if task and not task.done():
+        if pending >= SUMMARY_MAX_PENDING_TURNS:
+            return   # 히스토리 트림 전에 반영되도록 기존 타이머 유지
+        task.cancel()
+    _summary_tasks[channel_id] = asyncio.create_task(
+        _debounced_summary_refresh(channel_id, mode, model)
+    )
 
 async def generate_summary(channel_id: int, channel_name: str) -> str:
     history = await get_history(channel_id)
     if not history:
         return "대화 내용이 없어요!"
-    mode = get_channel_mode(channel_name)
+    cfg = channel_registry.get(channel_id, channel_name)
 
     # ── 핵심 로직: 대화 중에 이미 요약이 나왔으면 그걸 그대로 사용 ──
     # 마지막 2개 메시지가 [user: 요약 요청] → [assistant: 요약 응답] 패턴이면
@@ -783,52 +3607,873 @@ async def generate_summary(channel_id: int, channel_name: str) -> str:
         last_user = history[-2] if history[-2]["role"] == "user" else None
         last_asst = history[-1] if history[-1]["role"] == "assistant" else None
         if (last_user and last_asst
-                and any(kw in last_user["content"] for kw in SUMMARY_TRIGGER_KEYWORDS)
+                and "summary" in intent_router.labels(last_user["content"])
                 and len(last_asst["content"]) > 150):
             return last_asst["content"]  # 이미 나온 요약 재사용, Claude 재호출 없음
 
-    # ── 텍스트 요약 (헬스는 /저장 내부에서 별도 처리) ──
-    today_str = date.today().strftime("%Y년 %m월 %d일")
-    summary_prompts = {
-        "일정": f"오늘({today_str}) 일정 대화 내용을 정리해줘. 완료한 일, 남은 할일, 내일 계획 순서로. 없는 내용은 지어내지 마.",
-    }
-    summary_request = summary_prompts.get(mode, f"오늘({today_str}) 대화 내용을 간단히 요약해줘. 없는 내용은 절대 지어내지 마.")
-
-    response = await anthropic.messages.create(
-        model=get_model(mode),
-        max_tokens=2048,
-        temperature=0,
-        system=SYSTEM_PROMPTS[mode],
-        messages=history + [{"role": "user", "content": summary_request}],
-    )
-    return response.content[0].text
+    # ── 증분 요약: 캐시 + 마지막 갱신 이후 delta만 요약 (헬스는 /저장 내부에서 별도 처리) ──
+    summary = await update_daily_summary(channel_id, cfg.mode, cfg.model)
+    return summary or "오늘 나눈 대화가 없어요!"
+
+# ─── 스케줄러 ─────────────────────────────────────────
+# 힙 하나 + 타이머 하나: 다음 실행 시각까지만 잠들고, 작업이 추가되면 깨어나서 다시 계산.
+# spec: {"at": "HH:MM"} (매일 KST) 또는 {"every": 초}
+def _load_jobs() -> list[tuple]:
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("SELECT job_id, kind, spec, next_run FROM scheduled_jobs").fetchall()
+
+def _save_job(job_id: str, kind: str, spec: dict, next_run: float, last_run: float | None = None):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("""
+            INSERT INTO scheduled_jobs (job_id, kind, spec, next_run, last_run)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (job_id) DO UPDATE SET
+                kind = excluded.kind, spec = excluded.spec, next_run = excluded.next_run,
+                last_run = COALESCE(excluded.last_run, scheduled_jobs.last_run)
+        """, (job_id, kind, json.dumps(spec), next_run, last_run))
+        conn.commit()
+
+def _delete_job(job_id: str):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("DELETE FROM scheduled_jobs WHERE job_id = ?", (job_id,))
+        conn.commit()
+
+def next_run_after(spec: dict, after: float) -> float:
+    if "every" in spec:
+        return after + spec["every"]
+    hh, mm = map(int, spec["at"].split(":"))
+    base = datetime.fromtimestamp(after, KST)
+    run  = base.replace(hour=hh, minute=mm, second=0, microsecond=0)
+    if run.timestamp() <= after:
+        run += timedelta(days=1)
+    return run.timestamp()
+
+class Scheduler:
+    MISSED_GRACE_SEC = 3 * 3600   # 재시작 중 놓친 작업은 이 시간 안이면 바로 한 번 실행
+
+    def __init__(self):
+        self._heap:     list[tuple[float, str]] = []
+        self._jobs:     dict[str, dict]         = {}
+        self._handlers: dict[str, callable]     = {}
+        self._wake:     asyncio.Event | None    = None
+        self._task:     asyncio.Task | None     = None
+
+    def register(self, kind: str, handler):
+        self._handlers[kind] = handler
+
+    async def start(self):
+        if self._task:
+            return
+        self._wake = asyncio.Event()
+        now = time.time()
+        for job_id, kind, spec, next_run in await asyncio.to_thread(_load_jobs):
+            spec = json.loads(spec)
+            if next_run < now - self.MISSED_GRACE_SEC:   # 너무 오래 전에 놓친 건 다음 주기로
+                next_run = next_run_after(spec, now)
+            elif next_run < now:
+                next_run = now
+            self._push(job_id, kind, spec, next_run)
+        self._task = asyncio.create_task(self._loop())
+        log("스케줄러", f"시작 — 작업 {len(self._jobs)}개")
+
+    async def add_job(self, job_id: str, kind: str, spec: dict):
+        """같은 job_id가 있으면 spec만 교체 (시작 시 매번 호출해도 됨)"""
+        existing = self._jobs.get(job_id)
+        if existing and existing["spec"] == spec:
+            return
+        next_run = next_run_after(spec, time.time())
+        await asyncio.to_thread(_save_job, job_id, kind, spec, next_run)
+        self._push(job_id, kind, spec, next_run)
+
+    async def remove_job(self, job_id: str):
+        self._jobs.pop(job_id, None)   # 힙 엔트리는 꺼낼 때 무시됨
+        await asyncio.to_thread(_delete_job, job_id)
+
+    def jobs(self) -> list[dict]:
+        return sorted(self._jobs.values(), key=lambda j: j["next_run"])
+
+    def _push(self, job_id: str, kind: str, spec: dict, next_run: float):
+        self._jobs[job_id] = {"job_id": job_id, "kind": kind, "spec": spec, "next_run": next_run}
+        heapq.heappush(self._heap, (next_run, job_id))
+        if self._wake:
+            self._wake.set()
+
+    async def _loop(self):
+        while True:
+            if not self._heap:
+                await self._wake.wait()
+                self._wake.clear()
+                continue
+            run_at, job_id = self._heap[0]
+            delay = run_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                    self._wake.clear()   # 새 작업이 들어옴 → 힙 맨 앞 다시 확인
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            heapq.heappop(self._heap)
+            job = self._jobs.get(job_id)
+            if not job or job["next_run"] != run_at:   # 삭제됐거나 재예약된 옛 엔트리
+                continue
+            now = time.time()
+            job["next_run"] = next_run_after(job["spec"], now)
+            heapq.heappush(self._heap, (job["next_run"], job_id))
+            await asyncio.to_thread(_save_job, job_id, job["kind"], job["spec"], job["next_run"], now)
+            asyncio.create_task(self._run(job))
+
+    async def _run(self, job: dict):
+        handler = self._handlers.get(job["kind"])
+        if not handler:
+            log("스케줄러", f"핸들러 없음: {job['kind']}", level=logging.WARNING)
+            return
+        t0 = time.perf_counter()
+        try:
+            await handler(job)
+            log("스케줄러", f"{job['job_id']} 완료", job=job["job_id"], latency_ms=ms_since(t0))
+        except Exception as e:
+            log("스케줄러", f"{job['job_id']} 오류: {type(e).__name__}: {e}", level=logging.ERROR, job=job["job_id"])
+
+# ─── 브리핑 캐시 ──────────────────────────────────────
+# 오늘 일정 / 미완료 할일 / 최근 3일 헬스 기록을 미리 모아두고 커맨드는 캐시로 즉시 응답.
+# 봇을 통한 쓰기는 해당 파트를 무효화하고, 외부 수정은 주기적 갱신으로 따라잡음.
+async def _fetch_today_events() -> list[dict]:
+    today = kst_today().isoformat()
+    return await _calendar_get_events(f"{today}T00:00:00+09:00", f"{today}T23:59:59+09:00")
+
+# 예외를 올리는 조회만 씀 — 실패를 "일정/할일 없음" 으로 캐시하지 않도록
+BRIEFING_FETCHERS = {
+    "events": _fetch_today_events,
+    "todos":  _notion_get_todos,
+    "health": lambda: _notion_get_health_logs(3),
+}
+
+class BriefingCache:
+    def __init__(self):
+        self._parts: dict[str, tuple[object, float, str]] = {}   # 파트 → (값, 갱신 시각, KST 날짜)
+        self._gen:   dict[str, int] = {}                         # 파트 → 무효화 세대
+
+    def get(self, part: str):
+        entry = self._parts.get(part)
+        if not entry:
+            return None
+        value, fetched_at, day = entry
+        if day != kst_today().isoformat() or time.time() - fetched_at > BRIEFING_MAX_AGE_SEC:
+            return None
+        return value
+
+    def generation(self, part: str) -> int:
+        return self._gen.get(part, 0)
+
+    def put(self, part: str, value, gen: int | None = None) -> bool:
+        """gen: 조회를 시작할 때의 세대. 그 사이 invalidate 됐으면 (쓰기 전 데이터) 버림."""
+        if gen is not None and gen != self.generation(part):
+            return False
+        self._parts[part] = (value, time.time(), kst_today().isoformat())
+        return True
+
+    def invalidate(self, part: str):
+        self._gen[part] = self.generation(part) + 1
+        self._parts.pop(part, None)
+
+    def age_sec(self, part: str) -> float | None:
+        entry = self._parts.get(part)
+        return time.time() - entry[1] if entry else None
+
+# 파트별 진행 중인 조회 (세대, 태스크) — 같은 세대의 캐시 미스가 겹쳐도 한 번만
+_briefing_inflight: dict[str, tuple[int, asyncio.Task]] = {}
+
+async def _briefing_fetch(part: str, gen: int):
+    try:
+        value = await BRIEFING_FETCHERS[part]()
+    except Exception as e:
+        log("브리핑 조회", f"{part}: {type(e).__name__}: {e}", level=logging.ERROR, part=part)
+        raise
+    finally:
+        if _briefing_inflight.get(part, (None, None))[1] is asyncio.current_task():
+            _briefing_inflight.pop(part)
+    briefing_cache.put(part, value, gen)
+    return value
+
+async def briefing_get(part: str):
+    """캐시가 신선하면 즉시, 아니면 가져와서 캐시 (동시 미스는 같은 조회를 기다림). 조회 실패는 예외."""
+    value = briefing_cache.get(part)
+    if value is not None:
+        return value
+    gen      = briefing_cache.generation(part)
+    inflight = _briefing_inflight.get(part)
+    if inflight is None or inflight[0] != gen:   # 무효화 전에 시작된 조회는 기다리지 않음
+        task = asyncio.create_task(_briefing_fetch(part, gen))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())   # 대기자가 모두 떠나도 경고 없게
+        _briefing_inflight[part] = inflight = (gen, task)
+    # 기다리던 쪽이 타임아웃으로 취소돼도 조회는 끝까지 (다른 대기자·캐시용)
+    return await asyncio.shield(inflight[1])
+
+async def refresh_briefing():
+    parts  = list(BRIEFING_FETCHERS)
+    gens   = [briefing_cache.generation(p) for p in parts]
+    values = await asyncio.gather(*(BRIEFING_FETCHERS[p]() for p in parts), return_exceptions=True)
+    for part, gen, value in zip(parts, gens, values):
+        if isinstance(value, Exception):
+            log("브리핑 갱신", f"{part}: {value}", level=logging.ERROR, part=part)
+            continue
+        briefing_cache.put(part, value, gen)
+
+BRIEFING_UNAVAILABLE = "• ⚠️ 불러오지 못했어요 (잠시 후 다시 시도)"
+
+def format_briefing(events: list[dict] | None, todos: list[dict] | None, health: str | None) -> str:
+    """None 인 파트는 조회 실패 — "없음" 과 구분해서 표시"""
+    today = kst_today()
+    lines = [f"☀️ **오늘의 브리핑** ({today.isoformat()})\n", "📅 **오늘 일정**"]
+    if events is None:
+        lines.append(BRIEFING_UNAVAILABLE)
+    elif events:
+        for e in events:
+            time_str = e["start"][11:16] if "T" in e["start"] else "(종일)"
+            lines.append(f"• {time_str} — {e['title']}")
+    else:
+        lines.append("• 등록된 일정 없음")
+    lines.append("\n✅ **미완료 할일**")
+    if todos is None:
+        lines.append(BRIEFING_UNAVAILABLE)
+    elif todos:
+        for todo in todos[:10]:
+            due_str = f" (마감 {todo['due']})" if todo["due"] else ""
+            lines.append(f"• {todo['title']}{due_str}")
+        if len(todos) > 10:
+            lines.append(f"• 외 {len(todos) - 10}개")
+    else:
+        lines.append("• 없음 🎉")
+    if health is None:
+        lines.append(f"\n💪 **최근 3일 헬스 기록**\n{BRIEFING_UNAVAILABLE}")
+    elif health:
+        lines.append(f"\n💪 **최근 3일 헬스 기록**\n{health}")
+    return "\n".join(lines)
+
+async def _job_briefing(job: dict):
+    await refresh_briefing()
+    if BRIEFING_CHANNEL_ID:
+        # 방금 갱신했으므로 캐시에 없는 파트는 조회 실패
+        text = format_briefing(
+            briefing_cache.get("events"), briefing_cache.get("todos"), briefing_cache.get("health"),
+        )
+        await send_long_message(message_target(BRIEFING_CHANNEL_ID), text)
+
+async def _job_briefing_refresh(job: dict):
+    await refresh_briefing()
+
+# ─── 할일 마감 알림 ───────────────────────────────────
+# 다가오는 마감을 우선순위 큐 하나에 넣고 가장 이른 알림 시각에만 깨어남 (폴링 없음).
+# 갱신/완료는 버전 번호로 옛 힙 엔트리를 무효화 → O(log n). Notion은 last_edited_time 기준 증분 동기화.
+def reminder_time(due: str) -> float | None:
+    """마감 → 알림 시각 (epoch). 날짜만 있으면 당일 REMINDER_HOUR시, 시각이 있으면 REMINDER_LEAD_MIN분 전."""
+    if not due:
+        return None
+    try:
+        if "T" in due:
+            due_dt = datetime.fromisoformat(due)
+            if due_dt.tzinfo is None:
+                due_dt = due_dt.replace(tzinfo=KST)
+            return (due_dt - timedelta(minutes=REMINDER_LEAD_MIN)).timestamp()
+        d = date.fromisoformat(due)
+        return datetime(d.year, d.month, d.day, REMINDER_HOUR, tzinfo=KST).timestamp()
+    except ValueError:
+        return None
+
+def _load_sent_reminders() -> set[tuple[str, str]]:
+    with sqlite3.connect(DB_PATH) as conn:
+        return set(conn.execute("SELECT todo_id, due FROM todo_reminders_sent").fetchall())
+
+def _mark_reminder_sent(todo_id: str, due: str):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("INSERT OR IGNORE INTO todo_reminders_sent (todo_id, due) VALUES (?, ?)", (todo_id, due))
+        conn.execute("DELETE FROM todo_reminders_sent WHERE sent_at < datetime('now', '-60 days')")
+        conn.commit()
+
+class ReminderEngine:
+    OVERDUE_GRACE_SEC = 86400   # 이보다 오래 지난 마감은 (재시작/첫 동기화 시) 알리지 않음
+    SYNC_MARGIN_SEC   = 120     # 증분 동기화 시 last_edited_time 경계 여유
+    RETRY_SEC         = 60      # 알림 실패(Notion 조회·디스코드 전송) 시 재시도 간격 (회차만큼 늘어남)
+    MAX_ATTEMPTS      = 5
+
+    def __init__(self):
+        self._heap:    list[tuple[float, str, int]] = []   # (알림 시각, todo_id, 버전)
+        self._entries: dict[str, dict]               = {}   # todo_id → {title, due, at, version}
+        self._sent:    set[tuple[str, str]]          = set()
+        self._version  = 0
+        self._wake:    asyncio.Event | None = None
+        self._task:    asyncio.Task | None  = None
+        self._last_sync: float = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(REMINDER_CHANNEL_ID and notion and NOTION_TODO_DB_ID)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def upsert(self, todo_id: str, title: str, due: str):
+        at = reminder_time(due)
+        if at is None or (todo_id, due) in self._sent:
+            self.remove(todo_id)
+            return
+        old = self._entries.get(todo_id)
+        if old and old["due"] == due and old["title"] == title:
+            return
+        self._schedule(todo_id, title, due, at)
+
+    def _schedule(self, todo_id: str, title: str, due: str, at: float, attempts: int = 0):
+        self._version += 1
+        self._entries[todo_id] = {"title": title, "due": due, "at": at, "version": self._version,
+                                  "attempts": attempts}
+        heapq.heappush(self._heap, (at, todo_id, self._version))
+        if len(self._heap) > 2 * len(self._entries) + 64:   # 무효 엔트리가 쌓이면 한 번에 정리
+            self._heap = [(e["at"], tid, e["version"]) for tid, e in self._entries.items()]
+            heapq.heapify(self._heap)
+        if self._wake and self._heap[0][1] == todo_id:
+            self._wake.set()   # 가장 이른 알림이 바뀜 → 타이머 재설정
+
+    def remove(self, todo_id: str):
+        self._entries.pop(todo_id, None)   # 힙 엔트리는 꺼낼 때 버전 불일치로 무시
+
+    def next_due(self) -> dict | None:
+        while self._heap:
+            at, todo_id, version = self._heap[0]
+            entry = self._entries.get(todo_id)
+            if entry and entry["version"] == version:
+                return {"id": todo_id, **entry}
+            heapq.heappop(self._heap)
+        return None
+
+    async def start(self):
+        if self._task or not self.enabled:
+            return
+        self._wake = asyncio.Event()
+        self._sent = await asyncio.to_thread(_load_sent_reminders)
+        await self.resync(full=True)
+        self._task = asyncio.create_task(self._loop())
+        log("마감 알림", f"시작 — 예정 {len(self._entries)}개")
+
+    async def resync(self, full: bool = False):
+        """full=True: 미완료 전체로 재구성 / False: 마지막 동기화 이후 수정된 페이지만 반영"""
+        started = time.time()
+        if full or not self._last_sync:
+            todos = await notion_query_todos({"property": "완료", "checkbox": {"equals": False}})
+            alive = {t["id"] for t in todos}
+            for todo_id in list(self._entries):
+                if todo_id not in alive:
+                    self.remove(todo_id)
+        else:
+            since = datetime.fromtimestamp(self._last_sync - self.SYNC_MARGIN_SEC, timezone.utc)
+            todos = await notion_query_todos({
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": since.isoformat()},
+            })
+        for todo in todos:
+            if todo["done"]:
+                self.remove(todo["id"])
+            else:
+                self.upsert(todo["id"], todo["title"], todo["due"])
+        self._last_sync = started
+        log("마감 알림 동기화", f"{'전체' if full else '증분'} {len(todos)}개 반영, 예정 {len(self._entries)}개")
+
+    async def _loop(self):
+        while True:
+            nxt = self.next_due()
+            delay = (nxt["at"] - time.time()) if nxt else None
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            heapq.heappop(self._heap)
+            self.remove(nxt["id"])
+            if time.time() - reminder_time(nxt["due"]) > self.OVERDUE_GRACE_SEC:
+                continue
+            try:
+                await self._fire(nxt)
+            except Exception as e:
+                self._retry(nxt, e)
+
+    def _retry(self, todo: dict, error: Exception):
+        """보내지 못한 알림을 잠시 뒤 다시 예약 (완료·보관 확인이나 전송 성공 전에는 버리지 않음)"""
+        attempts = todo["attempts"] + 1
+        gave_up  = attempts >= self.MAX_ATTEMPTS
+        log("마감 알림", f"{todo['title']}: {type(error).__name__}: {error}"
+            + (f" — {attempts}회 실패, 포기" if gave_up else f" — {self.RETRY_SEC * attempts}초 후 재시도"),
+            level=logging.ERROR, attempts=attempts)
+        # 보내고 기록만 실패했거나, 그 사이 동기화가 다시 넣었으면 그대로 둠
+        if gave_up or (todo["id"], todo["due"]) in self._sent or todo["id"] in self._entries:
+            return
+        self._schedule(todo["id"], todo["title"], todo["due"], time.time() + self.RETRY_SEC * attempts, attempts)
+
+    async def _fire(self, todo: dict):
+        # 보내기 직전에 페이지 상태 확인 (삭제·완료된 할일이면 건너뜀)
+        page = await notion.pages.retrieve(page_id=todo["id"])
+        current = _parse_todo_page(page)
+        if page.get("archived") or current["done"] or current["due"] != todo["due"]:
+            if not page.get("archived") and not current["done"]:
+                self.upsert(todo["id"], current["title"], current["due"])
+            return
+        due_str = todo["due"].replace("T", " ")[:16]
+        await message_target(REMINDER_CHANNEL_ID).send(
+            f"⏰ **마감 알림** — **{todo['title']}** (마감: {due_str})"
+        )
+        self._sent.add((todo["id"], todo["due"]))
+        await asyncio.to_thread(_mark_reminder_sent, todo["id"], todo["due"])
+
+async def _job_todo_resync(job: dict):
+    await reminder_engine.resync(full=job["spec"].get("full", False))
+
+async def setup_scheduled_jobs():
+    scheduler.register("briefing", _job_briefing)
+    scheduler.register("briefing_refresh", _job_briefing_refresh)
+    scheduler.register("storage_maintenance", _job_storage_maintenance)
+    await scheduler.start()
+    for at in BRIEFING_TIMES:
+        await scheduler.add_job(f"briefing@{at}", "briefing", {"at": at})
+    await scheduler.add_job("briefing_refresh", "briefing_refresh", {"every": BRIEFING_REFRESH_SEC})
+    await scheduler.add_job("storage_maintenance", "storage_maintenance", {"every": STORAGE_MAINTENANCE_SEC})
+    await scheduler.add_job("storage_full_maintenance", "storage_maintenance", {"at": "04:30", "full": True})
+    if reminder_engine.enabled:
+        scheduler.register("todo_resync", _job_todo_resync)
+        await scheduler.add_job("todo_resync", "todo_resync", {"every": REMINDER_RESYNC_SEC})
+        await scheduler.add_job("todo_full_resync", "todo_resync", {"at": "04:00", "full": True})
+        asyncio.create_task(reminder_engine.start())   # 전체 동기화가 on_ready를 막지 않도록
+    # 설정에서 빠진 브리핑 시각은 정리
+    for job in scheduler.jobs():
+        if job["kind"] == "briefing" and job["spec"].get("at") not in BRIEFING_TIMES:
+            await scheduler.remove_job(job["job_id"])
+
+# ─── 이벤트 루프 지연 모니터 · 진단 ────────────────────
+# 응답이 느릴 때 루프가 막힌 건지(동기 작업) 네트워크를 기다리는 건지 구분용.
+# 루프 태스크가 주기적으로 박동을 찍고, 감시 스레드는 박동이 끊기면 그 순간 루프 스레드의 스택을 잡아둠.
+LOOP_LAG_INTERVAL_SEC = float(os.environ.get("LOOP_LAG_INTERVAL_SEC", "0.5"))
+LOOP_STALL_MS         = float(os.environ.get("LOOP_STALL_MS", "200"))   # 이 이상 막히면 경고 + 스택 기록
+LOOP_DEBUG            = os.environ.get("LOOP_DEBUG", "0") == "1"        # asyncio 디버그 모드 (느린 콜백 경고, 오버헤드 있음)
+DIAG_MAX_SEC          = 60      # /진단 프로파일·메모리 최대 시간
+PROFILE_INTERVAL_SEC  = 0.005   # 샘플링 프로파일러 간격
+DIAG_TOP_N            = 25
+
+class LoopMonitor:
+    def __init__(self):
+        self.samples: deque[float] = deque(maxlen=int(120 / LOOP_LAG_INTERVAL_SEC))   # 최근 2분 지연 ms
+        self.stalls:  deque[dict]  = deque(maxlen=20)                                 # 최근 정체 (스택 포함)
+        self.max_ms   = 0.0
+        self.thread_id: int | None = None   # 이벤트 루프 스레드
+        self._beat    = 0.0
+        self._stack: str | None = None      # 감시 스레드가 잡은 현재 정체의 스택
+        self._task:  asyncio.Task | None = None
+
+    async def start(self):
+        if self._task:
+            return
+        loop = asyncio.get_running_loop()
+        if LOOP_DEBUG:
+            loop.set_debug(True)
+            loop.slow_callback_duration = LOOP_STALL_MS / 1000   # asyncio 로거 경고 → 로그 파이프라인
+        self.thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._sample())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    async def _sample(self):
+        while True:
+            t0 = time.monotonic()
+            await asyncio.sleep(LOOP_LAG_INTERVAL_SEC)
+            self._beat = now = time.monotonic()
+            lag_ms = max(0.0, (now - t0 - LOOP_LAG_INTERVAL_SEC) * 1000)
+            self.samples.append(lag_ms)
+            self.max_ms = max(self.max_ms, lag_ms)
+            stack, self._stack = self._stack, None
+            if lag_ms >= LOOP_STALL_MS:
+                self.stalls.append({"at": kst_now(), "lag_ms": lag_ms, "stack": stack})
+                log("루프 지연", f"{lag_ms:.0f}ms 동안 막힘", level=logging.WARNING,
+                    latency_ms=round(lag_ms, 1), stack=stack)
+
+    def _watch(self):
+        limit = LOOP_LAG_INTERVAL_SEC + LOOP_STALL_MS / 1000
+        seen  = 0.0
+        while True:
+            time.sleep(LOOP_STALL_MS / 2000)
+            beat = self._beat
+            if beat != seen and time.monotonic() - beat > limit:
+                frame = sys._current_frames().get(self.thread_id)
+                if frame:
+                    self._stack = "".join(traceback.format_list(
+                        [traceback.FrameSummary(f.f_code.co_filename, f.f_lineno, f.f_code.co_name)
+                         for f in reversed(_task_frames(frame))]
+                    ))
+                seen = beat   # 정체 하나당 한 번만
+
+    def percentile(self, q: float) -> float:
+        s = sorted(self.samples)
+        return s[min(len(s) - 1, int(len(s) * q))] if s else 0.0
+
+    def report(self) -> str:
+        logs = log_stats()
+        lines = [
+            f"이벤트 루프 지연 (최근 {len(self.samples)}개, {LOOP_LAG_INTERVAL_SEC}초 간격)",
+            f"  p50 {self.percentile(0.5):.1f}ms / p99 {self.percentile(0.99):.1f}ms / 최대 {self.max_ms:.1f}ms",
+            f"  정체 기준 {LOOP_STALL_MS:.0f}ms, 최근 정체 {len(self.stalls)}건",
+            f"로그 큐 {logs['queued']}개 대기 / 버림 {logs['dropped']} / 샘플링 제외 {logs['sampled_out']}",
+        ]
+        for st in reversed(self.stalls):
+            lines += ["", f"── {st['at']:%m-%d %H:%M:%S} {st['lag_ms']:.0f}ms",
+                      st["stack"] or "(스택 못 잡음 — 정체가 감시 주기보다 짧음)"]
+        return "\n".join(lines)
+
+def _task_frames(frame) -> list:
+    """안쪽 → 바깥 프레임. asyncio 가 콜백을 실행하는 Handle._run 위(루프 내부)는 잘라냄."""
+    frames = []
+    while frame and not (frame.f_code.co_name == "_run" and frame.f_code.co_filename.endswith(("asyncio/events.py", "asyncio\\events.py"))):
+        frames.append(frame)
+        frame = frame.f_back
+    return frames
+
+def _frame_label(code) -> str:
+    return f"{'/'.join(code.co_filename.split(os.sep)[-2:])}:{code.co_firstlineno} {code.co_name}"
+
+def _idle_frame(frame) -> bool:
+    """루프가 I/O 를 기다리는 중 (selector.select)"""
+    return frame.f_code.co_name in ("select", "poll", "control") and "selectors" in frame.f_code.co_filename
+
+def _sample_loop_stacks(thread_id: int, seconds: float) -> str:
+    """루프 스레드 스택을 PROFILE_INTERVAL_SEC 마다 샘플링 (스레드에서 실행)"""
+    own, total, stacks = Counter(), Counter(), Counter()
+    samples = idle = 0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        frame = sys._current_frames().get(thread_id)
+        if frame:
+            samples += 1
+            if _idle_frame(frame):
+                idle += 1
+            else:
+                labels = [_frame_label(f.f_code) for f in _task_frames(frame)] or ["(루프 내부)"]
+                own[labels[0]] += 1
+                total.update(set(labels))
+                stacks[" ← ".join(labels[:6])] += 1
+        time.sleep(PROFILE_INTERVAL_SEC)
+    busy = samples - idle
+    pct  = lambda n: f"{n / max(samples, 1) * 100:5.1f}%"
+    lines = [
+        f"샘플링 프로파일 — {seconds:.0f}초, 샘플 {samples}개 ({PROFILE_INTERVAL_SEC * 1000:.0f}ms 간격)",
+        f"루프 유휴(I/O 대기) {pct(idle)} / 실행 중 {pct(busy)}",
+        "", "[자기 시간 상위 — 이 함수 안에서 실행 중]",
+        *(f"  {pct(n)}  {label}" for label, n in own.most_common(DIAG_TOP_N)),
+        "", "[누적 상위 — 스택에 포함]",
+        *(f"  {pct(n)}  {label}" for label, n in total.most_common(DIAG_TOP_N)),
+        "", "[자주 잡힌 스택 (안쪽 → 바깥 6단계)]",
+        *(f"  {pct(n)}  {stack}" for stack, n in stacks.most_common(10)),
+    ]
+    return "\n".join(lines)
+
+async def profile_loop(seconds: float) -> str:
+    """실행 중인 프로세스의 이벤트 루프를 seconds 동안 샘플링 프로파일링"""
+    return await asyncio.to_thread(_sample_loop_stacks, threading.get_ident(), seconds)
+
+def _allocation_report(before, after, seconds: float, started: bool) -> str:
+    current, peak = tracemalloc.get_traced_memory()
+    if started:
+        tracemalloc.stop()
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    before, after = before.filter_traces(ignore), after.filter_traces(ignore)
+    diff = after.compare_to(before, "lineno")
+    top  = after.statistics("traceback")[:5]
+    lines = [
+        f"메모리 할당 — {seconds:.0f}초 추적{' (이번에 시작 → 추적 전 할당은 제외)' if started else ''}",
+        f"추적 중 메모리 {current / 1024:.0f}KB / 최대 {peak / 1024:.0f}KB",
+        "", "[증가 상위 (줄 단위)]",
+        *(f"  {st.size_diff / 1024:+9.1f}KB {st.count_diff:+7d}개  {st.traceback[0]}"
+          for st in diff[:DIAG_TOP_N]),
+        "", "[현재 할당 상위 호출 경로]",
+    ]
+    for st in top:
+        lines.append(f"  {st.size / 1024:.1f}KB {st.count}개")
+        lines += [f"      {line}" for line in st.traceback.format()[-6:]]
+    return "\n".join(lines)
+
+async def trace_allocations(seconds: float) -> str:
+    """seconds 동안 tracemalloc 으로 추적해 늘어난 할당 상위 줄 (이미 추적 중이면 그대로 둠).
+    스냅샷·비교는 스레드에서 → 루프를 오래 붙잡지 않음."""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(10)
+    try:
+        before = await asyncio.to_thread(tracemalloc.take_snapshot)
+        await asyncio.sleep(seconds)
+        after = await asyncio.to_thread(tracemalloc.take_snapshot)
+    except BaseException:
+        if started:
+            tracemalloc.stop()
+        raise
+    return await asyncio.to_thread(_allocation_report, before, after, seconds, started)
 
 # ─── 초기화 ───────────────────────────────────────────
-init_db()
+# import 시점엔 객체만 만들고 DB·SDK 는 건드리지 않음. DB 는 setup_hook, SDK 는 warm_up 에서.
+def init_storage():
+    init_db()
+    channel_registry.preload()
+
+state_backend    = make_state_backend()
+channel_registry = ChannelRegistry()
+scheduler       = Scheduler()
+briefing_cache  = BriefingCache()
+reminder_engine = ReminderEngine()
+admission       = AdmissionController(ADMISSION_MAX_CONCURRENCY, ADMISSION_LEVELS)
+loop_monitor    = LoopMonitor()
+
+intent_router = IntentRouter(INTENT_RULES)   # 키워드 오토마톤은 시작 시 한 번만 컴파일
 
-anthropic = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
-notion    = NotionAsyncClient(auth=NOTION_TOKEN) if NOTION_TOKEN else None
+anthropic = LazyClient("anthropic", _make_anthropic)
+notion    = LazyClient("notion_client", _make_notion) if NOTION_TOKEN else None
 
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="/", intents=intents)
+if SHARD_COUNT:
+    # 워커는 런처가 준 SHARD_IDS 만, 단독 실행이면 전체 샤드를 한 프로세스에서
+    bot = commands.AutoShardedBot(command_prefix="/", intents=intents,
+                                  shard_count=SHARD_COUNT, shard_ids=SHARD_IDS or None,
+                                  max_ratelimit_timeout=DISCORD_MAX_RATELIMIT_SEC)
+else:
+    bot = commands.Bot(command_prefix="/", intents=intents,
+                       max_ratelimit_timeout=DISCORD_MAX_RATELIMIT_SEC)
+
+# ─── 코그 ─────────────────────────────────────────────
+# 커맨드·모드 프롬프트·모드별 핸들러는 cogs/ 확장으로 분리. 상태(캐시·DB·클라이언트)는 이 모듈에 남아
+# bot.reload_extension 으로 코그만 바꿔 끼워도 게이트웨이 세션과 캐시는 그대로.
+COG_EXTENSIONS = ("cogs.core", "cogs.health", "cogs.translation", "cogs.schedule", "cogs.todo_memo")
+_cog_unloaded_at: dict[str, float] = {}   # 확장 모듈 → 마지막 cog_unload 시각 (리로드 공백 측정)
+
+class BotCog(commands.Cog):
+    """코그 공통: 담당 모드의 시스템 프롬프트 등록 + 모드별 훅"""
+    mode:          str | None = None   # 이 코그가 담당하는 채널 모드
+    system_prompt: str | None = None
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        if self.mode and self.system_prompt:
+            SYSTEM_PROMPTS[self.mode] = self.system_prompt
+
+    async def cog_unload(self):
+        _cog_unloaded_at[type(self).__module__] = time.perf_counter()
+
+    async def save(self, ctx: commands.Context, content: str) -> bool:
+        """/저장 을 이 모드 방식으로 처리했으면 True (기본: 공통 요약 저장으로 넘김)"""
+        return False
+
+    async def after_reply(self, message: discord.Message, user_text: str, reply: str, intent: "Intent"):
+        """AI 응답을 보낸 뒤 모드별 후처리"""
+
+    async def on_shutdown(self):
+        """종료 직전: 메모리에만 있는 진행 상태를 defer_work 로 보관"""
+
+    async def resume_work(self, channel, key: str, payload: dict):
+        """다음 시작 때 이 코그가 보관한 작업(kind="view") 재개"""
+
+def mode_cog(mode: str) -> BotCog | None:
+    for cog in bot.cogs.values():
+        if isinstance(cog, BotCog) and cog.mode == mode:
+            return cog
+    return None
+
+async def reload_cog(ext: str) -> tuple[float, float]:
+    """확장 하나를 교체하고 (전체 ms, 커맨드 공백 ms) 반환. 실패하면 discord.py 가 이전 코드로 되돌림."""
+    t0 = time.perf_counter()
+    await bot.reload_extension(ext)
+    t1 = time.perf_counter()
+    gap_ms = (t1 - _cog_unloaded_at.get(ext, t0)) * 1000
+    log("리로드", ext, latency_ms=round((t1 - t0) * 1000, 1), gap_ms=round(gap_ms, 1))
+    return (t1 - t0) * 1000, gap_ms
+
+# ─── 종료 · 재생 ───────────────────────────────────────
+# Claude 를 부르는 대화 턴만 pending_work 에 저널을 남김 (커맨드·쿨다운·메모 같은 가벼운 경로는 기록 없음).
+# 답을 보내면 "replied" 로 바꿔 후처리 도중 끊겨도 다시 답하지 않음. SIGTERM 이면 새 턴은 "보류" 로만
+# 기록하고 처리 중인 턴을 SHUTDOWN_DRAIN_SEC 까지 기다림 → 못 끝낸 턴·보류 턴·코그가 보관한 작업은 재생.
+# 행마다 소유 인스턴스를 남기고, 생존 신호가 끊긴 인스턴스의 "처리 중" 행만 다른 인스턴스가 가져감.
+_turn_tasks: set[asyncio.Task] = set()
+_shutting_down = False
+_ready_once    = False
+
+def is_command(message: discord.Message) -> bool:
+    return message.content.startswith("/")
+
+async def defer_work(key: str, kind: str, channel_id: int, payload: dict):
+    await asyncio.to_thread(_journal_put, key, kind, channel_id, payload, "deferred")
+
+async def run_turn(message: discord.Message, replay: bool = False):
+    """메시지 하나 처리 (커맨드 + 대화). 종료 마감으로 취소되면 대화 턴은 보류로 남겨 재생."""
+    task = asyncio.current_task()
+    _turn_tasks.add(task)
+    try:
+        await handle_message(message, replay)
+    except asyncio.CancelledError:
+        if _shutting_down and not is_command(message):   # 취소 중이라 바로 기록 (replied 행은 그대로)
+            _journal_put(f"turn:{message.id}", "turn", message.channel.id, {}, "deferred")
+        raise
+    finally:
+        _turn_tasks.discard(task)
+
+async def graceful_shutdown(reason: str):
+    global _shutting_down
+    if _shutting_down:
+        log("종료", f"{reason} 재수신 — 기다리지 않고 종료", level=logging.WARNING)
+        await bot.close()
+        return
+    _shutting_down = True
+    t0 = time.perf_counter()
+    log("종료", f"{reason} — 새 턴 중단, 처리 중 {len(_turn_tasks)}개 마무리 (최대 {SHUTDOWN_DRAIN_SEC:.0f}초)",
+        level=logging.WARNING, in_flight=len(_turn_tasks))
+    unfinished = set()
+    if _turn_tasks:
+        _, unfinished = await asyncio.wait(set(_turn_tasks), timeout=SHUTDOWN_DRAIN_SEC)
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            await asyncio.wait(unfinished, timeout=2)
+    for cog in list(bot.cogs.values()):
+        if isinstance(cog, BotCog):
+            try:
+                await cog.on_shutdown()
+            except Exception as e:
+                log("종료", f"{type(cog).__name__}.on_shutdown {type(e).__name__}: {e}", level=logging.ERROR)
+    # 디바운스 중인 요약 갱신은 버려도 됨 (/저장 때 남은 delta 를 요약)
+    for task in _summary_tasks.values():
+        task.cancel()
+    await state_backend.close()
+    await close_http_pools()
+    if _calendar_client is not None:
+        await _calendar_client.close()
+    await asyncio.to_thread(_journal_retire)
+    log("종료", f"정리 완료 — 재생 예약 턴 {len(unfinished)}개", latency_ms=ms_since(t0), deferred=len(unfinished))
+    await bot.close()
+
+async def replay_pending_work():
+    """이전 프로세스가 못 끝낸 작업 재생. 다른 샤드 워커의 채널은 건너뜀."""
+    rows = await asyncio.to_thread(_journal_replayable)
+    replayed = 0
+    for key, kind, channel_id, payload, attempts in rows:
+        channel = bot.get_channel(channel_id)
+        if channel is None:
+            continue
+        if attempts >= REPLAY_MAX_ATTEMPTS:
+            log("재생", f"{key} {attempts}회 실패 — 포기", level=logging.WARNING, channel=channel_id)
+            await asyncio.to_thread(_journal_done, key)
+            continue
+        if not await asyncio.to_thread(_journal_claim, key):
+            continue
+        try:
+            if kind == "turn":
+                try:
+                    message = await channel.fetch_message(int(key.split(":", 1)[1]))
+                except discord.NotFound:
+                    await asyncio.to_thread(_journal_done, key)
+                    continue
+                await run_turn(message, replay=True)
+            else:
+                data = json.loads(payload)
+                cog  = bot.get_cog(data.get("cog", ""))
+                if cog:
+                    await cog.resume_work(channel, key, data)
+                await asyncio.to_thread(_journal_done, key)
+            replayed += 1
+        except Exception as e:
+            log("재생", f"{key} {type(e).__name__}: {e}", level=logging.ERROR, channel=channel_id)
+    if replayed:
+        log("재생", f"이전 프로세스 작업 {replayed}개 재생", count=replayed)
+
+async def _replay_logged():
+    try:
+        await replay_pending_work()
+    except Exception as e:
+        log("재생", f"{type(e).__name__}: {e}", level=logging.ERROR)
+
+async def journal_heartbeat():
+    """생존 신호를 남기고, 보류 작업과 신호가 끊긴 인스턴스의 작업을 주기적으로 재생"""
+    replay_task = None
+    while not _shutting_down:
+        try:
+            await asyncio.to_thread(_journal_beat)
+        except sqlite3.Error as e:
+            log("재생", f"생존 신호 기록 실패 {e}", level=logging.ERROR)
+        # 재생은 따로 — 긴 재생 중에도 신호가 끊기지 않게
+        if replay_task is None or replay_task.done():
+            replay_task = asyncio.create_task(_replay_logged())
+        await asyncio.sleep(REPLAY_HEARTBEAT_SEC)
 
 # ─── 이벤트 ───────────────────────────────────────────
-@bot.event
-async def on_ready():
+async def _setup_hook():
+    """로그인 직후, 게이트웨이 접속 전: DB 초기화·마이그레이션 (스레드에서) + 코그 로드"""
+    await loop_monitor.start()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, lambda name=sig.name: asyncio.create_task(graceful_shutdown(name)))
+        except NotImplementedError:   # Windows: 기본 동작 (즉시 종료)
+            pass
+    await asyncio.to_thread(init_storage)
+    for ext in COG_EXTENSIONS:
+        await bot.load_extension(ext)
+    bot.add_dynamic_items(ConfirmButton)   # 재시작 전에 보낸 확인 버튼도 여기로 들어옴
+    asyncio.create_task(_confirm_sweeper())
+    mark_startup("setup")
+
+bot.setup_hook = _setup_hook
+
+async def _check_calendar() -> str:
+    if not GOOGLE_CALENDAR_ID or not GOOGLE_CREDENTIALS_JSON:
+        return "❌ (GOOGLE_CALENDAR_ID 또는 GOOGLE_CREDENTIALS_JSON 미설정)"
+    gcal_client = await asyncio.to_thread(get_calendar_client)   # google-auth import 포함
+    if not gcal_client:
+        return "❌ (JSON 파싱 오류 — Railway 로그 확인)"
+    try:
+        await gcal_client.check()
+        return "✅"
+    except Exception as e:
+        return f"❌ (토큰 발급 실패 — {e})"
+
+async def _load_client(client):
+    if isinstance(client, LazyClient):
+        await asyncio.to_thread(client.load)
+
+async def warm_up():
+    """접속 후 SDK import·클라이언트 생성과 캘린더 점검을 병렬로. 끝나면 브리핑 캐시 채움."""
+    t0 = time.perf_counter()
+    _, _, gcal_status = await asyncio.gather(
+        _load_client(anthropic), _load_client(notion), _check_calendar(),
+    )
     notion_status = "✅" if notion else "❌ (NOTION_TOKEN 미설정)"
+    log("워밍업", f"📓 Notion {notion_status} / 📅 Google Calendar {gcal_status}", latency_ms=ms_since(t0))
+    asyncio.create_task(keep_http_warm())   # 첫 질문 전에 TLS 연결을 미리 맺어둠
+    await refresh_briefing()   # 첫 커맨드부터 캐시로 응답하도록 미리 채움
 
-    # 구글 캘린더: 실제 연결 테스트
-    if not GOOGLE_CALENDAR_ID or not GOOGLE_CREDENTIALS_JSON:
-        gcal_status = "❌ (GOOGLE_CALENDAR_ID 또는 GOOGLE_CREDENTIALS_JSON 미설정)"
-    else:
-        gcal_svc = await asyncio.to_thread(_get_calendar_service)
-        gcal_status = "✅" if gcal_svc else "❌ (JSON 파싱 오류 또는 권한 문제 — Railway 로그 확인)"
+@bot.event
+async def on_ready():
+    global _ready_once
+    mark_startup("ready")
+    if IS_PRIMARY_WORKER:   # 전역 작업은 한 워커에서만 (중복 브리핑·알림 방지)
+        await setup_scheduled_jobs()
+    if not _ready_once:   # 재접속 때마다 on_ready 가 다시 오므로 한 번만 (연결 유지 루프가 쌓이지 않게)
+        _ready_once = True
+        asyncio.create_task(warm_up())
+        asyncio.create_task(journal_heartbeat())
+
+    log("시작", f"✅ {bot.user} 봇 실행 중!",
+        guilds=len(bot.guilds), backend=state_backend.name, startup=startup_report(),
+        **({"shards": SHARD_IDS or list(range(SHARD_COUNT)), "shard_count": SHARD_COUNT,
+            "primary": IS_PRIMARY_WORKER} if SHARD_COUNT else {}))
 
-    print(f"✅ {bot.user} 봇 실행 중!")
-    print(f"📦 연결된 서버 수: {len(bot.guilds)}")
-    print(f"📓 Notion:           {notion_status}")
-    print(f"📅 Google Calendar:  {gcal_status}")
+@bot.event
+async def on_guild_channel_update(before, after):
+    # 채널 이름이 바뀌면 이름 기반 모드가 달라질 수 있으니 캐시 무효화
+    if getattr(before, "name", None) != getattr(after, "name", None):
+        channel_registry.invalidate(after.id)
 
 @bot.event
 async def on_message(message: discord.Message):
@@ -837,14 +4482,24 @@ async def on_message(message: discord.Message):
     # DM 채널 무시 (name 속성 없음)
     if not isinstance(message.channel, discord.TextChannel):
         return
-    await bot.process_commands(message)
-    if not message.content.startswith("/"):
+    if _shutting_down:   # 종료 중: 처리하지 않고 대화만 다음 시작 때 재생 (커맨드는 버림)
+        if not is_command(message):
+            await asyncio.to_thread(_journal_put, f"turn:{message.id}", "turn", message.channel.id, {}, "deferred")
+        return
+    await run_turn(message)
+
+async def handle_message(message: discord.Message, replay: bool = False):
+    log_context.set({"channel": message.channel.id})   # 이 메시지 태스크의 모든 로그에 붙음
+    if not replay:   # 커맨드는 저널에 남기지 않으므로 재생에서도 다시 실행하지 않음
+        await bot.process_commands(message)
+    if not is_command(message):
+
+        cfg = channel_registry.get(message.channel.id, message.channel.name)
+        log_context.set({"channel": message.channel.id, "mode": cfg.mode})
 
         # ── 레이트 리밋 체크 ──────────────────────────────
-        import time
-        now = time.monotonic()
-        last = _last_request.get(message.author.id, 0)
-        remaining = COOLDOWN_SEC - (now - last)
+        # 백엔드에 기록 → 다른 샤드 워커로 간 메시지도 같은 쿨다운 적용
+        remaining = 0 if replay else await state_backend.hit_cooldown(f"user:{message.author.id}", cfg.cooldown_sec)
         if remaining > 0:
             await message.channel.send(
                 f"⏳ {message.author.mention} 너무 빠르게 요청하고 있어요! "
@@ -852,7 +4507,6 @@ async def on_message(message: discord.Message):
                 delete_after=remaining + 1
             )
             return
-        _last_request[message.author.id] = now
 
         # ── 메시지 길이 제한 ──────────────────────────────
         user_text = message.content
@@ -863,10 +4517,12 @@ async def on_message(message: discord.Message):
                 delete_after=5
             )
 
+        # ── 인텐트 라우팅 (모드 + 트리거를 한 번의 스캔으로 결정) ──
+        intent = intent_router.route(message.channel.name, user_text, mode=cfg.mode)
+
         # ── 메모 저장 트리거 감지 (채널 무관, Claude 재호출 없음) ──
-        MEMO_TRIGGER = ("메모로 저장", "메모 저장", "메모해줘", "메모로 남겨",
-                        "메모 남겨", "메모로 기록", "메모에 저장")
-        if any(kw in user_text for kw in MEMO_TRIGGER):
+        # 도구 모드에선 Claude가 notion_save_memo 도구로 직접 처리
+        if intent.action == "memo" and not TOOL_USE_ENABLED:
             if not notion or not NOTION_MEMO_DB_ID:
                 await message.channel.send("❌ Notion 메모 DB가 설정되지 않았어요. (NOTION_MEMO_DB_ID 확인)")
             else:
@@ -895,536 +4551,118 @@ async def on_message(message: discord.Message):
                     )
             return  # Claude 호출 없이 종료
 
+        # ── 부하 조절: 밀려 있으면 가볍게 처리하거나 바로 바쁨 안내 ──
+        shed = await admission.acquire()
+        if shed is None:
+            await message.channel.send(
+                f"🚦 {message.author.mention} 지금 요청이 많이 밀려 있어요. 잠시 후 다시 말해주세요!",
+                delete_after=30
+            )
+            return
+
+        # 여기부터 Claude 호출 — 끊기면 재생하도록 저널에 남김
+        key = f"turn:{message.id}"
+        finished = False
         async with message.channel.typing():
             try:
-                # 헬스 채널: "기록" 관련 키워드 있을 때만 최근 3일 raw 데이터 주입
+                await asyncio.to_thread(_journal_put, key, "turn", message.channel.id, {}, "running")
+                if replay:   # 이전 프로세스가 히스토리에 넣고 답을 못 한 user 메시지 제거
+                    await state_backend.drop_dangling_user(message.channel.id, user_text)
+                # 히스토리/헬스 기록/캘린더는 get_ai_response 안에서 동시에 수집
                 # 히스토리에는 원본 user_text만 저장 (Notion 데이터가 /저장 시 중복 저장 방지)
-                RECORD_KEYWORDS = ("기록", "불러", "최근", "지난", "뭐했", "보여줘", "얼마나", "어떻게 했",
-                                   "먹을까", "뭐먹", "추천", "식단", "운동할까", "어떻게 할까", "뭐할까")
-                send_text = user_text
-                if (get_channel_mode(message.channel.name) == "헬스"
-                        and notion
-                        and any(kw in user_text for kw in RECORD_KEYWORDS)):
-                    records = await notion_get_health_logs(3)
-                    if records:
-                        send_text = (
-                            f"[정훈의 최근 3일 헬스 기록 — 코칭 참고용]\n"
-                            f"{records}\n\n"
-                            f"---\n"
-                            f"[정훈의 메시지]\n{user_text}"
-                        )
-
                 reply = await get_ai_response(
                     message.channel.id,
                     message.channel.name,
-                    send_text,
-                    save_message=user_text,  # 히스토리엔 원본만 저장
+                    user_text,
+                    intent=intent,
+                    shed=shed,
                 )
                 await send_long_message(message.channel, reply)
-
-                # 일정 채널: 시간 관련 키워드 있을 때만 일정 파싱 (이중 API 호출 방지)
-                TIME_KEYWORDS = ("오전", "오후", "시", "분", "내일", "모레", "다음주",
-                                 "월요일", "화요일", "수요일", "목요일", "금요일",
-                                 "토요일", "일요일", "월", "일", "날")
-                if (get_channel_mode(message.channel.name) == "일정"
-                        and GOOGLE_CALENDAR_ID
-                        and any(kw in user_text for kw in TIME_KEYWORDS)):
-                    event = await parse_event_from_ai(user_text)
-                    if event:
-                        allday = not event.get("start_time")
-                        if allday:
-                            start_dt = event["date"]
-                            end_dt   = event["date"]
-                            time_str = "(종일)"
-                        else:
-                            start_dt = f"{event['date']}T{event['start_time']}:00+09:00"
-                            end_dt   = f"{event['date']}T{event['end_time']}:00+09:00"
-                            time_str = f"{event['start_time']}~{event['end_time']}"
-                        ok = await calendar_add_event(
-                            event["title"], start_dt, end_dt,
-                            event.get("description", "")
-                        )
-                        if ok:
-                            await message.channel.send(
-                                f"📅 캘린더에 자동 추가했어요!\n"
-                                f"**{event['title']}** — "
-                                f"{event['date']} {time_str}"
-                            )
+                mark_startup("first_reply")
+
+                # 모드별 후처리 (예: 일정 채널 → 대화 속 일정 캘린더 자동 추가) — 부하 시 생략
+                cog = mode_cog(cfg.mode)
+                if cog and shed < SHED_ENRICH:
+                    # 답은 나갔으니 후처리 중에 끊겨도 재생하지 않음 (중복 답장·중복 일정 방지)
+                    await asyncio.to_thread(_journal_put, key, "turn", message.channel.id, {}, "replied")
+                    await cog.after_reply(message, user_text, reply, intent)
+                finished = True
             except Exception as e:
                 await message.channel.send(f"⚠️ 오류 발생: {e}")
-
-# ─── 헬스 저장 확인 버튼 UI ──────────────────────────
-class HealthSaveView(View):
-    """구조화 데이터 미리보기 확인 후 저장 or 취소"""
-    def __init__(self, parsed: dict, narrative: str, channel_id: int):
-        super().__init__(timeout=120)
-        self.parsed     = parsed      # {date, workout, breakfast, lunch, dinner}
-        self.narrative  = narrative   # 서술형 본문
-        self.channel_id = channel_id
-
-    @discord.ui.button(label="✅ 저장", style=discord.ButtonStyle.green)
-    async def confirm(self, interaction: discord.Interaction, button: Button):
-        await interaction.response.defer()
-        result = await notion_save_health_structured(
-            log_date  = self.parsed.get("date", date.today().isoformat()),
-            workout   = self.parsed.get("workout", ""),
-            breakfast = self.parsed.get("breakfast", ""),
-            lunch     = self.parsed.get("lunch", ""),
-            dinner    = self.parsed.get("dinner", ""),
-            narrative = self.narrative,
-        )
-        if result in ("created", "updated"):
-            action = "✅ 새로 저장" if result == "created" else "🔄 덮어쓰기"
-            await clear_history(self.channel_id)
-            await interaction.edit_original_response(
-                content=f"{action} 완료! ({self.parsed.get('date','')})\n🧹 히스토리 초기화 완료",
-                view=None
-            )
-        else:
-            await interaction.edit_original_response(
-                content="❌ Notion 저장 실패. Railway 로그를 확인해주세요.", view=None
-            )
-        self.stop()
-
-    @discord.ui.button(label="❌ 취소", style=discord.ButtonStyle.red)
-    async def cancel(self, interaction: discord.Interaction, button: Button):
-        await interaction.response.edit_message(
-            content="❌ 저장 취소됐어요. 수정 후 다시 `/저장` 해주세요.", view=None
-        )
-        self.stop()
-
-    async def on_timeout(self):
-        for item in self.children:
-            item.disabled = True
-
-# ─── 기본 커맨드 ──────────────────────────────────────
-@bot.command(name="저장")
-async def save_log(ctx, *, content: str = ""):
-    """
-    헬스: /저장 운동:벤치80kg5x5 아침:오트밀 점심:닭가슴살 저녁:현미+연어
-    자유형식도 가능 — Haiku가 파싱해 구조화 후 미리보기 → 버튼 확인 → Notion 저장
-    """
-    async with ctx.typing():
-        mode = get_channel_mode(ctx.channel.name)
-
-        if mode == "헬스":
-            # 입력이 없으면 대화 히스토리에서 가져옴
-            if not content:
-                history = await get_history(ctx.channel.id)
-                if not history:
-                    await ctx.send(
-                        "❌ 저장할 내용이 없어요!\n"
-                        "사용법: `/저장 운동:벤치80kg5x5 아침:오트밀 점심:닭가슴살 저녁:현미+연어`"
-                    )
-                    return
-                raw_input = "\n".join(
-                    f"{'사용자' if m['role']=='user' else '봇'}: {m['content']}"
-                    for m in history
-                )
-            else:
-                raw_input = content
-
-            today = date.today().isoformat()
-            parse_prompt = (
-                f"아래 내용에서 헬스 기록을 추출해 JSON으로만 답해. 설명 없이 JSON만.\n"
-                f"날짜가 없으면 오늘({today})로 설정.\n"
-                f"없는 항목은 빈 문자열(\"\")로.\n\n"
-                f'{{"date":"YYYY-MM-DD","workout":"","breakfast":"","lunch":"","dinner":""}}\n\n'
-                f"[입력]\n{raw_input}"
-            )
-            resp = await anthropic.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=400,
-                temperature=0,
-                messages=[{"role": "user", "content": parse_prompt}],
-            )
-            raw_json = resp.content[0].text.strip()
-            if "```" in raw_json:
-                raw_json = raw_json.split("```")[1].lstrip("json").strip()
-            try:
-                parsed = json.loads(raw_json)
-            except Exception:
-                await ctx.send("❌ 내용 파싱 실패. 더 명확하게 입력해주세요.\n예: `/저장 운동:벤치80kg 아침:오트밀 점심:닭가슴살 저녁:현미밥`")
-                return
-
-            # 서술형 본문 생성 (Haiku)
-            narrative_prompt = (
-                f"아래 헬스 기록을 자연스러운 한국어 일지로 2-3문장으로 써줘. 없는 내용은 언급하지 마.\n\n"
-                f"날짜: {parsed.get('date','')}\n"
-                f"운동: {parsed.get('workout','')}\n"
-                f"아침: {parsed.get('breakfast','')}\n"
-                f"점심: {parsed.get('lunch','')}\n"
-                f"저녁: {parsed.get('dinner','')}"
-            )
-            narr_resp = await anthropic.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=300,
-                temperature=0.3,
-                messages=[{"role": "user", "content": narrative_prompt}],
-            )
-            narrative = narr_resp.content[0].text.strip()
-
-            # 미리보기
-            preview_lines = [
-                f"📋 **저장 미리보기** ({parsed.get('date','')})",
-                f"🏋️ 운동: {parsed.get('workout','(없음)')}",
-                f"🍽️ 아침: {parsed.get('breakfast','(없음)')}",
-                f"   점심: {parsed.get('lunch','(없음)')}",
-                f"   저녁: {parsed.get('dinner','(없음)')}",
-                f"",
-                f"📝 일지:\n{narrative}",
-            ]
-            view = HealthSaveView(parsed, narrative, ctx.channel.id)
-            await ctx.send("\n".join(preview_lines), view=view)
-            return
-
-        else:
-            # ── 그 외 채널: 텍스트 요약 저장 ──
-            summary = await generate_summary(ctx.channel.id, ctx.channel.name)
-            result  = f"📝 **일지 저장 완료!**\n\n{summary}"
-            await send_long_message(ctx, result)
-
-@bot.command(name="기록")
-async def show_health_records(ctx, days: int = 7):
-    """/기록 [일수] — Notion 헬스 raw 데이터 출력 (Claude.ai 복붙용). 기본 7일"""
-    await ctx.send(f"📂 최근 {days}일 기록 불러오는 중...")
-    records = await notion_get_health_logs(days)
-    if not records:
-        await ctx.send("❌ 기록이 없거나 Notion 연결 오류예요.")
-        return
-    await send_long_message(ctx, f"📋 **최근 {days}일 헬스 기록 (raw)**\n\n{records}")
-
-@bot.command(name="노션테스트")
-async def notion_test(ctx):
-    """Notion 헬스 DB 연결 및 데이터 조회 테스트"""
-    if not notion:
-        await ctx.send("❌ Notion 클라이언트 없음 (NOTION_TOKEN 미설정)")
-        return
-    if not NOTION_HEALTH_DB_ID:
-        await ctx.send("❌ NOTION_HEALTH_DB_ID 미설정")
-        return
-    await ctx.send(f"🔍 Notion 헬스 DB 조회 중...\nDB ID: `{NOTION_HEALTH_DB_ID[:8]}...`")
-    try:
-        res = await notion.databases.query(
-            database_id=NOTION_HEALTH_DB_ID,
-            sorts=[{"property": "날짜", "direction": "descending"}],
-        )
-        count = len(res["results"])
-        if count == 0:
-            await ctx.send("⚠️ DB 연결 성공했지만 저장된 페이지가 0개예요!")
-            return
-        dates = []
-        for page in res["results"][:5]:
-            date_obj = page["properties"].get("날짜", {}).get("date") or {}
-            dates.append(date_obj.get("start", "날짜 없음"))
-        await ctx.send(
-            f"✅ Notion 헬스 DB 연결 성공!\n"
-            f"총 {count}개 페이지 발견\n"
-            f"최근 날짜: {', '.join(dates)}"
-        )
-    except Exception as e:
-        await ctx.send(f"❌ 오류 발생: `{type(e).__name__}: {e}`")
-
-@bot.command(name="초기화")
-async def reset_history(ctx):
-    """이 채널의 대화 히스토리를 삭제"""
-    await clear_history(ctx.channel.id)
-    await ctx.send("🔄 이 채널의 대화 히스토리를 초기화했어요!")
-
-@bot.command(name="히스토리")
-async def show_history(ctx):
-    """현재 채널의 저장된 대화 수 확인"""
-    count = await count_history(ctx.channel.id)
-    turns = count // 2
-    await ctx.send(
-        f"💬 현재 저장된 대화: **{count}개** 메시지 (약 **{turns}턴**)\n"
-        f"⚙️ 최대 보관: {MAX_HISTORY}개"
-    )
-
-@bot.command(name="모드")
-async def show_mode(ctx):
-    """현재 채널의 AI 모드 및 사용 모델 확인"""
-    mode  = get_channel_mode(ctx.channel.name)
-    emoji = MODE_EMOJI.get(mode, "🤖")
-    await ctx.send(f"{emoji} 현재 채널 모드: **{mode}**\n🧠 사용 모델: `{get_model(mode)}`")
-
-# ─── 일정 커맨드 ──────────────────────────────────────
-@bot.command(name="일정추가")
-async def add_schedule(ctx, *, content: str = None):
-    """자연어로 구글 캘린더에 일정 추가. 예: /일정추가 내일 오후 3시 치과"""
-    if not content:
-        await ctx.send("❌ 내용을 입력해주세요.\n예: `/일정추가 내일 오후 3시 치과 예약`")
-        return
-    if not GOOGLE_CALENDAR_ID:
-        await ctx.send("❌ Google Calendar가 설정되지 않았어요. (환경변수 확인)")
-        return
-    async with ctx.typing():
-        event = await parse_event_from_ai(content)
-        if not event:
-            await ctx.send(
-                "❌ 일정 정보를 파악하지 못했어요.\n"
-                "날짜와 시간을 포함해서 다시 입력해주세요.\n"
-                "예: `/일정추가 2월 25일 오후 2시 회의`"
-            )
-            return
-        allday = not event.get("start_time")
-        if allday:
-            start_dt = event["date"]
-            end_dt   = event["date"]
-            time_str = "(종일)"
-        else:
-            start_dt = f"{event['date']}T{event['start_time']}:00+09:00"
-            end_dt   = f"{event['date']}T{event['end_time']}:00+09:00"
-            time_str = f"{event['start_time']} ~ {event['end_time']}"
-        ok = await calendar_add_event(
-            event["title"], start_dt, end_dt, event.get("description", "")
-        )
-        if ok:
-            await ctx.send(
-                f"📅 **캘린더 추가 완료!**\n"
-                f"**제목:** {event['title']}\n"
-                f"**날짜:** {event['date']}\n"
-                f"**시간:** {time_str}"
-            )
-        else:
-            await ctx.send(
-                "❌ 캘린더 추가 중 오류가 발생했어요.\n"
-                "Railway 로그에서 `[Google Calendar 서비스 오류]` 메시지를 확인해주세요.\n"
-                "(`GOOGLE_CREDENTIALS_JSON` 형식 오류일 가능성이 높아요)"
-            )
-
-@bot.command(name="오늘일정")
-async def today_schedule(ctx):
-    """오늘 구글 캘린더 일정 조회"""
-    if not GOOGLE_CALENDAR_ID:
-        await ctx.send("❌ Google Calendar가 설정되지 않았어요.")
-        return
-    async with ctx.typing():
-        today    = date.today()
-        time_min = f"{today.isoformat()}T00:00:00+09:00"
-        time_max = f"{today.isoformat()}T23:59:59+09:00"
-        events   = await calendar_get_events(time_min, time_max)
-        if not events:
-            await ctx.send(f"📅 오늘 ({today.isoformat()}) 등록된 일정이 없어요!")
-            return
-        lines = [f"📅 **오늘 ({today.isoformat()}) 일정**\n"]
-        for e in events:
-            time_str = e["start"][11:16] if "T" in e["start"] else "(종일)"
-            lines.append(f"• {time_str} — {e['title']}")
-        await ctx.send("\n".join(lines))
-
-@bot.command(name="이번주일정")
-async def week_schedule(ctx):
-    """이번 주 구글 캘린더 일정 조회"""
-    if not GOOGLE_CALENDAR_ID:
-        await ctx.send("❌ Google Calendar가 설정되지 않았어요.")
-        return
-    async with ctx.typing():
-        today    = date.today()
-        week_end = today + timedelta(days=7)
-        time_min = f"{today.isoformat()}T00:00:00+09:00"
-        time_max = f"{week_end.isoformat()}T23:59:59+09:00"
-        events   = await calendar_get_events(time_min, time_max)
-        if not events:
-            await ctx.send("📅 이번 주 등록된 일정이 없어요!")
-            return
-        lines = [f"📅 **이번 주 일정 ({today} ~ {week_end})**\n"]
-        for e in events:
-            if "T" in e["start"]:
-                day      = e["start"][:10]
-                time_str = e["start"][11:16]
-                lines.append(f"• {day} {time_str} — {e['title']}")
-            else:
-                lines.append(f"• {e['start']} (종일) — {e['title']}")
-        await send_long_message(ctx, "\n".join(lines))
-
-# ─── 할일 커맨드 ──────────────────────────────────────
-@bot.command(name="할일추가")
-async def add_todo_cmd(ctx, *, content: str = None):
-    """Notion 할일 DB에 할일 추가. 예: /할일추가 보고서 작성"""
-    if not content:
-        await ctx.send("❌ 할일 내용을 입력해주세요.\n예: `/할일추가 보고서 작성`")
-        return
-    if not NOTION_TODO_DB_ID:
-        await ctx.send("❌ Notion 할일 DB가 설정되지 않았어요. (NOTION_TODO_DB_ID 확인)")
-        return
-    ok = await notion_add_todo(content)
-    if ok:
-        await ctx.send(f"✅ 할일 추가 완료!\n**{content}**")
-    else:
-        await ctx.send("❌ 할일 추가 중 오류가 발생했어요.")
-
-@bot.command(name="할일목록")
-async def list_todos_cmd(ctx):
-    """Notion DB에서 미완료 할일 목록 조회"""
-    if not NOTION_TODO_DB_ID:
-        await ctx.send("❌ Notion 할일 DB가 설정되지 않았어요.")
-        return
-    async with ctx.typing():
-        todos = await notion_get_todos()
-        if not todos:
-            await ctx.send("✅ 미완료 할일이 없어요! 모두 완료했나요? 🎉")
-            return
-        priority_emoji = {"높음": "🔴", "중간": "🟡", "낮음": "🟢"}
-        lines = ["**📋 미완료 할일 목록**\n"]
-        for i, todo in enumerate(todos, 1):
-            emoji    = priority_emoji.get(todo["priority"], "⬜")
-            due_str  = f" | 마감: {todo['due']}" if todo["due"] else ""
-            lines.append(f"{i}. {emoji} {todo['title']}{due_str}")
-        await send_long_message(ctx, "\n".join(lines))
-
-@bot.command(name="할일완료")
-async def complete_todo_cmd(ctx, *, title: str = None):
-    """Notion 할일 완료 처리. 예: /할일완료 보고서 작성"""
-    if not title:
-        await ctx.send("❌ 완료할 할일 이름을 입력해주세요.\n예: `/할일완료 보고서 작성`")
-        return
-    if not NOTION_TODO_DB_ID:
-        await ctx.send("❌ Notion 할일 DB가 설정되지 않았어요.")
-        return
-    ok = await notion_complete_todo(title)
-    if ok:
-        await ctx.send(f"✅ **{title}** 완료 처리했어요! 수고했어요 🎉")
-    else:
-        await ctx.send(f"❌ '{title}' 할일을 찾지 못했어요. 이름을 다시 확인해주세요.")
-
-# ─── 수정 커맨드 ──────────────────────────────────────
-@bot.command(name="할일수정")
-async def update_todo_cmd(ctx, *, content: str = None):
-    """Notion 할일 수정. 예: /할일수정 기존이름 | 새이름 또는 /할일수정 이름 | 마감:2026-03-01 또는 /할일수정 이름 | 우선순위:높음"""
-    if not content or "|" not in content:
-        await ctx.send(
-            "❌ 형식을 맞춰주세요.\n"
-            "예시:\n"
-            "`/할일수정 기존이름 | 새이름`\n"
-            "`/할일수정 기존이름 | 마감:2026-03-01`\n"
-            "`/할일수정 기존이름 | 우선순위:높음`"
-        )
-        return
-    if not NOTION_TODO_DB_ID:
-        await ctx.send("❌ Notion 할일 DB가 설정되지 않았어요.")
-        return
-    parts     = content.split("|", 1)
-    old_title = parts[0].strip()
-    change    = parts[1].strip()
-
-    new_title = due_date = priority = ""
-    if change.startswith("마감:"):
-        due_date = change.replace("마감:", "").strip()
-    elif change.startswith("우선순위:"):
-        priority = change.replace("우선순위:", "").strip()
-    else:
-        new_title = change
-
-    ok = await notion_update_todo(old_title, new_title, due_date, priority)
-    if ok:
-        await ctx.send(f"✅ **{old_title}** 할일을 수정했어요!")
-    else:
-        await ctx.send(f"❌ '{old_title}' 할일을 찾지 못했어요. 이름을 다시 확인해주세요.")
-
-@bot.command(name="메모수정")
-async def update_memo_cmd(ctx, *, content: str = None):
-    """Notion 메모 수정. 예: /메모수정 기존제목 | 새 내용"""
-    if not content or "|" not in content:
-        await ctx.send("❌ 형식을 맞춰주세요.\n예: `/메모수정 기존제목 | 새로운 내용`")
-        return
-    if not NOTION_MEMO_DB_ID:
-        await ctx.send("❌ Notion 메모 DB가 설정되지 않았어요.")
-        return
-    parts   = content.split("|", 1)
-    title   = parts[0].strip()
-    new_val = parts[1].strip()
-
-    # 제목 변경인지 내용 변경인지 구분: "제목:" 접두어가 있으면 제목 변경
-    if new_val.startswith("제목:"):
-        ok = await notion_update_memo(title, new_title=new_val.replace("제목:", "").strip())
-    else:
-        ok = await notion_update_memo(title, new_content=new_val)
-    if ok:
-        await ctx.send(f"✅ **{title}** 메모를 수정했어요!")
-    else:
-        await ctx.send(f"❌ '{title}' 메모를 찾지 못했어요. 제목을 다시 확인해주세요.")
-
-@bot.command(name="헬스수정")
-async def update_health_cmd(ctx, *, content: str = None):
-    """Notion 헬스 기록 수정. 예: /헬스수정 2026-02-18 | 수정할 내용"""
-    if not content or "|" not in content:
-        await ctx.send("❌ 형식을 맞춰주세요.\n예: `/헬스수정 2026-02-18 | 수정할 내용`")
-        return
-    if not NOTION_HEALTH_DB_ID:
-        await ctx.send("❌ Notion 헬스 DB가 설정되지 않았어요.")
-        return
-    parts       = content.split("|", 1)
-    date_str    = parts[0].strip()
-    new_content = parts[1].strip()
-    ok = await notion_update_health_log(date_str, new_content)
-    if ok:
-        await ctx.send(f"✅ **{date_str}** 헬스 기록을 수정했어요!")
-    else:
-        await ctx.send(f"❌ '{date_str}' 날짜의 헬스 기록을 찾지 못했어요. 날짜 형식(YYYY-MM-DD)을 확인해주세요.")
-
-# ─── 메모 커맨드 ──────────────────────────────────────
-@bot.command(name="메모")
-async def save_memo_cmd(ctx, *, content: str = None):
-    """Notion 메모 DB에 저장. 예: /메모 제목 | 내용 (| 없으면 전체가 제목)"""
-    if not content:
-        await ctx.send("❌ 메모 내용을 입력해주세요.\n예: `/메모 아이디어 | 내용을 여기에`")
-        return
-    if not NOTION_MEMO_DB_ID:
-        await ctx.send("❌ Notion 메모 DB가 설정되지 않았어요. (NOTION_MEMO_DB_ID 확인)")
-        return
-    if "|" in content:
-        parts = content.split("|", 1)
-        title = parts[0].strip()
-        body  = parts[1].strip()
-    else:
-        title = content[:50]
-        body  = content
-    ok = await notion_save_memo(title, body)
-    if ok:
-        await ctx.send(f"📝 메모 저장 완료!\n**{title}**")
+                finished = True
+            finally:
+                admission.release()
+                if finished or not _shutting_down:   # 종료 마감으로 취소됐으면 run_turn 이 보류로 남김
+                    await asyncio.to_thread(_journal_done, key)
+
+# ─── 샤드 런처 ────────────────────────────────────────
+# SHARD_PROCESSES > 1: 이 프로세스는 샤드를 나눠 워커 프로세스를 띄우고 감시만 함.
+# 길드는 (guild_id >> 22) % SHARD_COUNT 로 한 샤드에만 붙으므로 채널별 상태는 한 워커에 모임.
+def _recommended_shard_count() -> int:
+    async def fetch() -> int:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(
+                "https://discord.com/api/v10/gateway/bot",
+                headers={"Authorization": f"Bot {DISCORD_TOKEN}"},
+            ) as resp:
+                resp.raise_for_status()
+                return (await resp.json())["shards"]
+    return asyncio.run(fetch())
+
+def run_shard_launcher():
+    shard_count = SHARD_COUNT or _recommended_shard_count()
+    processes   = min(SHARD_PROCESSES, shard_count)
+    groups      = [list(range(i, shard_count, processes)) for i in range(processes)]
+    workers: dict[int, subprocess.Popen] = {}
+    restart_at: dict[int, float]         = {}
+    stopping = False
+
+    def spawn(i: int) -> subprocess.Popen:
+        env = {**os.environ, "SHARD_COUNT": str(shard_count),
+               "SHARD_IDS": ",".join(map(str, groups[i]))}
+        log("샤드 런처", f"워커 {i} 시작", worker=i, shards=groups[i])
+        return subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for proc in workers.values():
+            proc.send_signal(signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    log("샤드 런처", f"샤드 {shard_count}개 → 워커 {processes}개")
+    for i in range(processes):
+        if stopping:
+            break
+        workers[i] = spawn(i)
+        time.sleep(IDENTIFY_INTERVAL_SEC * len(groups[i]))   # 워커 간 IDENTIFY 가 겹치지 않게
+
+    while workers:
+        time.sleep(1)
+        for i, proc in list(workers.items()):
+            code = proc.poll()
+            if code is None:
+                continue
+            if stopping:
+                del workers[i]
+            elif i not in restart_at:
+                log("샤드 런처", f"워커 {i} 종료 (code={code}) — {WORKER_RESTART_SEC}초 후 재시작", level=logging.WARNING, worker=i, code=code)
+                restart_at[i] = time.monotonic() + WORKER_RESTART_SEC
+            elif time.monotonic() >= restart_at[i]:
+                del restart_at[i]
+                workers[i] = spawn(i)
+
+mark_startup("import")
+
+# 테스트에서 `import bot` 할 때는 실행하지 않음
+if __name__ == "__main__":
+    if "--bench-import" in sys.argv:        # run_startup_bench 가 띄우는 측정용 프로세스
+        print(f"{_startup_marks['import']:.1f}")
+    elif "--bench-startup" in sys.argv:
+        run_startup_bench()
+    elif SHARD_PROCESSES > 1 and not SHARD_IDS:
+        init_db()   # 마이그레이션은 워커를 띄우기 전에 한 번만
+        run_shard_launcher()
     else:
-        await ctx.send("❌ 메모 저장 중 오류가 발생했어요.")
-
-# ─── 도움말 ───────────────────────────────────────────
-@bot.command(name="도움말")
-async def help_command(ctx):
-    """봇 전체 사용법 출력"""
-    help_text = """**🤖 AI 비서 봇 사용법**
-
-**📺 채널별 자동 모드:**
-`#헬스` → 운동 코치 + 식단 어드바이저 💪 (저장 시 Notion 헬스 일지 저장)
-`#번역` → 번역 모드 🌏 (번역할 때마다 Notion 자동 저장)
-`#일정` → 일정 관리 모드 📅 (일정 언급 시 캘린더 자동 추가)
-그 외 채널 → 만능 비서 모드 🤖
-
-**⚙️ 기본 커맨드:**
-`/저장` — 오늘 대화 AI 요약 후 파일 & Notion 저장
-`/초기화` — 이 채널 대화 히스토리 삭제
-`/히스토리` — 현재 저장된 대화 수 확인
-`/모드` — 현재 채널 모드 및 사용 모델 확인
-
-**📅 일정 커맨드:**
-`/일정추가 [내용]` — AI가 파싱해서 구글 캘린더에 추가
-`/오늘일정` — 오늘 구글 캘린더 일정 조회
-`/이번주일정` — 이번 주 일정 조회
-
-**✅ 할일 커맨드:**
-`/할일추가 [내용]` — Notion 할일 DB에 추가
-`/할일목록` — 미완료 할일 목록 조회
-`/할일완료 [할일명]` — 해당 할일 완료 처리
-`/할일수정 [이름] | [새이름]` — 할일 이름 변경
-`/할일수정 [이름] | 마감:2026-03-01` — 마감일 변경
-`/할일수정 [이름] | 우선순위:높음` — 우선순위 변경
-
-**📝 메모 커맨드:**
-`/메모 [제목] | [내용]` — Notion 메모 DB에 저장
-`/메모수정 [제목] | [새 내용]` — 메모 내용 수정
-
-**💪 헬스 커맨드:**
-`/헬스수정 2026-02-18 | [수정 내용]` — 특정 날짜 헬스 기록 수정
-
-`/도움말` — 이 메시지"""
-    await send_long_message(ctx, help_text)
-
-bot.run(DISCORD_TOKEN)
+        bot.run(DISCORD_TOKEN, log_handler=None)   # discord.py 로그도 루트 로거(큐 파이프라인)로
@@ -0,0 +1 @@
+# 커맨드·모드별 프롬프트 확장 — bot.COG_EXTENSIONS 순서로 로드, /리로드 로 재시작 없이 교체
@@ -0,0 +1,431 @@
+"""기본 커맨드: 만능 비서 프롬프트, /저장 /초기화 /히스토리 /검색 /모드 /채널설정 통계류, /도움말, /리로드 /진단"""
+import io
+import time
+import asyncio
+from datetime import timedelta
+
+import discord
+from discord.ext import commands
+
+from bot import (
+    ADAPTIVE_MODEL_ROUTING,
+    BotCog,
+    COG_EXTENSIONS,
+    DIAG_MAX_SEC,
+    MAX_HISTORY,
+    MODEL_ALIASES,
+    MODEL_POLICIES,
+    MODE_EMOJI,
+    NOTION_HEALTH_DB_ID,
+    ROUTER_BENCH_SAMPLES,
+    SYSTEM_PROMPTS,
+    USAGE_PURPOSE_LABELS,
+    admission,
+    archive_stats,
+    channel_registry,
+    clear_history,
+    count_history,
+    generate_summary,
+    http_pool_report,
+    intent_router,
+    kst_now,
+    kst_today,
+    loop_monitor,
+    mode_cog,
+    notion,
+    profile_loop,
+    reload_cog,
+    search_archive,
+    send_long_message,
+    storage_report,
+    trace_allocations,
+    usage_cost,
+    _idem_saved,
+    _idem_totals,
+    _model_decision_stats,
+    _usage_rollup,
+)
+
+SYSTEM_PROMPT = """너는 정훈의 만능 AI 비서야. 구글 캘린더 및 Notion과 연동되어 있어.
+
+[대화 가능 주제]
+- 운동, 식단, 번역, 일정, 일반 질문 등 무엇이든 도와줘
+- 게임(원신 등), 개발(Unity, 게임 개발), 일상적인 질문 모두 OK
+- 친근하고 실용적인 조언을 해줘
+
+[사용 가능한 커맨드 — 채널 어디서나 동작]
+- `/저장` — 오늘 대화 AI 요약 후 파일 & Notion 저장
+- `/초기화` — 이 채널 대화 히스토리 삭제
+- `/히스토리` — 현재 저장된 대화 수 확인
+- `/검색 [검색어]` — 이 채널의 지난 대화 검색 (초기화해도 보관됨)
+- `/모드` — 현재 채널 모드 및 사용 AI 모델 확인
+- `/도움말` — 전체 커맨드 목록 출력
+
+[일정 관련 커맨드 (구글 캘린더 연동)]
+- `/일정추가 [내용]` — 자연어로 일정 파싱 후 캘린더에 추가
+- `/오늘일정` — 오늘 구글 캘린더 일정 조회
+- `/이번주일정` — 이번 주 일정 조회
+
+[할일 & 메모 커맨드 (Notion 연동)]
+- `/할일추가 [내용]` — Notion 할일 DB에 추가
+- `/할일목록` — 미완료 할일 목록 조회
+- `/할일완료 [이름]` — 완료 처리
+- `/할일수정 [이름] | [새이름 또는 마감:날짜 또는 우선순위:높음]` — 할일 수정
+- `/메모 [제목] | [내용]` — Notion 메모 DB에 저장
+- `/메모수정 [제목] | [새 내용]` — 메모 내용 수정
+
+[채널별 특화 기능]
+- `#헬스` — 운동/식단 특화 + `/저장` 시 Notion 헬스 일지 저장
+- `#번역` — 번역 특화(Sonnet 모델) + 번역마다 Notion 자동 저장
+- `#일정` — 일정 특화 + 자연어 일정 캘린더 자동 감지
+
+🚫 절대 금지 사항 (반드시 지켜):
+- "저장 중...", "처리 중...", "삭제 중...", "추가 중..." 같은 진행형 표현 절대 금지
+- "저장했어요", "추가했어요", "삭제했어요", "수정했어요" 같은 완료형 표현 절대 금지
+- 너는 Notion, 캘린더, 파일에 직접 접근 불가능해. 커맨드를 통해서만 실제 저장/수정이 이루어져
+- 사용자가 저장/수정/삭제를 요청하면 → 해당 커맨드(/저장, /메모, /할일추가 등)를 안내해줘
+- "메모리에서 삭제할게", "기억에서 지울게" 같은 말도 금지 — 대화 히스토리는 /초기화 커맨드로만 삭제 가능해
+사용자가 뭘 할 수 있는지 물어보면 위의 커맨드 목록을 친절하게 안내해줘.
+항상 한국어로 대화해줘."""
+
+def _usage_summary(rows: list[tuple]) -> dict:
+    """롤업 행 → 키별 {calls, tokens, cost}"""
+    out: dict = {}
+    for key, model, calls, inp, outp, c_read, c_write, _lat in rows:
+        agg = out.setdefault(key, {"calls": 0, "tokens": 0, "cost": 0.0})
+        agg["calls"]  += calls
+        agg["tokens"] += inp + outp + c_read + c_write
+        agg["cost"]   += usage_cost(model, inp, outp, c_read, c_write)
+    return out
+
+CHANNEL_SETTING_KEYS = {
+    # 커맨드 키: (필드, 변환 함수)
+    "모드":     ("mode",           lambda v: v if v in SYSTEM_PROMPTS else None),
+    "모델":     ("model",          lambda v: MODEL_ALIASES.get(v.lower(), v) if v.startswith("claude-") or v.lower() in MODEL_ALIASES else None),
+    "토큰":     ("max_tokens",     lambda v: int(v) if v.isdigit() and 64 <= int(v) <= 8192 else None),
+    "히스토리": ("history_budget", lambda v: int(v) if v.isdigit() and 2 <= int(v) <= MAX_HISTORY else None),
+    "쿨다운":   ("cooldown_sec",   lambda v: float(v) if v.replace(".", "", 1).isdigit() else None),
+}
+
+_diag_lock = asyncio.Lock()   # 프로파일러·tracemalloc 는 한 번에 하나만
+
+class Core(BotCog):
+    mode          = "default"
+    system_prompt = SYSTEM_PROMPT
+
+    @commands.command(name="저장")
+    async def save_log(self, ctx, *, content: str = ""):
+        """
+        /저장 — 오늘 대화 요약 저장. 모드 코그가 따로 처리하면(헬스) 그쪽으로 넘김.
+        헬스: /저장 운동:벤치80kg5x5 아침:오트밀 점심:닭가슴살 저녁:현미+연어
+        """
+        async with ctx.typing():
+            mode = channel_registry.get(ctx.channel.id, ctx.channel.name).mode
+            cog  = mode_cog(mode)
+            if cog and await cog.save(ctx, content):
+                return
+            # ── 그 외 채널: 텍스트 요약 저장 ──
+            summary = await generate_summary(ctx.channel.id, ctx.channel.name)
+            result  = f"📝 **일지 저장 완료!**\n\n{summary}"
+            await send_long_message(ctx, result)
+
+    @commands.command(name="노션테스트")
+    async def notion_test(self, ctx):
+        """Notion 헬스 DB 연결 및 데이터 조회 테스트"""
+        if not notion:
+            await ctx.send("❌ Notion 클라이언트 없음 (NOTION_TOKEN 미설정)")
+            return
+        if not NOTION_HEALTH_DB_ID:
+            await ctx.send("❌ NOTION_HEALTH_DB_ID 미설정")
+            return
+        await ctx.send(f"🔍 Notion 헬스 DB 조회 중...\nDB ID: `{NOTION_HEALTH_DB_ID[:8]}...`")
+        try:
+            res = await notion.databases.query(
+                database_id=NOTION_HEALTH_DB_ID,
+                sorts=[{"property": "날짜", "direction": "descending"}],
+            )
+            count = len(res["results"])
+            if count == 0:
+                await ctx.send("⚠️ DB 연결 성공했지만 저장된 페이지가 0개예요!")
+                return
+            dates = []
+            for page in res["results"][:5]:
+                date_obj = page["properties"].get("날짜", {}).get("date") or {}
+                dates.append(date_obj.get("start", "날짜 없음"))
+            await ctx.send(
+                f"✅ Notion 헬스 DB 연결 성공!\n"
+                f"총 {count}개 페이지 발견\n"
+                f"최근 날짜: {', '.join(dates)}"
+            )
+        except Exception as e:
+            await ctx.send(f"❌ 오류 발생: `{type(e).__name__}: {e}`")
+
+    @commands.command(name="초기화")
+    async def reset_history(self, ctx):
+        """이 채널의 대화 히스토리를 삭제"""
+        await clear_history(ctx.channel.id)
+        await ctx.send("🔄 이 채널의 대화 히스토리를 초기화했어요!")
+
+    @commands.command(name="히스토리")
+    async def show_history(self, ctx):
+        """현재 채널의 저장된 대화 수 확인"""
+        count = await count_history(ctx.channel.id)
+        turns = count // 2
+        await ctx.send(
+            f"💬 현재 저장된 대화: **{count}개** 메시지 (약 **{turns}턴**)\n"
+            f"⚙️ 최대 보관: {MAX_HISTORY}개"
+        )
+
+    @commands.command(name="검색")
+    async def search_command(self, ctx, *, query: str = ""):
+        """이 채널의 지난 대화 전체 검색 (/초기화 후에도 보관)"""
+        if not query.strip():
+            await ctx.send("사용법: `/검색 [검색어]`  (예: `/검색 스쿼트 무게`)")
+            return
+        t0 = time.perf_counter()
+        results = await search_archive(ctx.channel.id, query)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        if not results:
+            total, since = await archive_stats(ctx.channel.id)
+            await ctx.send(f"🔍 **'{query}'** 검색 결과가 없어요. (보관된 메시지 {total}개"
+                           + (f", {since}부터)" if since else ")"))
+            return
+        lines = [f"🔍 **'{query}'** 검색 결과 {len(results)}건 ({elapsed_ms:.0f}ms)\n"]
+        for r in results:
+            icon = "👤" if r["role"] == "user" else "🤖"
+            lines.append(f"`{r['day']}` {icon} {r['snippet']}")
+        await send_long_message(ctx, "\n".join(lines))
+
+    @commands.command(name="모드")
+    async def show_mode(self, ctx):
+        """현재 채널의 AI 모드 및 사용 모델 확인"""
+        cfg   = channel_registry.get(ctx.channel.id, ctx.channel.name)
+        emoji = MODE_EMOJI.get(cfg.mode, "🤖")
+        policy = MODEL_POLICIES.get(cfg.mode, MODEL_POLICIES["default"])
+        if "model" in cfg.overrides or not ADAPTIVE_MODEL_ROUTING:
+            model_str = f"`{cfg.model}` (고정)"
+        elif policy.get("upgrade"):
+            model_str = (f"`{MODEL_ALIASES[policy['base']]}` → 복잡한 질문은 "
+                         f"`{MODEL_ALIASES[policy['upgrade']]}` (복잡도 ≥ {policy['threshold']})")
+        else:
+            model_str = f"`{MODEL_ALIASES[policy['base']]}`"
+        await ctx.send(f"{emoji} 현재 채널 모드: **{cfg.mode}**\n🧠 사용 모델: {model_str}")
+
+    @commands.command(name="모델통계")
+    async def model_stats(self, ctx, days: int = 7):
+        """/모델통계 [일수] — 적응형 모델 선택 결과 (호출 수, 평균 지연, 정적 매핑과 다른 선택)"""
+        rows = await asyncio.to_thread(_model_decision_stats, days)
+        if not rows:
+            await ctx.send(f"📊 최근 {days}일 모델 선택 기록이 없어요.")
+            return
+        total = sum(r[1] for r in rows)
+        lines = [f"📊 **최근 {days}일 모델 선택** (총 {total}회)\n"]
+        for model, count, avg_ms, changed in rows:
+            lines.append(f"• `{model}` — {count}회 ({count / total:.0%}) | 평균 {avg_ms:.0f}ms | "
+                         f"정적 매핑과 다름 {changed}회")
+        await ctx.send("\n".join(lines))
+
+    @commands.command(name="사용량")
+    async def usage_stats(self, ctx, days: int = 7):
+        """/사용량 [일수] — 오늘/기간 토큰·비용 합계, 채널·용도·모델별 상위 사용처"""
+        days  = max(1, min(days, 90))
+        today = kst_today()
+        since = (today - timedelta(days=days - 1)).isoformat()
+        by_day, by_channel, by_purpose, by_model = await asyncio.gather(*(
+            asyncio.to_thread(_usage_rollup, since, g)
+            for g in ("day", "channel_id", "purpose", "model")
+        ))
+        if not by_day:
+            await ctx.send(f"💸 최근 {days}일 Anthropic 호출 기록이 없어요.")
+            return
+
+        def fmt(agg: dict) -> str:
+            return f"{agg['calls']}회 | {agg['tokens']:,} 토큰 | ${agg['cost']:.3f}"
+
+        daily  = _usage_summary(by_day)
+        empty  = {"calls": 0, "tokens": 0, "cost": 0.0}
+        period = _usage_summary([("all", *r[1:]) for r in by_day])["all"]
+        lines  = [
+            "💸 **Anthropic 사용량** (추정 비용)\n",
+            f"**오늘** — {fmt(daily.get(today.isoformat(), empty))}",
+            f"**최근 {days}일** — {fmt(period)}\n",
+        ]
+        for title, rows, label in (
+            ("📺 채널별", by_channel, lambda k: f"<#{k}>" if k else "(채널 없음)"),
+            ("🏷️ 용도별", by_purpose, lambda k: USAGE_PURPOSE_LABELS.get(k, k)),
+            ("🧠 모델별", by_model,   lambda k: f"`{k}`"),
+        ):
+            top = sorted(_usage_summary(rows).items(), key=lambda kv: kv[1]["cost"], reverse=True)[:5]
+            lines.append(f"**{title} 상위**")
+            lines += [f"• {label(k)} — {fmt(v)}" for k, v in top]
+            lines.append("")
+        await send_long_message(ctx, "\n".join(lines).rstrip())
+
+    @commands.command(name="채널설정")
+    async def channel_settings(self, ctx, key: str = None, *, value: str = None):
+        """/채널설정 — 현재 설정 / /채널설정 [모드|모델|토큰|히스토리|쿨다운] [값|기본] / /채널설정 초기화 (채널 관리 권한 필요)"""
+        if key is None:
+            cfg = channel_registry.get(ctx.channel.id, ctx.channel.name)
+            marks = lambda field: " ✏️" if field in cfg.overrides else ""
+            await ctx.send(
+                f"⚙️ **#{ctx.channel.name} 채널 설정**\n"
+                f"모드: **{cfg.mode}**{marks('mode')}\n"
+                f"모델: `{cfg.model}`{marks('model')}\n"
+                f"max_tokens: {cfg.max_tokens}{marks('max_tokens')}\n"
+                f"히스토리 예산: {cfg.history_budget}개{marks('history_budget')}\n"
+                f"쿨다운: {cfg.cooldown_sec:g}초{marks('cooldown_sec')}\n"
+                f"(✏️ = 채널 오버라이드)"
+            )
+            return
+        if not ctx.author.guild_permissions.manage_channels:
+            await ctx.send("❌ 채널 설정 변경은 채널 관리 권한이 있어야 해요.")
+            return
+        if key == "초기화":
+            await channel_registry.reset(ctx.channel.id)
+            await ctx.send("🔄 이 채널 설정을 기본값으로 되돌렸어요.")
+            return
+        if key not in CHANNEL_SETTING_KEYS or not value:
+            await ctx.send(
+                "❌ 형식을 맞춰주세요.\n"
+                "예: `/채널설정 모델 haiku`, `/채널설정 토큰 512`, `/채널설정 히스토리 10`, "
+                "`/채널설정 쿨다운 3`, `/채널설정 모드 번역`, `/채널설정 모델 기본`"
+            )
+            return
+        field, convert = CHANNEL_SETTING_KEYS[key]
+        value = value.strip()
+        if value == "기본":
+            new_value = None
+        else:
+            new_value = convert(value)
+            if new_value is None:
+                await ctx.send(f"❌ '{value}'은(는) {key} 값으로 쓸 수 없어요.")
+                return
+        await channel_registry.update(ctx.channel.id, **{field: new_value})
+        cfg = channel_registry.get(ctx.channel.id, ctx.channel.name)
+        await ctx.send(f"✅ {key} 설정 변경: **{getattr(cfg, field)}** (즉시 적용)")
+
+    @commands.command(name="중복방지")
+    async def idempotency_stats(self, ctx):
+        """중복 방지 레이어가 아낀 Notion/캘린더 호출 수"""
+        totals = await asyncio.to_thread(_idem_totals)
+        names  = {"calendar": "📅 일정", "todo": "✅ 할일", "memo": "📝 메모"}
+        lines  = ["♻️ **중복 방지 통계**\n"]
+        for kind, keys, hits in totals:
+            lines.append(f"{names.get(kind, kind)} — 기억 중 {keys}건 | 건너뛴 호출 {hits or 0}회 "
+                         f"(이번 실행 {_idem_saved.get(kind, 0)}회)")
+        if len(lines) == 1:
+            lines.append("아직 기록이 없어요.")
+        await ctx.send("\n".join(lines))
+
+    @commands.command(name="라우팅")
+    async def show_routing(self, ctx):
+        """인텐트 라우터 누적 통계 + 기존 키워드 스캔 대비 마이크로 벤치마크"""
+        stats = intent_router.stats
+        avg   = stats["total_us"] / stats["count"] if stats["count"] else 0.0
+        compiled, naive = await asyncio.to_thread(intent_router.benchmark, ROUTER_BENCH_SAMPLES)
+        await ctx.send(
+            f"🧭 **인텐트 라우터**\n"
+            f"라우팅 횟수: {stats['count']} | 평균 {avg:.1f}µs | 최대 {stats['max_us']:.1f}µs\n"
+            f"벤치마크 (메시지당): 컴파일 매처 {compiled:.1f}µs vs 튜플 스캔 {naive:.1f}µs"
+        )
+
+    @commands.command(name="도움말")
+    async def help_command(self, ctx):
+        """봇 전체 사용법 출력"""
+        help_text = """**🤖 AI 비서 봇 사용법**
+
+    **📺 채널별 자동 모드:**
+    `#헬스` → 운동 코치 + 식단 어드바이저 💪 (저장 시 Notion 헬스 일지 저장)
+    `#번역` → 번역 모드 🌏 (번역할 때마다 Notion 자동 저장)
+    `#일정` → 일정 관리 모드 📅 (일정 언급 시 캘린더 자동 추가)
+    그 외 채널 → 만능 비서 모드 🤖
+
+    **⚙️ 기본 커맨드:**
+    `/저장` — 오늘 대화 AI 요약 후 파일 & Notion 저장
+    `/초기화` — 이 채널 대화 히스토리 삭제
+    `/히스토리` — 현재 저장된 대화 수 확인
+    `/검색 [검색어]` — 이 채널의 지난 대화 전체 검색
+    `/모드` — 현재 채널 모드 및 사용 모델 확인
+    `/채널설정 [항목] [값]` — 채널별 모델/토큰/히스토리/쿨다운 변경 (관리자)
+    `/리로드 [코그]` — 재시작 없이 커맨드·프롬프트 교체 (봇 소유자)
+    `/진단 [지연|부하|연결|저장소|프로파일|메모리] [초]` — 루프 지연·부하 조절·HTTP 연결·DB 용량·핫스팟·메모리 할당 리포트 파일 (봇 소유자)
+    `/사용량 [일수]` — Anthropic 토큰·비용 합계와 상위 사용처
+
+    **📅 일정 커맨드:**
+    `/일정추가 [내용]` — AI가 파싱해서 구글 캘린더에 추가
+    `/오늘일정` — 오늘 구글 캘린더 일정 조회
+    `/이번주일정` — 이번 주 일정 조회
+    `/브리핑` — 오늘 일정 + 할일 + 최근 헬스 기록 한눈에
+
+    **✅ 할일 커맨드:**
+    `/할일추가 [내용]` — Notion 할일 DB에 추가
+    `/할일목록` — 미완료 할일 목록 조회
+    `/할일완료 [할일명]` — 해당 할일 완료 처리
+    `/할일수정 [이름] | [새이름]` — 할일 이름 변경
+    `/할일수정 [이름] | 마감:2026-03-01` — 마감일 변경
+    `/할일수정 [이름] | 우선순위:높음` — 우선순위 변경
+
+    **📝 메모 커맨드:**
+    `/메모 [제목] | [내용]` — Notion 메모 DB에 저장
+    `/메모수정 [제목] | [새 내용]` — 메모 내용 수정
+
+    **💪 헬스 커맨드:**
+    `/헬스수정 2026-02-18 | [수정 내용]` — 특정 날짜 헬스 기록 수정
+
+    `/도움말` — 이 메시지"""
+        await send_long_message(ctx, help_text)
+
+    @commands.command(name="리로드")
+    async def reload_cogs(self, ctx, name: str = "전체"):
+        """/리로드 [코그|전체] — 재시작 없이 코그 교체 (봇 소유자 전용)"""
+        if not await self.bot.is_owner(ctx.author):
+            await ctx.send("❌ 리로드는 봇 소유자만 할 수 있어요.")
+            return
+        available = [ext.split(".")[-1] for ext in COG_EXTENSIONS]
+        if name != "전체" and name not in available:
+            await ctx.send(f"❌ 없는 코그예요. 가능: {', '.join(available)}, 전체")
+            return
+        targets = COG_EXTENSIONS if name == "전체" else (f"cogs.{name}",)
+        lines = ["🔄 **코그 리로드** (게이트웨이 연결·캐시 유지)\n"]
+        for ext in targets:
+            try:
+                total_ms, gap_ms = await reload_cog(ext)
+            except commands.ExtensionError as e:
+                lines.append(f"❌ `{ext}` 실패 — 이전 코드 유지: {e}")
+                continue
+            lines.append(f"✅ `{ext}` {total_ms:.1f}ms (커맨드 공백 {gap_ms:.1f}ms)")
+        await ctx.send("\n".join(lines))
+
+    @commands.command(name="진단")
+    async def diagnose(self, ctx, kind: str = "지연", seconds: float = 10):
+        """/진단 [지연|부하|연결|저장소|프로파일|메모리] [초] — 실행 중인 프로세스 진단 결과를 파일로 (봇 소유자 전용)"""
+        if not await self.bot.is_owner(ctx.author):
+            await ctx.send("❌ 진단은 봇 소유자만 할 수 있어요.")
+            return
+        if kind not in ("지연", "부하", "연결", "저장소", "프로파일", "메모리"):
+            await ctx.send("❌ 사용법: `/진단 [지연|부하|연결|저장소|프로파일|메모리] [초]`")
+            return
+        if _diag_lock.locked():
+            await ctx.send("⏳ 다른 진단이 실행 중이에요. 끝나고 다시 시도해주세요.")
+            return
+        seconds = min(max(seconds, 1.0), DIAG_MAX_SEC)
+        async with _diag_lock:
+            if kind == "지연":
+                report = loop_monitor.report()
+            elif kind == "부하":
+                report = admission.report()
+            elif kind == "연결":
+                report = http_pool_report()
+            elif kind == "저장소":
+                report = await storage_report()
+            else:
+                await ctx.send(f"🔬 {seconds:.0f}초 동안 {kind} 수집 중...")
+                report = await (profile_loop(seconds) if kind == "프로파일" else trace_allocations(seconds))
+        head = "\n".join(report.splitlines()[:3])
+        await ctx.send(
+            f"🩺 **/진단 {kind}**\n```\n{head}\n```",
+            file=discord.File(io.BytesIO(report.encode()), filename=f"diag-{kind}-{kst_now():%Y%m%d-%H%M%S}.txt"),
+        )
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Core(bot))
@@ -0,0 +1,209 @@
+"""헬스 채널: 트레이너 프롬프트, /저장(구조화 헬스 일지), /기록, /헬스수정"""
+import json
+
+import discord
+from discord.ext import commands
+
+from bot import (
+    BotCog,
+    ConfirmFailed,
+    NOTION_HEALTH_DB_ID,
+    claude_create,
+    clear_history,
+    get_history,
+    kst_today,
+    notion_get_health_logs,
+    notion_save_health_structured,
+    notion_update_health_log,
+    register_confirm,
+    send_confirmation,
+    send_long_message,
+)
+
+SYSTEM_PROMPT = """너는 정훈의 전담 헬스 트레이너 겸 식단 어드바이저야. Notion과 연동되어 있어서 오늘 대화를 일지로 저장할 수 있어.
+
+[운동 코칭]
+- 오늘 운동 내용 파악, 다음 운동 추천, 무게/세트/횟수 피드백
+- 운동 루틴 설계, 부위별 운동 추천, 부상 예방 조언
+
+[식단 관리]
+- 먹은 것 기록, 다음 끼니 추천, 칼로리/영양 조언
+- 다이어트 목표에 맞는 식단 설계, 외식 메뉴 추천
+- 콜레스테롤 관리, 단백질 섭취 최적화 등 건강한 식습관 조언
+
+[헬스 데이터 정리 포맷 — 반드시 이 형식만 사용]
+대화 중에 운동/식단을 정리하거나 요약할 때 반드시 아래 포맷을 그대로 써:
+
+🗓️ [날짜] ([요일])
+
+🏋️ 운동 기록
+운동 부위/종목: 
+무게/세트/횟수: 
+운동 시간대: 
+컨디션: 
+
+🍽️ 식단 기록
+아침: 
+점심: 
+저녁: 
+간식/야식: 
+
+⭐ 특기사항
+- 
+- 
+
+이 포맷 외의 다른 방식으로 헬스 기록을 정리하지 마. 불릿포인트(•), 다른 이모지, 다른 순서 사용 금지.
+
+[사용 가능한 커맨드]
+- `/저장` — 오늘 대화를 AI가 요약해서 Notion 헬스 일지 DB에 자동 저장
+- `/초기화` — 이 채널 대화 히스토리 삭제
+- `/히스토리` — 현재 저장된 대화 수 확인
+- `/검색 [검색어]` — 이 채널의 지난 대화 검색 (초기화해도 보관됨)
+
+[과거 기록 자동 불러오기]
+"최근 기록 보여줘", "지난주 뭐했어", "기록 불러와" 같은 말을 하면 → Notion에서 자동으로 최근 7일 기록을 가져와서 너에게 전달해줘. 그러면 그걸 바탕으로 대화하면 돼.
+이 기능은 자동이라서 커맨드 없이도 돼. 사용자한테 "못한다"고 하지 마.
+
+🚫 절대 금지 사항 (이것만큼은 반드시 지켜):
+- "저장 중...", "기록 중...", "삭제 중...", "처리 중..." 같은 말 절대 금지 — 너는 실시간으로 아무것도 못 해
+- "저장했어요", "기록했어요", "삭제했어요" 같은 말 절대 금지 — 실제로 한 게 아니니까
+- 사용자가 "저장해줘" 라고 하면 → `/저장` 커맨드를 안내해줘
+- 사용자가 "삭제해줘", "초기화해줘" 라고 하면 → `/초기화` 커맨드를 안내해줘
+- 너는 Notion, 파일, 메모리에 직접 접근하는 능력이 없어. 커맨드를 통해서만 가능해
+- 기록 수정은 `/헬스수정 날짜 | 내용` 커맨드로만 가능해
+항상 한국어로 대화하고, 친근하고 동기부여되는 톤으로 말해줘."""
+
+async def _confirm_health_save(interaction: discord.Interaction, pending: dict) -> str:
+    """/저장 미리보기에서 ✅ → Notion 저장 (pending: {parsed: {date, workout, breakfast, lunch, dinner}, narrative})"""
+    parsed = pending["parsed"]
+    result = await notion_save_health_structured(
+        log_date  = parsed.get("date", kst_today().isoformat()),
+        workout   = parsed.get("workout", ""),
+        breakfast = parsed.get("breakfast", ""),
+        lunch     = parsed.get("lunch", ""),
+        dinner    = parsed.get("dinner", ""),
+        narrative = pending["narrative"],
+    )
+    if result not in ("created", "updated"):
+        raise ConfirmFailed("❌ Notion 저장 실패. 잠시 후 다시 눌러보거나 Railway 로그를 확인해주세요.")
+    action = "✅ 새로 저장" if result == "created" else "🔄 덮어쓰기"
+    await clear_history(interaction.channel_id)
+    return f"{action} 완료! ({parsed.get('date','')})\n🧹 히스토리 초기화 완료"
+
+class Health(BotCog):
+    mode          = "헬스"
+    system_prompt = SYSTEM_PROMPT
+
+    async def cog_load(self):
+        await super().cog_load()
+        register_confirm(
+            "health_save", _confirm_health_save,
+            cancel_text="❌ 저장 취소됐어요. 수정 후 다시 `/저장` 해주세요.",
+            expired_text="⌛ 이미 처리됐거나 만료된 요청이에요. 다시 `/저장` 해주세요.",
+            labels=("✅ 저장", "❌ 취소"),
+        )
+
+    async def save(self, ctx, content: str) -> bool:
+        """/저장 (헬스): Haiku가 파싱해 구조화 후 미리보기 → 버튼 확인 → Notion 저장"""
+        # 입력이 없으면 대화 히스토리에서 가져옴
+        if not content:
+            history = await get_history(ctx.channel.id)
+            if not history:
+                await ctx.send(
+                    "❌ 저장할 내용이 없어요!\n"
+                    "사용법: `/저장 운동:벤치80kg5x5 아침:오트밀 점심:닭가슴살 저녁:현미+연어`"
+                )
+                return True
+            raw_input = "\n".join(
+                f"{'사용자' if m['role']=='user' else '봇'}: {m['content']}"
+                for m in history
+            )
+        else:
+            raw_input = content
+
+        today = kst_today().isoformat()
+        parse_prompt = (
+            f"아래 내용에서 헬스 기록을 추출해 JSON으로만 답해. 설명 없이 JSON만.\n"
+            f"날짜가 없으면 오늘({today})로 설정.\n"
+            f"없는 항목은 빈 문자열(\"\")로.\n\n"
+            f'{{"date":"YYYY-MM-DD","workout":"","breakfast":"","lunch":"","dinner":""}}\n\n'
+            f"[입력]\n{raw_input}"
+        )
+        resp = await claude_create(
+            "health_parse", ctx.channel.id,
+            model="claude-haiku-4-5-20251001",
+            max_tokens=400,
+            temperature=0,
+            messages=[{"role": "user", "content": parse_prompt}],
+        )
+        raw_json = resp.content[0].text.strip()
+        if "```" in raw_json:
+            raw_json = raw_json.split("```")[1].lstrip("json").strip()
+        try:
+            parsed = json.loads(raw_json)
+        except Exception:
+            await ctx.send("❌ 내용 파싱 실패. 더 명확하게 입력해주세요.\n예: `/저장 운동:벤치80kg 아침:오트밀 점심:닭가슴살 저녁:현미밥`")
+            return True
+
+        # 서술형 본문 생성 (Haiku)
+        narrative_prompt = (
+            f"아래 헬스 기록을 자연스러운 한국어 일지로 2-3문장으로 써줘. 없는 내용은 언급하지 마.\n\n"
+            f"날짜: {parsed.get('date','')}\n"
+            f"운동: {parsed.get('workout','')}\n"
+            f"아침: {parsed.get('breakfast','')}\n"
+            f"점심: {parsed.get('lunch','')}\n"
+            f"저녁: {parsed.get('dinner','')}"
+        )
+        narr_resp = await claude_create(
+            "health_narrative", ctx.channel.id,
+            model="claude-haiku-4-5-20251001",
+            max_tokens=300,
+            temperature=0.3,
+            messages=[{"role": "user", "content": narrative_prompt}],
+        )
+        narrative = narr_resp.content[0].text.strip()
+
+        # 미리보기
+        preview_lines = [
+            f"📋 **저장 미리보기** ({parsed.get('date','')})",
+            f"🏋️ 운동: {parsed.get('workout','(없음)')}",
+            f"🍽️ 아침: {parsed.get('breakfast','(없음)')}",
+            f"   점심: {parsed.get('lunch','(없음)')}",
+            f"   저녁: {parsed.get('dinner','(없음)')}",
+            "",
+            f"📝 일지:\n{narrative}",
+        ]
+        await send_confirmation(ctx, "health_save", "\n".join(preview_lines),
+                                {"parsed": parsed, "narrative": narrative})
+        return True
+
+    @commands.command(name="기록")
+    async def show_health_records(self, ctx, days: int = 7):
+        """/기록 [일수] — Notion 헬스 raw 데이터 출력 (Claude.ai 복붙용). 기본 7일"""
+        await ctx.send(f"📂 최근 {days}일 기록 불러오는 중...")
+        records = await notion_get_health_logs(days)
+        if not records:
+            await ctx.send("❌ 기록이 없거나 Notion 연결 오류예요.")
+            return
+        await send_long_message(ctx, f"📋 **최근 {days}일 헬스 기록 (raw)**\n\n{records}")
+
+    @commands.command(name="헬스수정")
+    async def update_health_cmd(self, ctx, *, content: str = None):
+        """Notion 헬스 기록 수정. 예: /헬스수정 2026-02-18 | 수정할 내용"""
+        if not content or "|" not in content:
+            await ctx.send("❌ 형식을 맞춰주세요.\n예: `/헬스수정 2026-02-18 | 수정할 내용`")
+            return
+        if not NOTION_HEALTH_DB_ID:
+            await ctx.send("❌ Notion 헬스 DB가 설정되지 않았어요.")
+            return
+        parts       = content.split("|", 1)
+        date_str    = parts[0].strip()
+        new_content = parts[1].strip()
+        ok = await notion_update_health_log(date_str, new_content)
+        if ok:
+            await ctx.send(f"✅ **{date_str}** 헬스 기록을 수정했어요!")
+        else:
+            await ctx.send(f"❌ '{date_str}' 날짜의 헬스 기록을 찾지 못했어요. 날짜 형식(YYYY-MM-DD)을 확인해주세요.")
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Health(bot))
@@ -0,0 +1,164 @@
+"""일정 채널: 일정 비서 프롬프트, 대화 속 일정 자동 추가, /일정추가 /오늘일정 /이번주일정 /브리핑"""
+import asyncio
+from datetime import timedelta
+
+import discord
+from discord.ext import commands
+
+from bot import (
+    BotCog,
+    GOOGLE_CALENDAR_ID,
+    Intent,
+    TOOL_USE_ENABLED,
+    briefing_get,
+    calendar_add_events,
+    calendar_get_events,
+    event_datetimes,
+    format_briefing,
+    format_event_results,
+    kst_today,
+    parse_events_from_ai,
+    send_long_message,
+)
+
+SYSTEM_PROMPT = """너는 정훈의 전담 일정 관리 비서야. 구글 캘린더와 실제로 연동되어 있어.
+
+[캘린더 연동 기능]
+- 사용자가 일정을 말하면 시스템이 자동으로 캘린더에 추가를 시도해. 별도 커맨드 안내 불필요.
+- `/일정추가 [내용]` — 자연어로 일정을 파싱해서 구글 캘린더에 자동 추가 (예: /일정추가 내일 오후 3시 치과)
+- `/오늘일정` — 오늘 구글 캘린더에 등록된 일정 조회
+- `/이번주일정` — 이번 주 일정 전체 조회
+- 사용자가 일정을 말하면 "자동으로 추가해드릴게요!" 식으로 자연스럽게 응대해줘. 커맨드를 복사하라는 안내는 하지 마.
+
+[할일 관리 (Notion 연동)]
+- `/할일추가 [내용]` — Notion 할일 DB에 추가
+- `/할일목록` — 미완료 할일 목록 조회
+- `/할일완료 [이름]` — 완료 처리
+
+[일반 조언]
+- 일정 우선순위 조언, 시간 관리 도움, 데드라인 관리
+- 업무와 개인 일정 균형 조언
+
+사용자가 "캘린더 연결됐어?" 같이 물어보면 "네, 구글 캘린더와 연동되어 있어요! `/오늘일정` 이나 `/일정추가`를 써보세요 📅" 라고 안내해줘.
+🚫 절대 금지 사항 (반드시 지켜):
+- "저장 중...", "추가 중...", "삭제 중...", "처리 중..." 같은 말 절대 금지
+- "저장했어요", "추가했어요", "삭제했어요" 같은 말 절대 금지 — 실제로 한 게 아니야
+- 사용자가 "저장해줘", "추가해줘", "삭제해줘" 라고 하면 → 해당 커맨드를 안내만 해줘
+- 할일 수정은 `/할일수정 기존이름 | 새이름` 커맨드로만 가능해. 사용자가 "수정해줘"라고 하면 안내해줘
+항상 한국어로 대화하고, 효율적이고 명확하게 답해줘."""
+
+class Schedule(BotCog):
+    mode          = "일정"
+    system_prompt = SYSTEM_PROMPT
+
+    async def after_reply(self, message: discord.Message, user_text: str, reply: str, intent: Intent):
+        # 시간 관련 키워드 있을 때만 일정 파싱 (이중 API 호출 방지)
+        # 도구 모드에선 응답 턴에서 calendar_add_event 로 이미 처리됨
+        if not intent.parse_event or not GOOGLE_CALENDAR_ID or TOOL_USE_ENABLED:
+            return
+        events = await parse_events_from_ai(user_text, message.channel.id)
+        if events:
+            statuses = await calendar_add_events(events)
+            if "added" in statuses:
+                await message.channel.send(
+                    format_event_results(events, statuses, "📅 캘린더에 자동 추가했어요!")
+                )
+
+    @commands.command(name="일정추가")
+    async def add_schedule(self, ctx, *, content: str = None):
+        """자연어로 구글 캘린더에 일정 추가. 예: /일정추가 내일 오후 3시 치과"""
+        if not content:
+            await ctx.send("❌ 내용을 입력해주세요.\n예: `/일정추가 내일 오후 3시 치과 예약`")
+            return
+        if not GOOGLE_CALENDAR_ID:
+            await ctx.send("❌ Google Calendar가 설정되지 않았어요. (환경변수 확인)")
+            return
+        async with ctx.typing():
+            events = await parse_events_from_ai(content, ctx.channel.id)
+            if not events:
+                await ctx.send(
+                    "❌ 일정 정보를 파악하지 못했어요.\n"
+                    "날짜와 시간을 포함해서 다시 입력해주세요.\n"
+                    "예: `/일정추가 2월 25일 오후 2시 회의`"
+                )
+                return
+            statuses = await calendar_add_events(events)
+            if len(events) == 1 and statuses[0] == "added":
+                event = events[0]
+                _, _, time_str = event_datetimes(event)
+                await ctx.send(
+                    f"📅 **캘린더 추가 완료!**\n"
+                    f"**제목:** {event['title']}\n"
+                    f"**날짜:** {event['date']}\n"
+                    f"**시간:** {time_str}"
+                )
+            elif "failed" not in statuses or "added" in statuses:
+                await send_long_message(ctx, format_event_results(events, statuses, "📅 **캘린더 추가 완료!**"))
+            else:
+                await ctx.send(
+                    "❌ 캘린더 추가 중 오류가 발생했어요.\n"
+                    "Railway 로그에서 `[Google Calendar 서비스 오류]` 메시지를 확인해주세요.\n"
+                    "(`GOOGLE_CREDENTIALS_JSON` 형식 오류일 가능성이 높아요)"
+                )
+
+    @commands.command(name="오늘일정")
+    async def today_schedule(self, ctx):
+        """오늘 구글 캘린더 일정 조회"""
+        if not GOOGLE_CALENDAR_ID:
+            await ctx.send("❌ Google Calendar가 설정되지 않았어요.")
+            return
+        async with ctx.typing():
+            today  = kst_today()
+            try:
+                events = await briefing_get("events")   # 브리핑 캐시가 신선하면 원격 호출 없음
+            except Exception:
+                await ctx.send("❌ 일정을 불러오지 못했어요. 잠시 후 다시 시도해주세요.")
+                return
+            if not events:
+                await ctx.send(f"📅 오늘 ({today.isoformat()}) 등록된 일정이 없어요!")
+                return
+            lines = [f"📅 **오늘 ({today.isoformat()}) 일정**\n"]
+            for e in events:
+                time_str = e["start"][11:16] if "T" in e["start"] else "(종일)"
+                lines.append(f"• {time_str} — {e['title']}")
+            await ctx.send("\n".join(lines))
+
+    @commands.command(name="이번주일정")
+    async def week_schedule(self, ctx):
+        """이번 주 구글 캘린더 일정 조회"""
+        if not GOOGLE_CALENDAR_ID:
+            await ctx.send("❌ Google Calendar가 설정되지 않았어요.")
+            return
+        async with ctx.typing():
+            today    = kst_today()
+            week_end = today + timedelta(days=7)
+            time_min = f"{today.isoformat()}T00:00:00+09:00"
+            time_max = f"{week_end.isoformat()}T23:59:59+09:00"
+            events   = await calendar_get_events(time_min, time_max)
+            if not events:
+                await ctx.send("📅 이번 주 등록된 일정이 없어요!")
+                return
+            lines = [f"📅 **이번 주 일정 ({today} ~ {week_end})**\n"]
+            for e in events:
+                if "T" in e["start"]:
+                    day      = e["start"][:10]
+                    time_str = e["start"][11:16]
+                    lines.append(f"• {day} {time_str} — {e['title']}")
+                else:
+                    lines.append(f"• {e['start']} (종일) — {e['title']}")
+            await send_long_message(ctx, "\n".join(lines))
+
+    @commands.command(name="브리핑")
+    async def briefing_cmd(self, ctx):
+        """오늘 일정 + 미완료 할일 + 최근 헬스 기록 (미리 계산된 캐시로 즉시 응답)"""
+        async with ctx.typing():
+            results = await asyncio.gather(
+                briefing_get("events"), briefing_get("todos"), briefing_get("health"),
+                return_exceptions=True,
+            )
+            # 실패한 파트는 None → "불러오지 못했어요" 로 표시
+            events, todos, health = (None if isinstance(r, Exception) else r for r in results)
+            await send_long_message(ctx, format_briefing(events, todos, health))
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Schedule(bot))
@@ -0,0 +1,150 @@
+"""할일·메모 커맨드 (Notion): /할일추가 /할일목록 /할일완료 /할일수정 /메모 /메모수정"""
+from discord.ext import commands
+
+from bot import (
+    BotCog,
+    NOTION_MEMO_DB_ID,
+    NOTION_TODO_DB_ID,
+    briefing_get,
+    notion_add_todo,
+    notion_complete_todo,
+    notion_save_memo,
+    notion_update_memo,
+    notion_update_todo,
+    send_long_message,
+)
+
+class TodoMemo(BotCog):
+    @commands.command(name="할일추가")
+    async def add_todo_cmd(self, ctx, *, content: str = None):
+        """Notion 할일 DB에 할일 추가. 예: /할일추가 보고서 작성"""
+        if not content:
+            await ctx.send("❌ 할일 내용을 입력해주세요.\n예: `/할일추가 보고서 작성`")
+            return
+        if not NOTION_TODO_DB_ID:
+            await ctx.send("❌ Notion 할일 DB가 설정되지 않았어요. (NOTION_TODO_DB_ID 확인)")
+            return
+        ok = await notion_add_todo(content)
+        if ok:
+            await ctx.send(f"✅ 할일 추가 완료!\n**{content}**")
+        else:
+            await ctx.send("❌ 할일 추가 중 오류가 발생했어요.")
+
+    @commands.command(name="할일목록")
+    async def list_todos_cmd(self, ctx):
+        """Notion DB에서 미완료 할일 목록 조회"""
+        if not NOTION_TODO_DB_ID:
+            await ctx.send("❌ Notion 할일 DB가 설정되지 않았어요.")
+            return
+        async with ctx.typing():
+            try:
+                todos = await briefing_get("todos")   # 브리핑 캐시가 신선하면 원격 호출 없음
+            except Exception:
+                await ctx.send("❌ 할일 목록을 불러오지 못했어요. 잠시 후 다시 시도해주세요.")
+                return
+            if not todos:
+                await ctx.send("✅ 미완료 할일이 없어요! 모두 완료했나요? 🎉")
+                return
+            priority_emoji = {"높음": "🔴", "중간": "🟡", "낮음": "🟢"}
+            lines = ["**📋 미완료 할일 목록**\n"]
+            for i, todo in enumerate(todos, 1):
+                emoji    = priority_emoji.get(todo["priority"], "⬜")
+                due_str  = f" | 마감: {todo['due']}" if todo["due"] else ""
+                lines.append(f"{i}. {emoji} {todo['title']}{due_str}")
+            await send_long_message(ctx, "\n".join(lines))
+
+    @commands.command(name="할일완료")
+    async def complete_todo_cmd(self, ctx, *, title: str = None):
+        """Notion 할일 완료 처리. 예: /할일완료 보고서 작성"""
+        if not title:
+            await ctx.send("❌ 완료할 할일 이름을 입력해주세요.\n예: `/할일완료 보고서 작성`")
+            return
+        if not NOTION_TODO_DB_ID:
+            await ctx.send("❌ Notion 할일 DB가 설정되지 않았어요.")
+            return
+        ok = await notion_complete_todo(title)
+        if ok:
+            await ctx.send(f"✅ **{title}** 완료 처리했어요! 수고했어요 🎉")
+        else:
+            await ctx.send(f"❌ '{title}' 할일을 찾지 못했어요. 이름을 다시 확인해주세요.")
+
+    @commands.command(name="할일수정")
+    async def update_todo_cmd(self, ctx, *, content: str = None):
+        """Notion 할일 수정. 예: /할일수정 기존이름 | 새이름 또는 /할일수정 이름 | 마감:2026-03-01 또는 /할일수정 이름 | 우선순위:높음"""
+        if not content or "|" not in content:
+            await ctx.send(
+                "❌ 형식을 맞춰주세요.\n"
+                "예시:\n"
+                "`/할일수정 기존이름 | 새이름`\n"
+                "`/할일수정 기존이름 | 마감:2026-03-01`\n"
+                "`/할일수정 기존이름 | 우선순위:높음`"
+            )
+            return
+        if not NOTION_TODO_DB_ID:
+            await ctx.send("❌ Notion 할일 DB가 설정되지 않았어요.")
+            return
+        parts     = content.split("|", 1)
+        old_title = parts[0].strip()
+        change    = parts[1].strip()
+
+        new_title = due_date = priority = ""
+        if change.startswith("마감:"):
+            due_date = change.replace("마감:", "").strip()
+        elif change.startswith("우선순위:"):
+            priority = change.replace("우선순위:", "").strip()
+        else:
+            new_title = change
+
+        ok = await notion_update_todo(old_title, new_title, due_date, priority)
+        if ok:
+            await ctx.send(f"✅ **{old_title}** 할일을 수정했어요!")
+        else:
+            await ctx.send(f"❌ '{old_title}' 할일을 찾지 못했어요. 이름을 다시 확인해주세요.")
+
+    @commands.command(name="메모")
+    async def save_memo_cmd(self, ctx, *, content: str = None):
+        """Notion 메모 DB에 저장. 예: /메모 제목 | 내용 (| 없으면 전체가 제목)"""
+        if not content:
+            await ctx.send("❌ 메모 내용을 입력해주세요.\n예: `/메모 아이디어 | 내용을 여기에`")
+            return
+        if not NOTION_MEMO_DB_ID:
+            await ctx.send("❌ Notion 메모 DB가 설정되지 않았어요. (NOTION_MEMO_DB_ID 확인)")
+            return
+        if "|" in content:
+            parts = content.split("|", 1)
+            title = parts[0].strip()
+            body  = parts[1].strip()
+        else:
+            title = content[:50]
+            body  = content
+        ok = await notion_save_memo(title, body)
+        if ok:
+            await ctx.send(f"📝 메모 저장 완료!\n**{title}**")
+        else:
+            await ctx.send("❌ 메모 저장 중 오류가 발생했어요.")
+
+    @commands.command(name="메모수정")
+    async def update_memo_cmd(self, ctx, *, content: str = None):
+        """Notion 메모 수정. 예: /메모수정 기존제목 | 새 내용"""
+        if not content or "|" not in content:
+            await ctx.send("❌ 형식을 맞춰주세요.\n예: `/메모수정 기존제목 | 새로운 내용`")
+            return
+        if not NOTION_MEMO_DB_ID:
+            await ctx.send("❌ Notion 메모 DB가 설정되지 않았어요.")
+            return
+        parts   = content.split("|", 1)
+        title   = parts[0].strip()
+        new_val = parts[1].strip()
+
+        # 제목 변경인지 내용 변경인지 구분: "제목:" 접두어가 있으면 제목 변경
+        if new_val.startswith("제목:"):
+            ok = await notion_update_memo(title, new_title=new_val.replace("제목:", "").strip())
+        else:
+            ok = await notion_update_memo(title, new_content=new_val)
+        if ok:
+            await ctx.send(f"✅ **{title}** 메모를 수정했어요!")
+        else:
+            await ctx.send(f"❌ '{title}' 메모를 찾지 못했어요. 제목을 다시 확인해주세요.")
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(TodoMemo(bot))
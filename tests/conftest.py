@@ -0,0 +1,20 @@
+"""bot.py 를 게이트웨이 접속 없이 import 하고, 테스트마다 임시 history.db 를 씀"""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("DISCORD_TOKEN", "test")
+os.environ.setdefault("ANTHROPIC_API_KEY", "test")
+os.environ.setdefault("LOG_FORMAT", "text")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot as bot_module   # noqa: E402
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot_module, "DB_PATH", str(tmp_path / "history.db"))
+    bot_module.init_db()
+    return bot_module
@@ -0,0 +1,83 @@
+"""briefing_get: 동시 캐시 미스는 한 번만 조회, 실패·무효화 전 조회 결과는 캐시하지 않음"""
+import asyncio
+
+
+def test_concurrent_misses_share_one_fetch(bot, monkeypatch):
+    calls = []
+
+    async def fetch_todos():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [{"title": "할일", "due": ""}]
+
+    monkeypatch.setattr(bot, "briefing_cache", bot.BriefingCache())
+    monkeypatch.setitem(bot.BRIEFING_FETCHERS, "todos", fetch_todos)
+
+    async def run():
+        # 타임아웃으로 먼저 포기하는 쪽이 있어도 조회는 취소되지 않음
+        early = asyncio.create_task(asyncio.wait_for(bot.briefing_get("todos"), 0.01))
+        results = await asyncio.gather(*(bot.briefing_get("todos") for _ in range(5)))
+        try:
+            await early
+        except asyncio.TimeoutError:
+            pass
+        return results, await bot.briefing_get("todos")
+
+    results, cached = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == [{"title": "할일", "due": ""}] for r in results)
+    assert cached == results[0]
+    assert bot._briefing_inflight == {}
+
+
+def test_fetch_error_is_raised_not_cached(bot, monkeypatch):
+    outcomes = [RuntimeError("Notion 502"), [{"title": "할일", "due": ""}]]
+
+    async def fetch_todos():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(bot, "briefing_cache", bot.BriefingCache())
+    monkeypatch.setitem(bot.BRIEFING_FETCHERS, "todos", fetch_todos)
+
+    async def run():
+        try:
+            await bot.briefing_get("todos")
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("조회 실패가 빈 목록으로 삼켜짐")
+        assert bot.briefing_cache.get("todos") is None   # 실패는 캐시하지 않음
+        return await bot.briefing_get("todos")
+
+    assert asyncio.run(run()) == [{"title": "할일", "due": ""}]
+
+
+def test_fetch_started_before_invalidate_is_not_cached(bot, monkeypatch):
+    versions = iter([("쓰기 전", 0.08), ("쓰기 후", 0.01)])   # 옛 조회가 나중에 끝남
+
+    async def fetch_todos():
+        value, delay = next(versions)
+        await asyncio.sleep(delay)
+        return value
+
+    monkeypatch.setattr(bot, "briefing_cache", bot.BriefingCache())
+    monkeypatch.setitem(bot.BRIEFING_FETCHERS, "todos", fetch_todos)
+
+    async def run():
+        stale = asyncio.create_task(bot.briefing_get("todos"))
+        await asyncio.sleep(0.01)
+        bot.briefing_cache.invalidate("todos")            # 봇이 할일을 추가함
+        fresh = await bot.briefing_get("todos")           # 진행 중인 옛 조회에 합류하지 않음
+        assert await stale == "쓰기 전"                    # 늦게 끝났지만 캐시를 덮어쓰지 않음
+        return fresh, bot.briefing_cache.get("todos")
+
+    assert asyncio.run(run()) == ("쓰기 후", "쓰기 후")
+
+
+def test_format_briefing_marks_failed_parts(bot):
+    text = bot.format_briefing(None, [], None)
+    assert text.count("불러오지 못했어요") == 2
+    assert "• 없음 🎉" in text
@@ -0,0 +1,58 @@
+"""build_context·일정 파싱: 히스토리 읽기가 타임아웃이어도 user 메시지 기록은 남고, 날짜는 KST 기준"""
+import asyncio
+from datetime import date
+
+
+def _cfg(bot, channel_id=1):
+    return bot.ChannelConfig(channel_id=channel_id, mode="chat", model="x", max_tokens=100,
+                             history_budget=10, cooldown_sec=0, overrides={})
+
+
+def test_history_timeout_still_records_user_message(bot, monkeypatch):
+    backend = bot.SqliteStateBackend()
+    monkeypatch.setattr(bot, "state_backend", backend)
+    monkeypatch.setattr(bot, "CONTEXT_TIMEOUTS", {**bot.CONTEXT_TIMEOUTS, "history": 0.05})
+    real_add = backend.add_message
+
+    async def slow_add(channel_id, role, content):
+        await asyncio.sleep(0.2)
+        await real_add(channel_id, role, content)
+    monkeypatch.setattr(backend, "add_message", slow_add)
+
+    async def run():
+        ctx = await bot.build_context(_cfg(bot), "안녕", None)
+        return ctx, await backend.get_history(1)
+
+    ctx, history = asyncio.run(run())
+    assert ctx.status["history"] == "timeout"
+    assert ctx.messages == [{"role": "user", "content": "안녕"}]
+    assert history == [{"role": "user", "content": "안녕"}]   # 답장 기록보다 먼저 들어가 있음
+
+
+def test_calendar_snapshot_uses_kst_day(bot, monkeypatch):
+    seen = []
+
+    async def fake_events(time_min, time_max):
+        seen.append((time_min, time_max))
+        return [{"start": "2026-10-19T09:00:00+09:00", "title": "회의"}]
+    monkeypatch.setattr(bot, "calendar_get_events", fake_events)
+    monkeypatch.setattr(bot, "kst_today", lambda: date(2026, 10, 19))   # UTC 로는 아직 18일인 시각
+
+    assert asyncio.run(bot._calendar_snapshot_source()) == "09:00 회의"
+    assert seen == [("2026-10-19T00:00:00+09:00", "2026-10-19T23:59:59+09:00")]
+
+
+def test_event_parse_prompt_uses_kst_day(bot, monkeypatch):
+    systems = []
+
+    class Reply:
+        content = [type("Block", (), {"text": '{"events": []}'})()]
+
+    async def fake_create(purpose, channel_id, **request):
+        systems.append(request["system"])
+        return Reply()
+    monkeypatch.setattr(bot, "claude_create", fake_create)
+    monkeypatch.setattr(bot, "kst_today", lambda: date(2026, 10, 19))
+
+    assert asyncio.run(bot.parse_events_from_ai("내일 3시 치과")) == []
+    assert "오늘 날짜는 2026-10-19" in systems[0]
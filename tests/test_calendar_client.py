@@ -0,0 +1,143 @@
+"""AsyncCalendarClient 를 로컬 가짜 Calendar 서버(aiohttp)에 붙여 토큰·재발급·페이지·batch 확인"""
+import asyncio
+import json
+import re
+
+import pytest
+
+pytest.importorskip("google.auth")
+pytest.importorskip("cryptography")
+
+from aiohttp import web   # noqa: E402
+from cryptography.hazmat.primitives import serialization   # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa   # noqa: E402
+
+CALENDAR_ID = "team@group.calendar.google.com"
+
+
+def _creds(base: str) -> dict:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    return {"type": "service_account", "client_email": "bot@test.iam", "private_key": pem,
+            "private_key_id": "k1", "token_uri": f"{base}/token"}
+
+
+class FakeCalendar:
+    def __init__(self):
+        self.events: list[dict] = []
+        self.tokens  = 0
+        self.revoked: set[str] = set()   # 여기 든 토큰은 401
+        self.auth: list[str] = []
+        self.batches = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/token", self.token)
+        app.router.add_route("*", "/calendar/v3/calendars/{cid}/events", self.events_route)
+        app.router.add_post("/batch/calendar/v3", self.batch)
+        return app
+
+    async def token(self, request):
+        form = await request.post()
+        assert form["grant_type"] == "urn:ietf:params:oauth:grant-type:jwt-bearer"
+        assert form["assertion"].count(".") == 2   # 서명된 JWT
+        self.tokens += 1
+        return web.json_response({"access_token": f"tok{self.tokens}", "expires_in": 3600})
+
+    async def events_route(self, request):
+        assert request.match_info["cid"] == CALENDAR_ID
+        token = request.headers["Authorization"].removeprefix("Bearer ")
+        self.auth.append(token)
+        if token in self.revoked:
+            return web.json_response({"error": {"code": 401}}, status=401)
+        if request.method == "POST":
+            body = await request.json()
+            if body["summary"] == "FAIL":
+                return web.json_response({"error": {"code": 400}}, status=400)
+            body["id"] = f"e{len(self.events)}"
+            self.events.append(body)
+            return web.json_response(body)
+        if "pageToken" in request.query:
+            return web.json_response({"items": self.events[2:]})
+        return web.json_response({"items": self.events[:2],
+                                  **({"nextPageToken": "p2"} if len(self.events) > 2 else {})})
+
+    async def batch(self, request):
+        self.batches += 1
+        boundary = request.headers["Content-Type"].split("boundary=", 1)[1]
+        out = []
+        for part in (await request.text()).split(f"--{boundary}"):
+            m = re.search(r"Content-ID: <(item\d+)>", part)
+            if not m:
+                continue
+            body = json.loads(part.split("\r\n\r\n")[-1].strip())
+            if body["summary"] == "FAIL":
+                status, resp = "400 Bad Request", {"error": {"code": 400}}
+            else:
+                body["id"] = f"e{len(self.events)}"
+                self.events.append(body)
+                status, resp = "200 OK", body
+            out.append(f"--rb\r\nContent-Type: application/http\r\nContent-ID: <response-{m.group(1)}>\r\n\r\n"
+                       f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n\r\n{json.dumps(resp)}\r\n")
+        return web.Response(body=("".join(out) + "--rb--").encode(),
+                            headers={"Content-Type": "multipart/mixed; boundary=rb"})
+
+
+def _run(bot, scenario):
+    async def run():
+        fake   = FakeCalendar()
+        runner = web.AppRunner(fake.app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base   = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        client = bot.AsyncCalendarClient(_creds(base), CALENDAR_ID, api_base=f"{base}/calendar/v3")
+        try:
+            await scenario(fake, client)
+        finally:
+            await client.close()
+            await runner.cleanup()
+        assert client._session.closed
+    asyncio.run(run())
+
+
+def test_token_is_cached_and_events_paginate(bot):
+    async def scenario(fake, client):
+        await client.check()
+        for i in range(3):
+            created = await client.insert_event(bot.build_event_body(f"일정{i}", "2026-10-18", "2026-10-19"))
+            assert created["id"] == f"e{i}"
+        items = await client.list_events("2026-10-18T00:00:00+09:00", "2026-10-19T00:00:00+09:00")
+        assert [e["summary"] for e in items] == ["일정0", "일정1", "일정2"]
+        assert fake.tokens == 1   # check() 에서 받은 토큰을 계속 씀
+
+    _run(bot, scenario)
+
+
+def test_revoked_token_is_refreshed_once(bot):
+    async def scenario(fake, client):
+        await client.check()
+        fake.revoked.add("tok1")
+        created = await client.insert_event(bot.build_event_body("회의", "2026-10-18", "2026-10-19"))
+        assert created["id"] == "e0"
+        assert fake.auth == ["tok1", "tok2"]
+
+        fake.revoked.add("tok2")
+        fake.revoked.add("tok3")
+        with pytest.raises(bot.CalendarError) as err:   # 재발급 후에도 401 이면 그대로 실패
+            await client.insert_event(bot.build_event_body("회의", "2026-10-18", "2026-10-19"))
+        assert err.value.status == 401
+
+    _run(bot, scenario)
+
+
+def test_batch_insert_keeps_order_and_errors(bot):
+    async def scenario(fake, client):
+        bodies  = [bot.build_event_body(t, "2026-10-18", "2026-10-19") for t in ("A", "FAIL", "C")]
+        results = await client.insert_events(bodies)
+        assert fake.batches == 1
+        assert results[0]["summary"] == "A" and results[2]["summary"] == "C"
+        assert isinstance(results[1], bot.CalendarError) and results[1].status == 400
+
+    _run(bot, scenario)
@@ -0,0 +1,164 @@
+"""확인 버튼: 흐름 미등록·실패 시 행 유지, 성공해야 삭제, 만료는 TTL 만으로 정리 (SQLite / Redis 백엔드)"""
+import asyncio
+import sqlite3
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class _Response:
+    def __init__(self, log):
+        self.log = log
+
+    async def edit_message(self, content=None, view=None):
+        self.log.append(("edit", content))
+
+    async def send_message(self, content=None, ephemeral=False):
+        self.log.append(("ephemeral", content))
+
+    async def defer(self):
+        self.log.append(("defer",))
+
+
+class _Followup:
+    def __init__(self, log):
+        self.log = log
+
+    async def send(self, content=None, ephemeral=False):
+        self.log.append(("ephemeral", content))
+
+
+class FakeInteraction:
+    channel_id = 555
+
+    def __init__(self):
+        self.log = []
+        self.response = _Response(self.log)
+        self.followup = _Followup(self.log)
+
+    async def edit_original_response(self, content=None, view=None):
+        self.log.append(("final", content))
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backend(request, bot, monkeypatch):
+    if request.param == "sqlite":
+        backend = bot.SqliteStateBackend()
+    else:
+        backend = bot.RedisStateBackend(fakeredis.FakeAsyncRedis(decode_responses=True), prefix="test:")
+    monkeypatch.setattr(bot, "state_backend", backend)
+    return backend
+
+
+@pytest.fixture
+def flow(bot, backend, monkeypatch):
+    monkeypatch.setattr(bot, "CONFIRM_FLOWS", {})
+    outcomes = []   # on_confirm 이 차례로 낼 결과 (Exception 이면 raise)
+
+    async def on_confirm(interaction, data):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return f"{outcome} {data['n']}"
+    bot.register_confirm("t", on_confirm, cancel_text="취소됨", expired_text="만료됨")
+    return outcomes
+
+
+def _put(bot, token, ttl=600):
+    asyncio.run(bot.state_backend.confirm_put(token, "t", 555, {"n": 1}, ttl))
+
+
+def _click(bot, action, token, kind="t"):
+    interaction = FakeInteraction()
+    asyncio.run(bot.dispatch_confirm(interaction, kind, action, token))
+    return interaction.log
+
+
+def _sqlite_rows(bot) -> int:
+    with sqlite3.connect(bot.DB_PATH) as conn:
+        return conn.execute("SELECT COUNT(*) FROM confirmations").fetchone()[0]
+
+
+def _rows(bot) -> int:
+    backend = bot.state_backend
+    if backend.name == "redis":
+        return asyncio.run(backend._r.zcard(backend._key("confirm_exp")))
+    return _sqlite_rows(bot)
+
+
+def test_unregistered_flow_keeps_row(bot, flow):
+    _put(bot, "a" * 16)
+    log = _click(bot, "ok", "a" * 16, kind="reloading")
+    assert log[0][0] == "ephemeral"
+    assert _rows(bot) == 1
+
+
+def test_failed_confirm_keeps_row_for_retry(bot, flow):
+    _put(bot, "b" * 16)
+    flow.extend([bot.ConfirmFailed("❌ 저장 실패"), "저장"])
+    assert _click(bot, "ok", "b" * 16) == [("defer",), ("ephemeral", "❌ 저장 실패")]
+    assert _rows(bot) == 1
+    assert _click(bot, "ok", "b" * 16) == [("defer",), ("final", "저장 1")]
+    assert _rows(bot) == 0
+    assert _click(bot, "ok", "b" * 16) == [("edit", "만료됨")]   # 두 번 처리하지 않음
+
+
+def test_claimed_row_is_not_cancelled_or_reprocessed(bot, flow):
+    _put(bot, "c" * 16)
+    assert asyncio.run(bot.state_backend.confirm_claim("c" * 16)) == ("ok", {"n": 1})   # 다른 클릭이 처리 중
+    assert _click(bot, "ok", "c" * 16) == [("ephemeral", "⏳ 이미 처리 중이에요.")]
+    assert _click(bot, "no", "c" * 16) == [("ephemeral", "⏳ 이미 처리 중이에요.")]
+    assert _rows(bot) == 1
+
+
+def test_cancel(bot, flow):
+    _put(bot, "d" * 16)
+    assert _click(bot, "no", "d" * 16) == [("edit", "취소됨")]
+    assert _click(bot, "ok", "d" * 16) == [("edit", "만료됨")]
+
+
+def test_sweep_expires_by_ttl_for_any_channel(bot, flow, monkeypatch):
+    edited = []
+
+    class Partial:
+        def __init__(self, channel_id):
+            self.channel_id = channel_id
+
+        def get_partial_message(self, message_id):
+            channel_id = self.channel_id
+
+            class Message:
+                async def edit(self, view=None):
+                    edited.append((channel_id, message_id))
+            return Message()
+
+    monkeypatch.setattr(bot.bot, "get_channel", lambda cid: None)   # 이 워커 캐시에 없는 채널
+    monkeypatch.setattr(bot.bot, "get_partial_messageable", Partial)
+    _put(bot, "e" * 16, ttl=-1)
+    asyncio.run(bot.state_backend.confirm_attach("e" * 16, 42))
+    _put(bot, "f" * 16)
+    asyncio.run(bot.sweep_confirmations())
+    assert edited == [(555, 42)]
+    assert _rows(bot) == 1
+
+
+def test_confirm_state_is_shared_across_workers(bot, flow):
+    # 같은 백엔드를 보는 다른 워커(재시작 후 포함)가 보낸 확인도 처리됨 — 로컬 DB 를 거치지 않음
+    _put(bot, "a1" * 8)
+    if bot.state_backend.name == "redis":
+        assert _sqlite_rows(bot) == 0
+    flow.append("저장")
+    assert _click(bot, "ok", "a1" * 8) == [("defer",), ("final", "저장 1")]
+    assert _rows(bot) == 0
+
+
+
+def test_concurrent_claims_process_once(bot, flow):
+    _put(bot, "a2" * 8)
+
+    async def run():
+        return await asyncio.gather(*(bot.state_backend.confirm_claim("a2" * 8) for _ in range(5)))
+
+    states = sorted(state for state, _ in asyncio.run(run()))
+    assert states == ["busy"] * 4 + ["ok"]
@@ -0,0 +1,109 @@
+"""HttpPool 을 로컬 TLS 대역 서버(자체 서명 인증서)에 붙여 연결 재사용·유지 ping·on_ready 1회 시작 확인"""
+import asyncio
+import datetime
+import ipaddress
+import ssl
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("cryptography")
+
+from aiohttp import web   # noqa: E402
+from cryptography import x509   # noqa: E402
+from cryptography.hazmat.primitives import hashes, serialization   # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec   # noqa: E402
+from cryptography.x509.oid import NameOID   # noqa: E402
+
+SERVER_KEEPALIVE_SEC = 1.0   # 서버가 유휴 연결을 끊는 시간 (실서비스 LB 대역)
+
+
+@pytest.fixture
+def tls_files(tmp_path):
+    key  = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now  = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(1).not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), False)
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), True)
+            .sign(key, hashes.SHA256()))
+    cert_path, key_path = tmp_path / "cert.pem", tmp_path / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                           serialization.NoEncryption()))
+    return str(cert_path), str(key_path)
+
+
+async def _serve(cert_path, key_path):
+    async def ok(request):
+        return web.json_response({"ok": True})
+    app = web.Application()
+    app.router.add_get("/v1/ping", ok)
+    app.router.add_route("HEAD", "/", ok)
+    ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ctx.load_cert_chain(cert_path, key_path)
+    runner = web.AppRunner(app, keepalive_timeout=SERVER_KEEPALIVE_SEC)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0, ssl_context=ctx)
+    await site.start()
+    return runner, f"https://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/"
+
+
+def _idle_then_request(bot, tls_files, monkeypatch, keep_warm: bool) -> dict:
+    monkeypatch.setattr(bot, "HTTP_CA_BUNDLE", tls_files[0])
+    monkeypatch.setattr(bot, "HTTP_KEEPWARM_SEC", 0.3)
+
+    async def run():
+        runner, base = await _serve(*tls_files)
+        pool   = bot.HttpPool("test")
+        client = pool.build(httpx.AsyncClient, httpx.Limits, base)
+        try:
+            for _ in range(5):
+                (await client.get(f"{base}v1/ping")).raise_for_status()
+            # 서버 keep-alive 보다 오래 쉼 — 유지 ping 이 없으면 연결이 끊김
+            for _ in range(int(SERVER_KEEPALIVE_SEC * 2 / 0.3)):
+                await asyncio.sleep(0.3)
+                if keep_warm:
+                    await pool.keep_warm()
+            (await client.get(f"{base}v1/ping")).raise_for_status()
+            return pool.stats()
+        finally:
+            await client.aclose()
+            await runner.cleanup()
+    return asyncio.run(run())
+
+
+def test_connection_is_reused_across_idle_with_keep_warm(bot, tls_files, monkeypatch):
+    st = _idle_then_request(bot, tls_files, monkeypatch, keep_warm=True)
+    assert st["requests"] == 6
+    assert st["new_conns"] == 1            # 첫 TLS 핸드셰이크 한 번뿐
+    assert st["reuse_rate"] == pytest.approx(5 / 6, abs=0.001)
+    assert st["warm_pings"] >= 2 and st["warm_conns"] == 0
+    assert st["handshake_p50_ms"] is not None
+
+
+def test_idle_connection_is_lost_without_keep_warm(bot, tls_files, monkeypatch):
+    st = _idle_then_request(bot, tls_files, monkeypatch, keep_warm=False)
+    assert st["new_conns"] == 2            # 유휴 후 다시 핸드셰이크
+    assert st["warm_pings"] == 0
+
+
+def test_warm_up_starts_once_across_reconnects(bot, monkeypatch):
+    started = []
+
+    async def fake(name):
+        started.append(name)
+
+    monkeypatch.setattr(bot, "_ready_once", False)
+    monkeypatch.setattr(bot, "IS_PRIMARY_WORKER", False)
+    monkeypatch.setattr(bot, "warm_up", lambda: fake("warm_up"))
+    monkeypatch.setattr(bot, "journal_heartbeat", lambda: fake("heartbeat"))
+
+    async def run():
+        for _ in range(3):   # 게이트웨이 재접속마다 on_ready 가 다시 옴
+            await bot.on_ready()
+        await asyncio.sleep(0)
+    asyncio.run(run())
+    assert sorted(started) == ["heartbeat", "warm_up"]
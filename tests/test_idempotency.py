@@ -0,0 +1,81 @@
+"""중복 방지: 처리 중인 같은 요청은 결과를 기다리고, 지문은 예외·취소에도 해제됨"""
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def todo_writes(bot, monkeypatch):
+    outcomes = []   # _notion_add_todo 가 차례로 낼 결과
+    calls    = []
+
+    async def fake_write(title, due_date, priority):
+        calls.append(title)
+        await asyncio.sleep(0.05)
+        return outcomes.pop(0)
+
+    monkeypatch.setattr(bot, "notion", object())
+    monkeypatch.setattr(bot, "NOTION_TODO_DB_ID", "db")
+    monkeypatch.setattr(bot, "_notion_add_todo", fake_write)
+    return outcomes, calls
+
+
+def test_inflight_duplicate_waits_for_success(bot, todo_writes):
+    outcomes, calls = todo_writes
+    outcomes.append(True)
+
+    async def run():
+        return await asyncio.gather(bot.notion_add_todo("우유 사기"), bot.notion_add_todo("우유 사기"))
+
+    assert asyncio.run(run()) == [True, True]
+    assert len(calls) == 1
+    assert bot._idem_inflight == {}
+
+
+def test_inflight_duplicate_retries_after_failure(bot, todo_writes):
+    outcomes, calls = todo_writes
+    outcomes.extend([False, True])   # 첫 쓰기 실패 → 기다리던 쪽이 직접 다시 씀
+
+    async def run():
+        return await asyncio.gather(bot.notion_add_todo("우유 사기"), bot.notion_add_todo("우유 사기"))
+
+    assert asyncio.run(run()) == [False, True]
+    assert len(calls) == 2
+
+
+def test_cancelled_write_releases_fingerprint(bot, todo_writes):
+    outcomes, calls = todo_writes
+    outcomes.extend([True, True])
+
+    async def run():
+        task = asyncio.create_task(bot.notion_add_todo("우유 사기"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert bot._idem_inflight == {}
+        return await bot.notion_add_todo("우유 사기")   # 중복으로 오인하지 않고 다시 씀
+
+    assert asyncio.run(run()) is True
+    assert len(calls) == 2
+
+
+def test_calendar_bad_event_does_not_leak_fingerprints(bot, monkeypatch):
+    inserted = []
+
+    class FakeClient:
+        async def insert_events(self, bodies):
+            inserted.extend(b["summary"] for b in bodies)
+            return [{"id": str(i)} for i in range(len(bodies))]
+
+    monkeypatch.setattr(bot, "get_calendar_client", lambda: FakeClient())
+    events = [
+        {"title": "치과", "date": "2026-10-20", "start_time": "15:00"},
+        {"title": "회식", "date": "2026-10-21", "start_time": "저녁"},   # 시간 형식 오류
+        {"title": "치과", "date": "2026-10-20", "start_time": "15:00"},   # 같은 묶음 안 중복
+    ]
+    statuses = asyncio.run(bot.calendar_add_events(events))
+    assert statuses == ["added", "failed", "duplicate"]
+    assert inserted == ["치과"]
+    assert bot._idem_inflight == {}
+    assert asyncio.run(bot.calendar_add_events(events[:1])) == ["duplicate"]   # 저장된 지문만 중복
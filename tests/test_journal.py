@@ -0,0 +1,63 @@
+"""pending_work 저널: 답을 보낸 턴은 재생하지 않고, 살아 있는 인스턴스의 작업은 가져가지 않음"""
+import sqlite3
+import time
+
+
+def _keys(rows):
+    return [row[0] for row in rows]
+
+
+def _as_instance(bot, monkeypatch, instance):
+    monkeypatch.setattr(bot, "INSTANCE_ID", instance)
+
+
+def test_replied_turn_is_not_replayed(bot, monkeypatch):
+    _as_instance(bot, monkeypatch, "dead")
+    bot._journal_put("turn:1", "turn", 10, {}, "running")
+    bot._journal_put("turn:1", "turn", 10, {}, "replied")
+    bot._journal_put("turn:1", "turn", 10, {}, "deferred")   # 종료 취소가 와도 replied 유지
+
+    _as_instance(bot, monkeypatch, "me")
+    bot._journal_beat()
+    assert bot._journal_replayable() == []
+    with sqlite3.connect(bot.DB_PATH) as conn:   # 소유자가 죽었으니 정리됨
+        assert conn.execute("SELECT COUNT(*) FROM pending_work").fetchone()[0] == 0
+
+
+def test_running_row_of_live_instance_is_left_alone(bot, monkeypatch):
+    _as_instance(bot, monkeypatch, "other")
+    bot._journal_beat()
+    bot._journal_put("turn:2", "turn", 10, {}, "running")
+
+    _as_instance(bot, monkeypatch, "me")
+    bot._journal_beat()
+    assert bot._journal_replayable() == []
+    assert not bot._journal_claim("turn:2")
+
+
+def test_running_row_of_silent_instance_is_reclaimed(bot, monkeypatch):
+    _as_instance(bot, monkeypatch, "other")
+    bot._journal_beat()
+    bot._journal_put("turn:3", "turn", 10, {}, "running")
+    with sqlite3.connect(bot.DB_PATH) as conn:
+        conn.execute("UPDATE worker_heartbeats SET beat = ?", (time.time() - bot.REPLAY_STALE_SEC - 1,))
+        conn.commit()
+
+    _as_instance(bot, monkeypatch, "me")
+    bot._journal_beat()
+    assert _keys(bot._journal_replayable()) == ["turn:3"]
+    assert bot._journal_claim("turn:3")
+    assert not bot._journal_claim("turn:3")   # 이제 살아 있는 "me" 소유
+    with sqlite3.connect(bot.DB_PATH) as conn:
+        assert conn.execute("SELECT owner, attempts FROM pending_work").fetchone() == ("me", 1)
+
+
+def test_deferred_and_retired_rows_are_replayable(bot, monkeypatch):
+    _as_instance(bot, monkeypatch, "old")
+    bot._journal_beat()
+    bot._journal_put("turn:4", "turn", 10, {}, "deferred")
+    bot._journal_put("turn:5", "turn", 10, {}, "running")
+    bot._journal_retire()   # 정상 종료: 기다리지 않고 바로 이어받음
+
+    _as_instance(bot, monkeypatch, "new")
+    assert _keys(bot._journal_replayable()) == ["turn:4", "turn:5"]
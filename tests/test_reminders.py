@@ -0,0 +1,42 @@
+"""마감 알림: 전송 실패는 재시도하고, 정해진 횟수 후에만 포기"""
+import asyncio
+from datetime import datetime, timedelta
+
+
+def _due_now(bot) -> str:
+    return (datetime.now(bot.KST) + timedelta(minutes=bot.REMINDER_LEAD_MIN)).isoformat(timespec="seconds")
+
+
+def _run_loop(bot, engine, fail_times: int) -> list[int]:
+    fired = []
+
+    async def fake_fire(todo):
+        fired.append(todo["attempts"])
+        if len(fired) <= fail_times:
+            raise RuntimeError("Discord 503")
+        engine._sent.add((todo["id"], todo["due"]))
+
+    engine._fire = fake_fire
+
+    async def run():
+        engine._wake = asyncio.Event()
+        engine.upsert("todo-1", "보고서", _due_now(bot))
+        task = asyncio.create_task(engine._loop())
+        await asyncio.sleep(0.5)
+        task.cancel()
+    asyncio.run(run())
+    return fired
+
+
+def test_failed_reminder_is_retried(bot):
+    engine = bot.ReminderEngine()
+    engine.RETRY_SEC = 0.02
+    assert _run_loop(bot, engine, fail_times=2) == [0, 1, 2]
+    assert len(engine) == 0
+
+
+def test_reminder_gives_up_after_max_attempts(bot):
+    engine = bot.ReminderEngine()
+    engine.RETRY_SEC = 0.02
+    assert _run_loop(bot, engine, fail_times=99) == list(range(engine.MAX_ATTEMPTS))
+    assert len(engine) == 0
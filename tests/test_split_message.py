@@ -0,0 +1,52 @@
+"""split_message: 어떤 입력이든 청크가 limit 이하이고 코드블록이 청크마다 닫힘"""
+import random
+
+import pytest
+
+
+def _fences_balanced(chunk: str) -> bool:
+    open_fence = None
+    for line in chunk.split("\n"):
+        stripped = line.lstrip()
+        if stripped.startswith(("```", "~~~")):
+            if open_fence is None:
+                open_fence = stripped[:3]
+            elif stripped.startswith(open_fence):
+                open_fence = None
+    return open_fence is None
+
+
+def _random_markdown(rng: random.Random) -> str:
+    blocks = []
+    for _ in range(rng.randint(1, 25)):
+        kind = rng.random()
+        if kind < 0.2:
+            marker = rng.choice(["```", "~~~"])
+            body = "\n".join("x = " + "1" * rng.randint(0, 300) for _ in range(rng.randint(1, 40)))
+            blocks.append(f"{marker}{rng.choice(['', 'python', 'json'])}\n{body}\n{marker}")
+        elif kind < 0.3:
+            blocks.append(rng.choice("가나다ab") * rng.randint(500, 4000))   # 공백 없는 긴 줄
+        else:
+            words = [rng.choice(["안녕", "일정", "word", "**굵게**", "-", "1."]) for _ in range(rng.randint(1, 600))]
+            blocks.append(" ".join(words))
+        blocks.append(rng.choice(["", "", "\n"]))
+    return "\n".join(blocks)
+
+
+@pytest.mark.parametrize("limit_name", ["MSG_CHUNK_LEN", "EMBED_CHUNK_LEN"])
+def test_chunks_fit_and_fences_balance(bot, limit_name):
+    limit = getattr(bot, limit_name)
+    rng = random.Random(limit)
+    for _ in range(400):
+        text = _random_markdown(rng)
+        for chunk in bot.split_message(text, limit):
+            assert len(chunk) <= limit
+            assert _fences_balanced(chunk)
+
+
+@pytest.mark.parametrize("text, sizes", [
+    ("a" * 1200 + "\n\n" + "b" * 600 + "\n" + "c" * 1500, [1200, 600, 1500]),
+    ("\n".join(["가" * 1000, "", "나" * 800, "다" * 1800]), [1000, 800, 1800]),
+])
+def test_tail_after_paragraph_split_is_rechecked(bot, text, sizes):
+    assert [len(c) for c in bot.split_message(text, 2000)] == sizes
@@ -0,0 +1,25 @@
+"""사용량 집계: group_by 는 허용 컬럼만, 모든 용도에 라벨"""
+import pytest
+
+
+def _record(bot, purpose, model="claude-sonnet-4-6"):
+    bot._record_usage(bot.UsageRecord(1, purpose, model, 100, 20, 0, 0, 50.0))
+
+
+def test_rollup_by_purpose(bot):
+    _record(bot, "chat")
+    _record(bot, "tool_use")
+    _record(bot, "tool_use")
+    rows = bot._usage_rollup(bot.kst_today().isoformat(), "purpose")
+    assert sorted((r[0], r[2]) for r in rows) == [("chat", 1), ("tool_use", 2)]
+
+
+@pytest.mark.parametrize("group_by", ["id", "purpose; DROP TABLE usage_daily", ""])
+def test_rollup_rejects_unknown_group_by(bot, group_by):
+    with pytest.raises(ValueError):
+        bot._usage_rollup("2026-01-01", group_by)
+
+
+def test_every_recorded_purpose_has_label(bot):
+    for purpose in ("chat", "tool_use", "summary", "event_parse", "health_parse", "health_narrative"):
+        assert purpose in bot.USAGE_PURPOSE_LABELS